@@ -0,0 +1,41 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, List, Dict
+from uuid import UUID
+
+class TextResponseDTO(BaseModel):
+    id: UUID
+    location: str
+    expiration_date: Optional[datetime]
+    hash_value: str
+    created_at: datetime
+    updated_at: datetime
+    content_digest: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class TextContentDTO(BaseModel):
+    metadata: TextResponseDTO
+    content: str
+    from_cache: bool
+
+class TextGetResponseDTO(BaseModel):
+    content: TextContentDTO
+    headers: Dict[str, str]
+
+class TextBatchItemDTO(BaseModel):
+    index: int
+    status: str
+    text: Optional[TextResponseDTO] = None
+    error: Optional[str] = None
+
+class TextBatchResponseDTO(BaseModel):
+    results: List[TextBatchItemDTO]
+
+class TextUploadReservationDTO(BaseModel):
+    hash_value: str
+    upload_url: str
+    method: str
+    headers: Dict[str, str]
+    expires_at: datetime
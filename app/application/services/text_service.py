@@ -3,31 +3,183 @@ from app.domain.entities.text import Text as TextEntity
 from app.infrastructure.database.models import Texts as TextModel
 from app.application.dto.user_dto import UserCreateDTO
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import boto3
 from botocore.exceptions import ClientError
 import os
 from dotenv import load_dotenv
 from app.infrastructure.storage.s3_storage_service import S3StorageService
 from app.infrastructure.cache.text_cache_service import TextCacheService
+from app.infrastructure.cache.pending_text_store import PendingTextStore
+from app.infrastructure.cache.upload_reservation_store import UploadReservationStore
+from app.infrastructure.cache.singleflight import SingleFlight
+from app.infrastructure.cache.text_hash_filter import get_hash_filter
+from app.infrastructure.storage.codecs import decode_body, encode_text
+from app.infrastructure.storage.segment_storage_service import (
+    SegmentStorageService, is_segment_location, parse_segment_location
+)
+import codecs
 import threading
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
 load_dotenv()
 
+# Location recorded for texts whose body is stored in the database row
+INLINE_LOCATION = "inline"
+# Location reported for fast-acked texts that are not persisted yet
+PENDING_LOCATION = "pending"
+# Unreferenced blobs deleted per transaction (their rows stay locked meanwhile)
+BLOB_CLEANUP_BATCH = 100
+
+# Cache misses in flight in this process, so concurrent readers of one
+# hash share a single database/storage load
+_text_loads = SingleFlight()
+
+_store_executor = None
+_store_executor_lock = threading.Lock()
+
+def _get_store_executor() -> ThreadPoolExecutor:
+    """Process-wide pool that runs uploads alongside hash acquisition"""
+    global _store_executor
+    with _store_executor_lock:
+        if _store_executor is None:
+            _store_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('TEXT_UPLOAD_OVERLAP_WORKERS', '32')),
+                thread_name_prefix="text-upload"
+            )
+        return _store_executor
+
+_cache_fill_executor = None
+_cache_fill_executor_lock = threading.Lock()
+
+def _get_cache_fill_executor() -> ThreadPoolExecutor:
+    """Process-wide pool that caches streamed bodies once they have been sent"""
+    global _cache_fill_executor
+    with _cache_fill_executor_lock:
+        if _cache_fill_executor is None:
+            _cache_fill_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('TEXT_CACHE_FILL_WORKERS', '4')),
+                thread_name_prefix="text-cache-fill"
+            )
+        return _cache_fill_executor
+
+class TextTooLargeError(Exception):
+    """Raised while streaming a text body that exceeds the upload limit"""
+
+class UploadVerificationError(Exception):
+    """Raised when a directly uploaded object doesn't match its reservation"""
+
+class StreamedTextUpload:
+    """A text body streamed in chunks straight into an S3 multipart upload.
+    
+    Memory stays bounded by about two parts per request: bytes are buffered
+    until they fill a part and are then sent to S3. Bodies that never fill a
+    part are created through the regular create_text path, so they still get
+    inline storage, deduplication and write-behind.
+    """
+    
+    def __init__(self, text_service: "TextService", max_bytes: int, part_size: int = None):
+        self.text_service = text_service
+        self.storage_service = text_service.storage_service
+        self.max_bytes = max_bytes
+        # S3 rejects parts (other than the last) under 5 MiB
+        self.part_size = max(part_size or int(os.getenv('TEXT_UPLOAD_PART_BYTES', str(8 * 1024 * 1024))),
+                             5 * 1024 * 1024)
+        self.size = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        codec = self.storage_service.codec
+        self._compressor = codec.compressor() if codec else None
+        self._raw = bytearray()
+        self._pending_part = bytearray()
+        self._multipart = None
+    
+    def write(self, chunk: bytes):
+        """Add the next chunk of the body, uploading a part once one is full"""
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise TextTooLargeError(f"Text exceeds {self.max_bytes} bytes")
+        # Validate UTF-8 as we go; split multi-byte characters are carried over
+        self._decoder.decode(chunk)
+        
+        if self._multipart is None:
+            self._raw += chunk
+            if len(self._raw) < self.part_size:
+                return
+            # Large text: switch to a multipart upload
+            self._multipart = self.storage_service.start_multipart_upload()
+            chunk, self._raw = bytes(self._raw), bytearray()
+        
+        self._pending_part += self._compressor.compress(chunk) if self._compressor else chunk
+        if len(self._pending_part) >= self.part_size:
+            self._multipart.upload_part(bytes(self._pending_part))
+            self._pending_part = bytearray()
+    
+    def finish(self, expiration_date: datetime) -> TextEntity:
+        """Complete the upload and create the text"""
+        self._decoder.decode(b'', final=True)
+        
+        if self._multipart is None:
+            return self.text_service.create_text(self._raw.decode('utf-8'), expiration_date)
+        
+        if self._compressor:
+            self._pending_part += self._compressor.flush()
+        if self._pending_part or not self._multipart.parts:
+            self._multipart.upload_part(bytes(self._pending_part))
+        s3_location = self._multipart.complete()
+        # Completed: nothing left for abort() to discard
+        multipart, self._multipart = self._multipart, None
+        
+        try:
+            return self.text_service.text_repository.create(TextEntity.create(s3_location, expiration_date))
+        except Exception as e:
+            try:
+                self.storage_service.delete_text(multipart.file_name)
+            except Exception as cleanup_error:
+                logging.error(f"Failed to cleanup S3 file {s3_location}: {cleanup_error}")
+            raise Exception(f"Failed to create text: {str(e)}") from e
+    
+    def abort(self):
+        """Discard anything uploaded so far"""
+        if self._multipart:
+            self._multipart.abort()
+
 class TextService:
-    def __init__(self, text_repository, cache_service: TextCacheService, storage_service: S3StorageService = None):
+    def __init__(self, text_repository, cache_service: TextCacheService, storage_service: S3StorageService = None,
+                 pending_store: PendingTextStore = None, segment_store: SegmentStorageService = None,
+                 upload_store: UploadReservationStore = None):
         self.text_repository = text_repository
         self.cache_service = cache_service
         self.storage_service = storage_service or S3StorageService()
+        # Set when write-behind (fast-ack) creation is enabled
+        self.pending_store = pending_store
+        # Set when bodies are appended to shared segments instead of one object each
+        self.segment_store = segment_store
+        # Reservations for presigned direct-to-storage uploads
+        self.upload_store = upload_store
+        self.upload_url_ttl = int(os.getenv('TEXT_UPLOAD_URL_TTL_SECONDS', '900'))
         
         # Fix environment variable types
         self.default_ttl = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
         self.popular_ttl = int(os.getenv('POPULAR_CACHE_TTL_SECONDS', '7200'))
         self.popular_threshold = int(os.getenv('POPULAR_THRESHOLD', '10'))
         
-        # Add lock for cache operations
-        self._cache_lock = threading.RLock()
+        self.batch_upload_workers = int(os.getenv('TEXT_BATCH_UPLOAD_WORKERS', '16'))
+        self.inline_max_bytes = int(os.getenv('INLINE_TEXT_MAX_BYTES', '4096'))
+        # Bodies up to this size are cached as soon as they are created (0 disables)
+        self.write_through_max_bytes = int(os.getenv('TEXT_CACHE_WRITE_THROUGH_MAX_BYTES', '65536'))
+        # Cluster-wide lease on reloading a missed text (0 disables), and how
+        # long other workers wait for the holder to fill the cache
+        self.load_lease_ms = int(os.getenv('TEXT_LOAD_LEASE_MS', '0'))
+        self.load_lease_wait_ms = int(os.getenv('TEXT_LOAD_LEASE_WAIT_MS', str(self.load_lease_ms)))
+        # Filter of issued hashes; lookups of hashes it rules out skip the database
+        self.hash_filter = get_hash_filter()
+        # Misses on texts stored as their own object can be streamed in chunks;
+        # complete bodies up to the cap are cached after they have been sent
+        self.stream_chunk_bytes = int(os.getenv('TEXT_STREAM_CHUNK_BYTES', str(64 * 1024)))
+        self.stream_cache_max_bytes = int(os.getenv('TEXT_STREAM_CACHE_MAX_BYTES', str(1024 * 1024)))
 
     def __enter__(self):
         """Context manager for resource management"""
@@ -61,52 +213,426 @@ class TextService:
     def create_text(self, text: str, expiration_date: datetime) -> TextEntity:
         """Thread-safe text creation with proper resource cleanup"""
         
+        if self.pending_store:
+            return self._create_text_write_behind(text, expiration_date)
+        
         s3_location = None
+        content_digest = None
         text_entity = None
+        hash_value = None
+        
+        # Step 1: Start the upload (small texts are kept inline, nothing to overlap)
+        store_future = None
+        if not self._stores_inline(text):
+            store_future = _get_store_executor().submit(self._store_text, text)
         
         try:
-            # Step 1: Upload to S3 (can be done in parallel safely)
-            s3_location = self.storage_service.upload_text(text)
+            # Step 2: Take a hash while the body is being uploaded
+            hash_value = self.text_repository.reserve_hash()
             
-            # Step 2: Create entity with S3 location
-            text_entity = TextEntity.create(s3_location, expiration_date)
+            if store_future:
+                s3_location, content_digest, inline_content = store_future.result()
+            else:
+                s3_location, content_digest, inline_content = self._store_text(text)
             
-            # Step 3: Atomic database creation (includes hash consumption)
-            return self.text_repository.create(text_entity)
+            # Step 3: Create entity with S3 location and the reserved hash
+            text_entity = TextEntity.create(s3_location, expiration_date, content_digest, inline_content)
+            text_entity.hash_value = hash_value
+            
+            # Step 4: Atomic database creation
+            text_entity = self.text_repository.create(text_entity)
             
         except Exception as e:
-            # Compensating cleanup in reverse order
-            if s3_location:
+            # Compensating cleanup in reverse order.
+            # An upload still in flight is waited for so it can be removed too.
+            if s3_location is None and store_future and not store_future.cancel():
+                try:
+                    s3_location, content_digest, _ = store_future.result()
+                except Exception:
+                    pass
+            
+            if s3_location and self._owns_upload(s3_location, content_digest):
+                self._cleanup_uploads([s3_location])
+            # Content-addressed blobs may be shared with other texts, so only
+            # the reference is dropped; cleanup_expired_texts deletes the
+            # object once nothing references it
+            if content_digest:
+                self._release_blobs([content_digest])
+            
+            if hash_value:
                 try:
-                    file_key = self.storage_service.parse_s3_location(s3_location)
-                    self.storage_service.delete_text(file_key)
-                    print(f"Cleaned up S3 file: {file_key}")
-                except Exception as cleanup_error:
-                    print(f"Failed to cleanup S3 file {s3_location}: {cleanup_error}")
-                    # Log for manual cleanup
+                    self.text_repository.release_hash(hash_value)
+                except Exception as release_error:
+                    logging.error(f"Failed to release hash {hash_value}: {release_error}")
             
             # Re-raise original exception
             raise Exception(f"Failed to create text: {str(e)}") from e
+        
+        # Step 5: Warm the cache, new texts are often read right away
+        self._write_through([(text_entity, text)])
+        return text_entity
+    
+    def _write_through(self, created: list[tuple[TextEntity, str]]):
+        """Cache freshly created texts (small enough ones only); never fails the create"""
+        if self.write_through_max_bytes <= 0:
+            return
+        
+        entries = []
+        for text_entity, text in created:
+            # A character is at least one byte, so this skips large texts without encoding them
+            if len(text) > self.write_through_max_bytes:
+                continue
+            body = text_entity.inline_content
+            if body is None:
+                body = encode_text(text, self.storage_service.codec)
+            if len(body) <= self.write_through_max_bytes:
+                entries.append((text_entity.hash_value, text_entity, body, self.default_ttl))
+        
+        if not entries:
+            return
+        try:
+            self.cache_service.cache_complete_texts(entries)
+        except Exception as e:
+            logging.error(f"Failed to write through {len(entries)} created texts: {str(e)}")
+    
+    def start_text_upload(self, max_bytes: int) -> StreamedTextUpload:
+        """Begin a streamed creation for bodies too large to buffer in memory"""
+        return StreamedTextUpload(self, max_bytes)
+    
+    def reserve_upload(self, size: int, sha256: str, expiration_date: datetime) -> dict:
+        """Reserve a hash and a presigned PUT URL for a body the client uploads itself
+        
+        The text is only created by finalize_upload, once the object is in
+        place and matches the declared size and SHA-256. Reservations that
+        are never finalized are cleaned up by reap_expired_uploads.
+        """
+        sha256 = sha256.lower()
+        file_key = f"uploads/{uuid.uuid4()}.txt"
+        text_entity = TextEntity.create(f"s3://{self.storage_service.bucket_name}/{file_key}", expiration_date)
+        text_entity.hash_value = self.text_repository.reserve_hash()
+        
+        try:
+            upload_url = self.storage_service.presign_put(file_key, size, sha256, self.upload_url_ttl)
+            # Keep the reservation a little longer than the URL so a late PUT can still finalize
+            self.upload_store.put(text_entity, size, sha256, self.upload_url_ttl + 300)
+        except Exception as e:
+            self.text_repository.release_hash(text_entity.hash_value)
+            raise Exception(f"Failed to reserve upload: {str(e)}") from e
+        
+        return {
+            "hash_value": text_entity.hash_value,
+            "upload_url": upload_url,
+            "method": "PUT",
+            "headers": {
+                "Content-Type": "text/plain; charset=utf-8",
+                "x-amz-checksum-sha256": self.storage_service.checksum_sha256(sha256)
+            },
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.upload_url_ttl)
+        }
+    
+    def finalize_upload(self, hash_value: str) -> TextEntity:
+        """Verify a directly uploaded object and create its text; None if nothing is reserved"""
+        reservation = self.upload_store.get(hash_value)
+        if not reservation:
+            return None
+        # Keeps a concurrent finalize and the reaper off this reservation
+        if not self.upload_store.lock(hash_value):
+            raise UploadVerificationError("Upload is already being finalized")
+        
+        try:
+            text_entity = reservation["metadata"]
+            self._verify_upload(self.storage_service.parse_s3_location(text_entity.location), reservation)
+            # Idempotent: finalizing twice inserts the row once
+            text_entity = self.text_repository.persist(text_entity)
+        except Exception:
+            self.upload_store.unlock(hash_value)
+            raise
+        
+        self.upload_store.delete(hash_value)
+        return text_entity
+    
+    def _verify_upload(self, file_key: str, reservation: dict):
+        """Check an uploaded object against its reservation, raise UploadVerificationError if it doesn't match"""
+        # S3 computed the checksum while storing the object; nothing is downloaded for it
+        size, checksum = self.storage_service.object_checksum(file_key)
+        if size is None:
+            raise UploadVerificationError("Object has not been uploaded")
+        if size != reservation["size"]:
+            raise UploadVerificationError(f"Uploaded {size} bytes, expected {reservation['size']}")
+        if checksum != self.storage_service.checksum_sha256(reservation["sha256"]):
+            raise UploadVerificationError("Uploaded body does not match the declared SHA-256")
+        
+        # Bodies are served as UTF-8 text and sniffed for compression magic
+        # (which is never valid UTF-8), so anything else must not get in
+        if not self.storage_service.is_utf8_object(file_key):
+            raise UploadVerificationError("Uploaded body is not UTF-8 text")
+    
+    def reap_expired_uploads(self, limit: int = 100) -> int:
+        """Delete the objects of reservations never finalized and give their hashes back, return how many"""
+        reaped = 0
+        for hash_value in self.upload_store.expired(limit):
+            if not self.upload_store.lock(hash_value):
+                # Being finalized right now
+                continue
+            try:
+                reservation = self.upload_store.get(hash_value, include_expired=True)
+                # A finalize that stopped right after inserting the row did use them
+                if self.text_repository.get_text(hash_value) is None:
+                    if reservation:
+                        self._cleanup_uploads([reservation["metadata"].location])
+                    else:
+                        logging.warning(f"Upload reservation {hash_value} was gone before reaping; its object is left")
+                    self.text_repository.release_hash(hash_value)
+                self.upload_store.delete(hash_value)
+                reaped += 1
+            except Exception as e:
+                self.upload_store.unlock(hash_value)
+                logging.error(f"Failed to reap upload reservation {hash_value}: {e}")
+        return reaped
+    
+    def _create_text_write_behind(self, text: str, expiration_date: datetime) -> TextEntity:
+        """Fast-ack creation: assign a hash, park the text in Redis and return.
+        
+        TextPersistenceWorker writes it to storage and the database later;
+        until then reads are served from the pending record.
+        """
+        text_entity = TextEntity.create(PENDING_LOCATION, expiration_date)
+        text_entity.hash_value = self.text_repository.reserve_hash()
+        
+        try:
+            self.pending_store.put(text_entity, encode_text(text, self.storage_service.codec))
+        except Exception as e:
+            self.text_repository.release_hash(text_entity.hash_value)
+            raise Exception(f"Failed to create text: {str(e)}") from e
+        
+        return text_entity
+    
+    def persist_text(self, text_entity: TextEntity, text: str) -> TextEntity:
+        """Durably store a text whose hash is already assigned. Safe to retry:
+        the object key derives from the text id and the insert is idempotent."""
+        location, content_digest, inline_content = self._store_text(text, file_name=f"{text_entity.id}.txt")
+        text_entity.location = location
+        text_entity.content_digest = content_digest
+        text_entity.inline_content = inline_content
+        try:
+            return self.text_repository.persist(text_entity)
+        except Exception:
+            if content_digest:
+                self._release_blobs([content_digest])
+            # Every attempt appends a record of its own; the object key of
+            # a plain upload is shared with the retry, so that one stays
+            if is_segment_location(location):
+                self._cleanup_uploads([location])
+            raise
+    
+    def create_texts(self, items: list[tuple[str, datetime]]) -> list[dict]:
+        """Create many texts: concurrent uploads, one hash reservation, one INSERT
+        
+        Returns one result per item, in order. Items whose upload failed are
+        reported individually; if the database insert fails every uploaded
+        object is removed again and all remaining items are reported as failed.
+        """
+        results = [None] * len(items)
+        locations = [None] * len(items)
+        digests = [None] * len(items)
+        inline_contents = [None] * len(items)
+        
+        # Step 1: Upload all bodies concurrently (boto3 clients are thread-safe)
+        with ThreadPoolExecutor(max_workers=self.batch_upload_workers) as executor:
+            futures = [executor.submit(self._store_text, text) for text, _ in items]
+            for index, future in enumerate(futures):
+                try:
+                    locations[index], digests[index], inline_contents[index] = future.result()
+                except Exception as e:
+                    results[index] = {"index": index, "status": "failed", "error": str(e)}
+        
+        uploaded = [index for index, location in enumerate(locations) if location]
+        if not uploaded:
+            return results
+        
+        # Step 2: Create entities and insert them in a single transaction
+        entities = [
+            TextEntity.create(locations[index], items[index][1], digests[index], inline_contents[index])
+            for index in uploaded
+        ]
+        try:
+            created = self.text_repository.create_many(entities)
+        except Exception as e:
+            self._cleanup_uploads([
+                locations[index] for index in uploaded
+                if self._owns_upload(locations[index], digests[index])
+            ])
+            self._release_blobs([digests[index] for index in uploaded])
+            for index in uploaded:
+                results[index] = {"index": index, "status": "failed", "error": f"Failed to create text: {str(e)}"}
+            return results
+        
+        for index, text_entity in zip(uploaded, created):
+            results[index] = {"index": index, "status": "created", "text": text_entity}
+        
+        self._write_through([(text_entity, items[index][0]) for index, text_entity in zip(uploaded, created)])
+        return results
+    
+    def _store_text(self, text: str, file_name: str = None) -> tuple[str, str, bytes]:
+        """Store a body, return its location, content digest and inline bytes
+        
+        Texts up to INLINE_TEXT_MAX_BYTES are kept in the database row
+        (compressed like S3 bodies); larger ones are appended to a segment
+        when the segment backend is enabled, or uploaded to S3.
+        """
+        if self.inline_max_bytes > 0:
+            data = text.encode('utf-8')
+            if len(data) <= self.inline_max_bytes:
+                codec = self.storage_service.codec
+                return INLINE_LOCATION, None, codec.compress(data) if codec else data
+        
+        if self.segment_store:
+            return self.segment_store.append(text), None, None
+        
+        if self.storage_service.content_addressed:
+            digest = self.storage_service.content_digest(text)
+            # Referenced before the object is checked or stored, so cleanup
+            # can't delete it between here and the text's insert
+            self.text_repository.reference_blob(digest, self.storage_service.blob_location(digest))
+            try:
+                return self.storage_service.upload_blob(text, digest), digest, None
+            except Exception:
+                self._release_blobs([digest])
+                raise
+        return self.storage_service.upload_text(text, file_name=file_name), None, None
+    
+    def _stores_inline(self, text: str) -> bool:
+        """Whether _store_text keeps this text in the database row"""
+        if self.inline_max_bytes <= 0:
+            return False
+        # Cheap bounds first: UTF-8 needs 1 to 4 bytes per character
+        if len(text) * 4 <= self.inline_max_bytes:
+            return True
+        if len(text) > self.inline_max_bytes:
+            return False
+        return len(text.encode('utf-8')) <= self.inline_max_bytes
+    
+    def _release_blobs(self, digests: list[str]):
+        """Give back blob references of texts that were not created"""
+        try:
+            self.text_repository.release_blobs(digests)
+        except Exception as e:
+            logging.error(f"Failed to release references to blobs {digests}: {e}")
+    
+    def _owns_upload(self, location: str, content_digest: str) -> bool:
+        """Whether a failed create should delete this object (not inline, not shared)"""
+        return location != INLINE_LOCATION and not content_digest
+    
+    def cleanup_expired_texts(self) -> int:
+        """Remove expired texts and delete blobs no remaining text references"""
+        expired_hashes = self.text_repository.expire_texts()
+        
+        # Cached copies would otherwise keep serving until their TTL runs out
+        try:
+            self.cache_service.invalidate(expired_hashes)
+        except Exception as e:
+            logging.error(f"Failed to invalidate {len(expired_hashes)} expired texts in cache: {e}")
+        
+        # Full batches may leave more behind
+        while self.text_repository.delete_unreferenced_blobs(self._delete_object, BLOB_CLEANUP_BATCH) == BLOB_CLEANUP_BATCH:
+            pass
+        
+        return len(expired_hashes)
+    
+    def _delete_object(self, location: str):
+        self.storage_service.delete_text(self.storage_service.parse_s3_location(location))
+    
+    def _cleanup_uploads(self, locations: list[str]):
+        """Compensating cleanup for uploads whose rows were never written"""
+        # Segment records can't be deleted on their own; give their bytes back to compaction
+        segment_locations = [location for location in locations if is_segment_location(location)]
+        if segment_locations and self.segment_store:
+            try:
+                self.segment_store.release(segment_locations)
+            except Exception as cleanup_error:
+                logging.error(f"Failed to release segment records {segment_locations}: {cleanup_error}")
+        
+        def delete(location):
+            try:
+                self.storage_service.delete_text(self.storage_service.parse_s3_location(location))
+            except Exception as cleanup_error:
+                logging.error(f"Failed to cleanup S3 file {location}: {cleanup_error}")
+        
+        object_locations = [location for location in locations if not is_segment_location(location)]
+        if len(object_locations) == 1:
+            delete(object_locations[0])
+        elif object_locations:
+            with ThreadPoolExecutor(max_workers=self.batch_upload_workers) as executor:
+                list(executor.map(delete, object_locations))
     
     def get_text_metadata(self, hash_value: str) -> TextEntity:
         """Get text metadata only (no content)"""
         return self.text_repository.get_active_text(hash_value)
     
+    def get_active_metadata(self, hash_value: str) -> TextEntity:
+        """Metadata of an active text, from the cache when possible, never loading content
+        
+        Enough to answer conditional requests: texts never change once created.
+        """
+        metadata = self.cache_service.get_cached_metadata(hash_value)
+        
+        if not metadata:
+            pending = self._get_pending_text(hash_value)
+            if pending:
+                return pending["metadata"]
+            
+            if self.hash_filter and not self._might_exist(hash_value):
+                return None
+            
+            text_model = self.text_repository.get_active_text(hash_value)
+            if not text_model:
+                return None
+            metadata = TextEntity.from_model(text_model)
+            ttl = self.cache_service.capped_ttl(metadata, self._get_dynamic_ttl(hash_value))
+            if ttl > 0:
+                self.cache_service.cache_text_metadata(hash_value, metadata, ttl)
+        
+        # Cached entries may outlive the text by a little
+        expiration_date = metadata.expiration_date
+        if expiration_date and expiration_date.tzinfo is None:
+            expiration_date = expiration_date.replace(tzinfo=timezone.utc)
+        if expiration_date and expiration_date <= datetime.now(timezone.utc):
+            return None
+        return metadata
+    
     def get_text_content_only(self, location: str) -> str:
         """Get text content from storage location"""
+        return decode_body(self.get_text_body_only(location))
+    
+    def get_text_body_only(self, location: str) -> bytes:
+        """Get the stored (possibly compressed) body from storage location"""
+        if is_segment_location(location):
+            _, key, offset, length = parse_segment_location(location)
+            return self.storage_service.get_text_range(key, offset, length)
+        
         file_key = self.storage_service.parse_s3_location(location)
-        return self.storage_service.get_text_content(file_key)
+        return self.storage_service.get_text_body(file_key)
     
     def get_full_text(self, hash_value: str) -> tuple[TextEntity, str]:
         """Get both metadata and content"""
+        text_entity, body = self.get_full_text_body(hash_value)
+        if not text_entity:
+            return None, None
+        return text_entity, decode_body(body)
+    
+    def get_full_text_body(self, hash_value: str) -> tuple[TextEntity, bytes]:
+        """Get both metadata and the stored body bytes"""
         # Get metadata from database
         text_entity = self.text_repository.get_active_text(hash_value)
         if not text_entity:
             return None, None
         
-        # Get content from storage
-        content = self.get_text_content_only(text_entity.location)
-        return text_entity, content
+        # Small texts come with the row, larger ones from storage
+        if text_entity.inline_content is not None:
+            return text_entity, text_entity.inline_content
+        
+        body = self.get_text_body_only(text_entity.location)
+        return text_entity, body
     
     def get_text_with_content(self, hash_value: str) -> dict:
         try:
@@ -123,41 +649,216 @@ class TextService:
         except Exception as e:
             logging.error(f"Failed to get text {hash_value}: {str(e)}")
             return None
+    
+    def get_text_with_body(self, hash_value: str) -> dict:
+        """Like get_text_with_content, with the body left as stored bytes"""
+        try:
+            text_entity, body = self.get_full_text_body(hash_value)
+            if not text_entity:
+                return None
+            
+            return {
+                "metadata": text_entity,
+                "body": body
+            }
+        
+        except Exception as e:
+            logging.error(f"Failed to get text {hash_value}: {str(e)}")
+            return None
 
     def get_text(self, hash_value: str) -> dict:
         """Thread-safe cache check and population"""
+        result = self.get_text_body(hash_value)
+        if not result:
+            return None
+        
+        return {
+            "metadata": result["metadata"],
+            "content": decode_body(result["body"]),
+            "from_cache": result["from_cache"]
+        }
+
+    def get_text_body(self, hash_value: str) -> dict:
+        """Like get_text, but returns the body as stored (possibly compressed) bytes"""
         
         # Try atomic cache read first (if cache service supports it)
-        complete_cached = self.cache_service.get_complete_text(hash_value)
+        complete_cached = self.cache_service.get_complete_text_body(hash_value)
         if complete_cached:
             return {**complete_cached, "from_cache": True}
         
-        # If not in cache, use double-check locking pattern
-        with self._cache_lock:
-            # Double-check: maybe another thread just cached it
-            complete_cached = self.cache_service.get_complete_text(hash_value)
-            if complete_cached:
-                return {**complete_cached, "from_cache": True}
-            
+        # Fast-acked texts are read from their pending record until the
+        # persister has written them (it is already in Redis, no need to cache)
+        pending = self._get_pending_text(hash_value)
+        if pending:
+            return {**pending, "from_cache": False}
+        
+        if self.hash_filter and not self._might_exist(hash_value):
+            return None
+        
+        # Concurrent misses for this hash share one load; other hashes load in parallel
+        result, _ = _text_loads.do(hash_value, lambda: self._load_text_body(hash_value))
+        return {**result} if result else None
+    
+    def _load_text_body(self, hash_value: str) -> dict:
+        """Load a missed text from the database/storage and cache it"""
+        # Double-check: a load that just finished may have cached it
+        complete_cached = self.cache_service.get_complete_text_body(hash_value)
+        if complete_cached:
+            return {**complete_cached, "from_cache": True}
+        
+        lease = None
+        if self.load_lease_ms > 0:
+            lease = self.cache_service.acquire_load_lease(hash_value, self.load_lease_ms)
+            if lease is None:
+                # Another worker is loading it; use its result unless it takes too long
+                complete_cached = self._wait_for_load(hash_value)
+                if complete_cached:
+                    return {**complete_cached, "from_cache": True}
+        
+        try:
             # Get from database/storage
-            response = self.get_text_with_content(hash_value)
-            if not response:
+            try:
+                text_entity, body = self.get_full_text_body(hash_value)
+            except Exception as e:
+                logging.error(f"Failed to get text {hash_value}: {str(e)}")
                 return None
+            if not text_entity:
+                self._mark_missing(hash_value)
+                return None
+            response = {"metadata": text_entity, "body": body}
             
-            # Atomically cache both metadata and content
+            # Atomically cache both metadata and content, keeping the body
+            # compressed exactly as it is stored
             ttl = self._get_dynamic_ttl(hash_value)
             self.cache_service.cache_complete_text(
                 hash_value, 
                 response["metadata"], 
-                response["content"], 
+                response["body"], 
                 ttl
             )
             
             return {
                 "metadata": response["metadata"],
-                "content": response["content"],
+                "body": response["body"],
                 "from_cache": False
             }
+        finally:
+            if lease:
+                self.cache_service.release_load_lease(hash_value, lease)
+    
+    def open_text_body(self, hash_value: str) -> dict:
+        """Like get_text_body, except that texts stored as their own object aren't read on a miss
+        
+        Those come back as {"metadata", "file_key", "from_cache": False}, for
+        the caller to pass to stream_text_object; everything else as from
+        get_text_body.
+        """
+        complete_cached = self.cache_service.get_complete_text_body(hash_value)
+        if complete_cached:
+            return {**complete_cached, "from_cache": True}
+        
+        pending = self._get_pending_text(hash_value)
+        if pending:
+            return {**pending, "from_cache": False}
+        
+        if self.hash_filter and not self._might_exist(hash_value):
+            return None
+        
+        text_entity = self.text_repository.get_active_text(hash_value)
+        if not text_entity:
+            self._mark_missing(hash_value)
+            return None
+        
+        if text_entity.inline_content is None and not is_segment_location(text_entity.location):
+            return {
+                "metadata": text_entity,
+                "file_key": self.storage_service.parse_s3_location(text_entity.location),
+                "from_cache": False
+            }
+        
+        # Inline and segment bodies are small: read and cache them right away
+        body = text_entity.inline_content
+        if body is None:
+            body = self.get_text_body_only(text_entity.location)
+        self._fill_cache(hash_value, text_entity, body)
+        return {"metadata": text_entity, "body": body, "from_cache": False}
+    
+    def stream_text_object(self, hash_value: str, metadata, file_key: str,
+                           start: int = None, end: int = None) -> tuple[Iterator[bytes], int, int]:
+        """Stream a stored body (or its bytes start..end) from storage in chunks
+        
+        Returns the chunks, their total length and the size of the whole
+        body. A complete body up to TEXT_STREAM_CACHE_MAX_BYTES is cached in
+        the background once the last chunk has been handed out.
+        """
+        body, length, total = self.storage_service.open_text_stream(file_key, start, end)
+        fill_cache = start is None and length <= self.stream_cache_max_bytes
+        
+        def chunks():
+            buffered = [] if fill_cache else None
+            try:
+                for chunk in body.iter_chunks(self.stream_chunk_bytes):
+                    if buffered is not None:
+                        buffered.append(chunk)
+                    yield chunk
+            finally:
+                body.close()
+            # Only reached if the client took the whole body
+            if buffered is not None:
+                _get_cache_fill_executor().submit(self._fill_cache, hash_value, metadata, b"".join(buffered))
+        
+        return chunks(), length, total
+    
+    def _fill_cache(self, hash_value: str, metadata, body: bytes):
+        try:
+            ttl = self._get_dynamic_ttl(hash_value)
+            self.cache_service.cache_complete_text(hash_value, metadata, body, ttl)
+        except Exception as e:
+            logging.error(f"Failed to cache text {hash_value}: {str(e)}")
+    
+    def _mark_missing(self, hash_value: str):
+        """Remember false positives of the hash filter for a while"""
+        if not self.hash_filter:
+            return
+        try:
+            self.hash_filter.mark_missing(hash_value)
+        except Exception as e:
+            logging.error(f"Failed to cache missing text {hash_value}: {str(e)}")
+    
+    def _might_exist(self, hash_value: str) -> bool:
+        """Ask the hash filter; if it can't answer, fall back to the database"""
+        try:
+            return self.hash_filter.might_exist(hash_value)
+        except Exception as e:
+            logging.error(f"Hash filter lookup failed for {hash_value}: {str(e)}")
+            return True
+    
+    def _wait_for_load(self, hash_value: str) -> dict:
+        """Wait for the lease holder to release, then read what it cached"""
+        deadline = time.monotonic() + self.load_lease_wait_ms / 1000
+        while time.monotonic() < deadline and self.cache_service.load_lease_held(hash_value):
+            time.sleep(0.01)
+        return self.cache_service.get_complete_text_body(hash_value)
+    
+    def _get_pending_text(self, hash_value: str) -> dict:
+        """Pending (not yet persisted) text, if write-behind is enabled and it hasn't expired"""
+        if not self.pending_store:
+            return None
+        
+        try:
+            pending = self.pending_store.get(hash_value)
+        except Exception as e:
+            logging.error(f"Failed to read pending text {hash_value}: {str(e)}")
+            return None
+        
+        if not pending:
+            return None
+        expiration_date = pending["metadata"].expiration_date
+        if expiration_date and expiration_date.tzinfo is None:
+            expiration_date = expiration_date.replace(tzinfo=timezone.utc)
+        if expiration_date and expiration_date <= datetime.now(timezone.utc):
+            return None
+        return pending
     
     def upload_text_to_s3(self, text: str) -> str:
         """
@@ -1,11 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 import uuid 
 from app.infrastructure.database.models import Texts as TextModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 
-@dataclass
+@dataclass(slots=True)
 class Text:
     id: int
     location: str
@@ -13,9 +13,13 @@ class Text:
     hash_value: str
     created_at: datetime
     updated_at: datetime
+    content_digest: Optional[str] = None
+    # Body of small texts stored in the row itself (as stored, possibly compressed)
+    inline_content: Optional[bytes] = field(default=None, repr=False)
 
     @classmethod
-    def create(cls, location: str, expiration_date: datetime) -> 'Text':
+    def create(cls, location: str, expiration_date: datetime, content_digest: Optional[str] = None,
+               inline_content: Optional[bytes] = None) -> 'Text':
         now = datetime.now(timezone.utc)
         return cls(
             id=str(uuid.uuid4()),
@@ -23,9 +27,27 @@ class Text:
             expiration_date=expiration_date,
             hash_value=None,
             created_at=now,
-            updated_at=now
+            updated_at=now,
+            content_digest=content_digest,
+            inline_content=inline_content
         )
 
+    @classmethod
+    def from_fields(cls, id, location: str, expiration_date: Optional[datetime], hash_value: str,
+                    created_at: Optional[datetime], updated_at: Optional[datetime],
+                    content_digest: Optional[str] = None) -> 'Text':
+        """Fast path for already-typed values (binary cache records): no parsing, no __init__"""
+        text = object.__new__(cls)
+        text.id = id
+        text.location = location
+        text.expiration_date = expiration_date
+        text.hash_value = hash_value
+        text.created_at = created_at
+        text.updated_at = updated_at
+        text.content_digest = content_digest
+        text.inline_content = None
+        return text
+
     @classmethod
     def from_model(cls, text_model: TextModel) -> 'Text':
         return cls(
@@ -34,9 +56,17 @@ class Text:
             expiration_date=text_model.expiration_date,
             hash_value=text_model.hash_value,
             created_at=text_model.created_at,
-            updated_at=text_model.updated_at
+            updated_at=text_model.updated_at,
+            content_digest=text_model.content_digest,
+            inline_content=text_model.inline_content
         )
 
+    def without_content(self) -> 'Text':
+        """The metadata alone: a copy without the inline body, or the entity itself if it has none"""
+        if self.inline_content is None:
+            return self
+        return replace(self, inline_content=None)
+
     def to_dict(self) -> dict:
         """Convert entity to dictionary for serialization"""
         return {
@@ -45,7 +75,8 @@ class Text:
             "expiration_date": self.expiration_date.isoformat() if self.expiration_date else None,
             "hash_value": getattr(self, 'hash_value', None),
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "content_digest": self.content_digest
         }
     
     @classmethod
@@ -60,5 +91,6 @@ class Text:
             expiration_date=datetime.fromisoformat(data["expiration_date"]),
             hash_value=data.get("hash_value"),
             created_at=datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None,
-            updated_at=datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else None
+            updated_at=datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else None,
+            content_digest=data.get("content_digest")
         )
\ No newline at end of file
@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+class HashAllocator(ABC):
+    """Abstract source of short hashes for new texts"""
+
+    @abstractmethod
+    def take(self) -> Optional[str]:
+        """Hand out one unused hash, or None if none is available"""
+        pass
+
+    @abstractmethod
+    def give_back(self, hash_value: str) -> None:
+        """Return a hash that ended up unused"""
+        pass
+
+    def close(self) -> None:
+        """Release reserved hashes (called on shutdown)"""
+        pass
+
+    def stats(self) -> dict:
+        """Allocator state for health checks"""
+        return {}
@@ -9,6 +9,11 @@ class TextRepository(ABC):
         """Create a new text entry"""
         pass
     
+    @abstractmethod
+    def create_many(self, texts: list[TextEntity]) -> list[TextEntity]:
+        """Create several text entries in one transaction"""
+        pass
+    
     @abstractmethod
     def get_text(self, hash_value: str) -> TextEntity:
         """Get text by hash value"""
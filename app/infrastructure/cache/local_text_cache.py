@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.infrastructure.database.redis_client import create_redis_client
+
+# Rough per-entry overhead of the metadata and bookkeeping, counted against the byte budget
+ENTRY_OVERHEAD_BYTES = 512
+
+
+class LocalTextCache:
+    """Per-process (L1) cache of complete texts in front of Redis.
+
+    Entries are {"metadata", "body"} dicts, evicted least recently used once
+    the stored bodies exceed `max_bytes`, and expire after `ttl` seconds (or
+    at the text's expiration, if sooner). Other processes invalidate entries
+    over Redis pub/sub (see get_local_text_cache).
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 30):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries: OrderedDict[str, tuple[float, int, dict]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stopped = threading.Event()
+
+    def get(self, hash_value: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(hash_value)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._remove(hash_value)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(hash_value)
+            self._hits += 1
+        return entry[2]
+
+    def put(self, hash_value: str, value: dict, ttl: Optional[float] = None):
+        """Cache a {"metadata", "body"} entry; bodies larger than a quarter of the budget are skipped"""
+        size = len(value["body"]) + ENTRY_OVERHEAD_BYTES
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or size > self.max_bytes // 4:
+            return
+
+        with self._lock:
+            if hash_value in self._entries:
+                self._remove(hash_value)
+            self._entries[hash_value] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, hash_values: list[str]):
+        with self._lock:
+            for hash_value in hash_values:
+                if hash_value in self._entries:
+                    self._remove(hash_value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, hash_value: str):
+        _, size, _ = self._entries.pop(hash_value)
+        self._bytes -= size
+
+    def close(self):
+        self._stopped.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+            }
+
+
+INVALIDATION_CHANNEL = "text_cache_invalidation"
+
+_local_cache: Optional[LocalTextCache] = None
+_local_cache_lock = threading.Lock()
+_subscriber: Optional[threading.Thread] = None
+
+
+def get_local_text_cache() -> Optional[LocalTextCache]:
+    """Process-wide L1 cache, or None unless TEXT_L1_CACHE_MAX_BYTES is set"""
+    global _local_cache, _subscriber
+    max_bytes = int(os.getenv("TEXT_L1_CACHE_MAX_BYTES", "0"))
+    if max_bytes <= 0:
+        return None
+
+    with _local_cache_lock:
+        if _local_cache is None:
+            redis_client = create_redis_client()
+            _local_cache = LocalTextCache(max_bytes, ttl=float(os.getenv("TEXT_L1_CACHE_TTL_SECONDS", "30")))
+            _subscriber = threading.Thread(
+                target=_listen_for_invalidations, args=(redis_client, _local_cache), daemon=True
+            )
+            _subscriber.start()
+        return _local_cache
+
+
+def _listen_for_invalidations(redis_client, local_cache: LocalTextCache):
+    """Drop entries other processes invalidated; reconnects until the cache is closed"""
+    while not local_cache._stopped.is_set():
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Anything published while we were not listening is unknown, so start clean
+            local_cache.clear()
+            while not local_cache._stopped.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message and message["type"] == "message":
+                    data = message["data"]
+                    data = data.decode() if isinstance(data, bytes) else data
+                    local_cache.invalidate(data.split(","))
+            pubsub.close()
+        except Exception as e:
+            logging.error(f"Text cache invalidation listener error: {e}")
+            time.sleep(1)
+
+
+def close_local_text_cache():
+    """Stop the invalidation listener (call on shutdown)"""
+    global _local_cache
+    with _local_cache_lock:
+        if _local_cache is not None:
+            _local_cache.close()
+            _local_cache = None
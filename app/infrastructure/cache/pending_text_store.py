@@ -0,0 +1,74 @@
+from redis import Redis
+from redis.exceptions import ResponseError
+import json
+from datetime import timezone
+from app.domain.entities.text import Text as TextEntity
+
+class PendingTextStore:
+    """Texts acknowledged to the client but not yet persisted to S3 and Postgres.
+
+    Each text is kept as a Redis hash (metadata + body) and announced on the
+    `text_persistence` stream, which TextPersistenceWorker drains. The record
+    is deleted only after the database row is committed, so readers that check
+    here before the database never miss a text. Records expire with their
+    text; texts the worker gives up on are moved aside (see dead_letter).
+    """
+
+    def __init__(self, redis_client: Redis):
+        self.redis = redis_client
+        self.pending_prefix = "text_pending:"
+        self.dead_letter_prefix = "text_pending_dead:"
+        self.stream_key = "text_persistence"
+
+    def put(self, text_entity: TextEntity, body: bytes) -> str:
+        """Store a text and enqueue it for persistence in one round trip"""
+        key = f"{self.pending_prefix}{text_entity.hash_value}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(
+            key,
+            mapping={
+                "metadata": json.dumps(text_entity.to_dict()),
+                "body": body
+            }
+        )
+        if text_entity.expiration_date:
+            expiration_date = text_entity.expiration_date
+            if expiration_date.tzinfo is None:
+                expiration_date = expiration_date.replace(tzinfo=timezone.utc)
+            pipe.expireat(key, expiration_date)
+        pipe.xadd(self.stream_key, {"hash_value": text_entity.hash_value})
+        return pipe.execute()[-1]
+
+    def get(self, hash_value: str) -> dict:
+        """Get a pending text as {"metadata", "body"}, or None"""
+        data = self.redis.hgetall(f"{self.pending_prefix}{hash_value}")
+        if not data:
+            return None
+
+        metadata = data.get(b"metadata", data.get("metadata"))
+        body = data.get(b"body", data.get("body"))
+        return {
+            "metadata": TextEntity.from_dict(json.loads(metadata)),
+            "body": body.encode('utf-8') if isinstance(body, str) else body
+        }
+
+    def delete(self, hash_value: str):
+        """Drop a pending text once it is persisted"""
+        self.redis.delete(f"{self.pending_prefix}{hash_value}")
+
+    def dead_letter(self, hash_value: str, ttl: int) -> bool:
+        """Stop serving a text that could not be persisted, keeping it `ttl` seconds for replay
+
+        Returns False if there was no pending record (left) to move.
+        """
+        key = f"{self.dead_letter_prefix}{hash_value}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.rename(f"{self.pending_prefix}{hash_value}", key)
+        pipe.expire(key, ttl)
+        try:
+            pipe.execute()
+        except ResponseError as e:
+            if "no such key" not in str(e).lower():
+                raise
+            return False
+        return True
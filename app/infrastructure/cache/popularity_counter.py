@@ -0,0 +1,90 @@
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Optional
+
+from redis import Redis
+
+from app.infrastructure.database.redis_client import create_redis_client
+
+POPULARITY_KEY = "text_popularity:daily"
+
+
+class PopularityCounter:
+    """Counts cache hits per text and adds them to the daily popularity set in batches.
+
+    Cache reads are single GETs, so instead of a ZINCRBY per hit the counts
+    are collected in-process and flushed in one pipeline every
+    `flush_interval` seconds (immediately if it is 0).
+    """
+
+    def __init__(self, redis_client: Redis, flush_interval: float = 5, key: str = POPULARITY_KEY):
+        self.redis = redis_client
+        self.flush_interval = flush_interval
+        self.key = key
+
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def record(self, hash_value: str):
+        if self.flush_interval <= 0:
+            self._write({hash_value: 1})
+            return
+        with self._lock:
+            self._counts[hash_value] += 1
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write the counts collected since the last flush"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if counts:
+            self._write(counts)
+
+    def _write(self, counts: dict):
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for hash_value, count in counts.items():
+                pipe.zincrby(self.key, count, hash_value)
+            pipe.expire(self.key, 86400)
+            pipe.execute()
+        except Exception as e:
+            logging.error(f"Failed to record popularity of {len(counts)} texts: {e}")
+
+    def close(self):
+        self._stopped.set()
+        self.flush()
+
+
+_popularity_counter: Optional[PopularityCounter] = None
+_popularity_counter_lock = threading.Lock()
+
+
+def get_popularity_counter() -> PopularityCounter:
+    """Process-wide counter, flushed every TEXT_POPULARITY_FLUSH_SECONDS"""
+    global _popularity_counter
+    with _popularity_counter_lock:
+        if _popularity_counter is None:
+            _popularity_counter = PopularityCounter(
+                create_redis_client(),
+                flush_interval=float(os.getenv("TEXT_POPULARITY_FLUSH_SECONDS", "5")),
+            )
+        return _popularity_counter
+
+
+def close_popularity_counter():
+    """Flush pending counts (call on shutdown)"""
+    global _popularity_counter
+    with _popularity_counter_lock:
+        if _popularity_counter is not None:
+            _popularity_counter.close()
+            _popularity_counter = None
@@ -0,0 +1,105 @@
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.domain.entities.text import Text as TextEntity
+
+# Cache record layout (version 1), one Redis string per text:
+#
+#   magic "TC" | version | flags | id (16 bytes) | created_at | updated_at |
+#   expiration_date (int64 microseconds since the epoch each) |
+#   hash length (1 byte) | location length (2 bytes) | digest length (1 byte) |
+#   hash | location | content digest (UTF-8) | body (as stored)
+#
+# A record without a body only answers metadata lookups.
+RECORD_MAGIC = b"TC"
+RECORD_VERSION = 1
+FLAG_METADATA_ONLY = 0x01
+
+HEADER = struct.Struct(">2sBB16sqqqBHB")
+# Enough to read the metadata of almost any record in one GETRANGE
+METADATA_PREFIX_BYTES = 512
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_NO_TIME = -(2 ** 63)
+
+
+def _encode_time(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NO_TIME
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _decode_time(value: int) -> Optional[datetime]:
+    return None if value == _NO_TIME else _EPOCH + timedelta(microseconds=value)
+
+
+def encode_text_record(metadata, body: Optional[bytes]) -> bytes:
+    """Record for a Text entity or Texts model and its stored body (None for metadata only)"""
+    hash_value = metadata.hash_value.encode()
+    location = (metadata.location or "").encode()
+    digest = (metadata.content_digest or "").encode()
+    header = HEADER.pack(
+        RECORD_MAGIC, RECORD_VERSION, FLAG_METADATA_ONLY if body is None else 0,
+        uuid.UUID(str(metadata.id)).bytes,
+        _encode_time(metadata.created_at),
+        _encode_time(metadata.updated_at),
+        _encode_time(metadata.expiration_date),
+        len(hash_value), len(location), len(digest),
+    )
+    return b"".join((header, hash_value, location, digest, body or b""))
+
+
+def _decode_metadata(data: bytes) -> tuple[Optional[TextEntity], int, int]:
+    """(metadata, flags, offset of the body), metadata None if data is not a readable record
+
+    If data is just a prefix of a record, the offset may lie past its end.
+    """
+    if len(data) < HEADER.size:
+        return None, 0, HEADER.size
+    (magic, version, flags, id_bytes, created_at, updated_at, expiration_date,
+     hash_length, location_length, digest_length) = HEADER.unpack_from(data)
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        return None, 0, 0
+
+    start = HEADER.size
+    end = start + hash_length + location_length + digest_length
+    if len(data) < end:
+        return None, flags, end
+
+    location_start = start + hash_length
+    digest_start = location_start + location_length
+    metadata = TextEntity.from_fields(
+        uuid.UUID(bytes=id_bytes),
+        data[location_start:digest_start].decode(),
+        _decode_time(expiration_date),
+        data[start:location_start].decode(),
+        _decode_time(created_at),
+        _decode_time(updated_at),
+        data[digest_start:end].decode() or None,
+    )
+    return metadata, flags, end
+
+
+def decode_text_record(data: bytes) -> Optional[tuple[TextEntity, bytes]]:
+    """(metadata, body) of a complete record; None for metadata-only or unknown records"""
+    metadata, flags, body_start = _decode_metadata(data)
+    if metadata is None or flags & FLAG_METADATA_ONLY:
+        return None
+    return metadata, data[body_start:]
+
+
+def decode_text_record_metadata(prefix: bytes) -> tuple[Optional[TextEntity], int]:
+    """Metadata from the start of a record
+
+    Returns (metadata, 0) on success, (None, n) if the first n bytes are
+    needed and (None, 0) if the prefix isn't a readable record.
+    """
+    metadata, _, end = _decode_metadata(prefix)
+    if metadata is not None:
+        return metadata, 0
+    return None, end if end > len(prefix) else 0
@@ -1,106 +1,80 @@
 from redis import Redis
-import json
 import os
-from datetime import timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from app.domain.entities.text import Text as TextEntity
+from app.infrastructure.storage.codecs import get_codec, encode_text, decode_body
+from app.infrastructure.cache.local_text_cache import LocalTextCache, INVALIDATION_CHANNEL
+from app.infrastructure.cache.popularity_counter import PopularityCounter, get_popularity_counter
+from app.infrastructure.cache.text_cache_record import (
+    METADATA_PREFIX_BYTES, encode_text_record, decode_text_record, decode_text_record_metadata
+)
 
 class TextCacheService:
-    def __init__(self, redis_client: Redis):
+    """Texts cached in Redis as one binary record per text (see text_cache_record)
+    
+    A hit is a single GET; metadata-only lookups read just the start of the
+    record with GETRANGE. Hits are counted towards popularity in batches.
+    """
+    def __init__(self, redis_client: Redis, local_cache: LocalTextCache = None,
+                 popularity_counter: PopularityCounter = None):
+        # Records hold the body as stored, so the client must not decode responses
         self.redis = redis_client
-        self.metadata_prefix = "text_meta:"
-        self.content_prefix = "text_content:"
+        # Optional in-process (L1) cache consulted before Redis
+        self.local_cache = local_cache
+        self.popularity = popularity_counter or get_popularity_counter()
+        self.codec = get_codec()
+        self.record_prefix = "text_record:"
         self.popularity_prefix = "text_popularity:"
+        self.load_lease_prefix = "text_load_lease:"
         self.default_ttl = int(os.getenv("CACHE_TTL_SECONDS", "10800"))  # 3 hours
         self.popular_ttl = int(os.getenv("POPULAR_CACHE_TTL_SECONDS", "21600"))  # 6 hours
-        
-        # Lua script for atomic get-and-increment
-        self._get_and_increment_script = self.redis.register_script("""
-            local key = KEYS[1]
-            local popularity_key = KEYS[2]
-            local cached = redis.call('GET', key)
-            if cached then
-                redis.call('ZINCRBY', popularity_key, 1, ARGV[1])
-                redis.call('EXPIRE', popularity_key, 86400)
-                return cached
-            else
-                return nil
-            end
-        """)
-        
-        # New Lua script for complete text with popularity
-        self._get_complete_text_script = self.redis.register_script("""
-            local meta_key = KEYS[1]
-            local content_key = KEYS[2]
-            local popularity_key = KEYS[3]
-            local hash_value = ARGV[1]
-            
-            local metadata = redis.call('GET', meta_key)
-            local content = redis.call('GET', content_key)
-            
-            if metadata and content then
-                redis.call('ZINCRBY', popularity_key, 1, hash_value)
-                redis.call('EXPIRE', popularity_key, 86400)
-                return {metadata, content}
-            else
-                return nil
+    
+        # Release a load lease only if we still hold it (it may have expired)
+        self._release_lease_script = self.redis.register_script("""
+            if redis.call('GET', KEYS[1]) == ARGV[1] then
+                return redis.call('DEL', KEYS[1])
             end
+            return 0
         """)
     
+    def _record_key(self, hash_value: str) -> str:
+        return f"{self.record_prefix}{hash_value}"
+    
     def get_text_metadata(self, hash_value: str) -> TextEntity:
-        """Thread-safe get with popularity increment"""
-        cached = self._get_and_increment_script(
-            keys=[
-                f"{self.metadata_prefix}{hash_value}",
-                f"{self.popularity_prefix}daily"
-            ],
-            args=[hash_value]
-        )
-        
-        if cached:
-            return TextEntity.from_dict(json.loads(cached))
-        return None
+        """Metadata from the cached record, without transferring the body"""
+        key = self._record_key(hash_value)
+        metadata, needed = decode_text_record_metadata(self.redis.getrange(key, 0, METADATA_PREFIX_BYTES - 1))
+        if needed:
+            # Unusually long location: fetch exactly the metadata part
+            metadata, _ = decode_text_record_metadata(self.redis.getrange(key, 0, needed - 1))
+        if metadata:
+            self.popularity.record(hash_value)
+        return metadata
+    
+    def get_cached_metadata(self, hash_value: str) -> TextEntity:
+        """Metadata from the L1 cache or Redis, without touching the content"""
+        if self.local_cache:
+            cached = self.local_cache.get(hash_value)
+            if cached:
+                self.popularity.record(hash_value)
+                return cached["metadata"]
+        return self.get_text_metadata(hash_value)
     
     def cache_text_metadata(self, hash_value: str, text_entity: TextEntity, ttl: int = None):
-        """Cache text metadata"""
-        ttl = ttl or self.default_ttl
-        self.redis.setex(
-            f"{self.metadata_prefix}{hash_value}",
-            ttl,
-            text_entity.model_dump_json()
-        )
-    
-    def get_text_content(self, hash_value: str) -> str:
-        """Thread-safe get with popularity increment"""
-        cached = self._get_and_increment_script(
-            keys=[
-                f"{self.content_prefix}{hash_value}",
-                f"{self.popularity_prefix}daily"
-            ],
-            args=[hash_value]
-        )
-        
-        return cached.decode('utf-8') if cached else None
-    
-    def cache_text_content(self, hash_value: str, content: str, ttl: int = None):
-        """Cache text content"""
+        """Cache metadata alone; never replaces a complete record"""
         ttl = ttl or self.default_ttl
-        self.redis.setex(
-            f"{self.content_prefix}{hash_value}",
-            ttl,
-            content
-        )
+        self.redis.set(self._record_key(hash_value), encode_text_record(text_entity, None), ex=ttl, nx=True)
+    
+    def _encode_content(self, content) -> bytes:
+        """Compress text with the configured codec; stored bytes pass through"""
+        if isinstance(content, str):
+            return encode_text(content, self.codec)
+        return content
     
     def _increment_popularity(self, hash_value: str):
-        """Thread-safe popularity increment with error handling"""
-        try:
-            # ZINCRBY is atomic in Redis
-            pipe = self.redis.pipeline()
-            pipe.zincrby(f"{self.popularity_prefix}daily", 1, hash_value)
-            pipe.expire(f"{self.popularity_prefix}daily", 86400)
-            pipe.execute()
-        except Exception as e:
-            # Log error but don't fail the main operation
-            print(f"Failed to increment popularity for {hash_value}: {e}")
+        """Count a view towards the text's popularity (flushed in batches)"""
+        self.popularity.record(hash_value)
     
     def get_popular_texts(self, limit: int = 100) -> list:
         """Get most popular text hashes"""
@@ -115,31 +89,91 @@ class TextCacheService:
             # If Redis fails, assume not popular
             return False
     
-    def cache_complete_text(self, hash_value: str, metadata: TextEntity, content: str, ttl: int = None):
-        """Atomically cache both metadata and content"""
-        ttl = ttl or self.default_ttl
-        
-        # Use Redis pipeline for atomic multi-operation
+    def cache_complete_text(self, hash_value: str, metadata: TextEntity, content, ttl: int = None):
+        """Cache metadata and content (str, or body bytes as stored) as one record"""
+        self.cache_complete_texts([(hash_value, metadata, content, ttl)])
+    
+    def cache_complete_texts(self, entries: list[tuple]):
+        """Cache several (hash_value, metadata, content, ttl) entries in one round trip
+    
+        TTLs are capped at each text's expiration; texts that have already
+        expired are skipped.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for hash_value, metadata, content, ttl in entries:
+            ttl = self.capped_ttl(metadata, ttl or self.default_ttl)
+            if ttl <= 0:
+                continue
+            body = self._encode_content(content)
+            pipe.set(self._record_key(hash_value), encode_text_record(metadata, body), ex=ttl)
+            if self.local_cache:
+                # Entities from the create and database paths still carry their inline body
+                self.local_cache.put(hash_value, {"metadata": metadata.without_content(), "body": body}, ttl)
+        pipe.execute()
+    
+    def acquire_load_lease(self, hash_value: str, ttl_ms: int) -> str:
+        """Claim the cluster-wide right to reload a missed text; returns a token, or None if held"""
+        token = uuid.uuid4().hex
+        if self.redis.set(f"{self.load_lease_prefix}{hash_value}", token, nx=True, px=ttl_ms):
+            return token
+        return None
+    
+    def release_load_lease(self, hash_value: str, token: str):
+        self._release_lease_script(keys=[f"{self.load_lease_prefix}{hash_value}"], args=[token])
+    
+    def load_lease_held(self, hash_value: str) -> bool:
+        return bool(self.redis.exists(f"{self.load_lease_prefix}{hash_value}"))
+    
+    def invalidate(self, hash_values: list[str]):
+        """Drop texts from Redis and from every process's L1 cache"""
+        if not hash_values:
+            return
+    
         pipe = self.redis.pipeline()
-        pipe.setex(f"{self.metadata_prefix}{hash_value}", ttl, metadata.model_dump_json())
-        pipe.setex(f"{self.content_prefix}{hash_value}", ttl, content)
-        pipe.execute()  # Atomic execution
-
+        pipe.delete(*[self._record_key(hash_value) for hash_value in hash_values])
+        pipe.publish(INVALIDATION_CHANNEL, ",".join(hash_values))
+        pipe.execute()
+    
+        if self.local_cache:
+            self.local_cache.invalidate(hash_values)
+    
+    @staticmethod
+    def capped_ttl(metadata, ttl: int) -> int:
+        """TTL that doesn't outlive the text's expiration date"""
+        expiration_date = getattr(metadata, 'expiration_date', None)
+        if not expiration_date:
+            return ttl
+        if expiration_date.tzinfo is None:
+            expiration_date = expiration_date.replace(tzinfo=timezone.utc)
+        remaining = int((expiration_date - datetime.now(timezone.utc)).total_seconds())
+        return min(ttl, remaining)
+    
     def get_complete_text(self, hash_value: str) -> dict:
-        """Atomically get both metadata and content with popularity increment"""
-        result = self._get_complete_text_script(
-            keys=[
-                f"{self.metadata_prefix}{hash_value}",
-                f"{self.content_prefix}{hash_value}",
-                f"{self.popularity_prefix}daily"
-            ],
-            args=[hash_value]
-        )
-        if result:
-            metadata_cached, content_cached = result
+        """Get both metadata and decoded content, counting the view"""
+        cached = self.get_complete_text_body(hash_value)
+        if cached:
             return {
-                "metadata": TextEntity.from_dict(json.loads(metadata_cached)),
-                "content": content_cached.decode('utf-8') if isinstance(content_cached, bytes) else content_cached
+                "metadata": cached["metadata"],
+                "content": decode_body(cached["body"])
             }
-        
-        return None 
\ No newline at end of file
+        return None
+    
+    def get_complete_text_body(self, hash_value: str) -> dict:
+        """Like get_complete_text, but the content is returned as stored bytes"""
+        if self.local_cache:
+            cached = self.local_cache.get(hash_value)
+            if cached:
+                self.popularity.record(hash_value)
+                return cached
+    
+        data = self.redis.get(self._record_key(hash_value))
+        record = decode_text_record(data) if data else None
+        if not record:
+            return None
+    
+        metadata, body = record
+        self.popularity.record(hash_value)
+        cached = {"metadata": metadata, "body": body}
+        if self.local_cache:
+            self.local_cache.put(hash_value, cached, self.capped_ttl(metadata, self.local_cache.ttl))
+        return cached
@@ -0,0 +1,275 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+from typing import Iterable, Optional
+
+from redis import Redis
+
+from app.infrastructure.database.redis_client import create_redis_client
+
+# All filter keys share a hash tag so the rebuild swap stays in one cluster slot
+FILTER_KEY = "{text_hash_filter}:bits"
+REBUILD_KEY = "{text_hash_filter}:rebuild"
+SCAN_KEY = "{text_hash_filter}:scan"
+MISSING_PREFIX = "text_missing:"
+UNFILTERED_PREFIX = "text_unfiltered:"
+
+# Set bits in the live filter and, while a rebuild runs, in the filter being
+# built. Nothing is created: a filter that was never built fully would
+# report every older text as absent.
+ADD_SCRIPT = """
+    local size = tonumber(ARGV[1])
+    for _, key in ipairs(KEYS) do
+        if redis.call('STRLEN', key) == size then
+            for i = 2, #ARGV do
+                redis.call('SETBIT', key, ARGV[i], 1)
+            end
+        end
+    end
+    return 1
+"""
+
+# 0 only if the filter exists and one of the positions is unset
+CONTAINS_SCRIPT = """
+    if redis.call('STRLEN', KEYS[1]) ~= tonumber(ARGV[1]) then
+        return 1
+    end
+    for i = 2, #ARGV do
+        if redis.call('GETBIT', KEYS[1], ARGV[i]) == 0 then
+            return 0
+        end
+    end
+    return 1
+"""
+
+# Start collecting concurrent adds for a rebuild, unless one is running
+BEGIN_REBUILD_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        return 0
+    end
+    redis.call('SETBIT', KEYS[1], tonumber(ARGV[1]) * 8 - 1, 0)
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+"""
+
+# Merge the scanned hashes with the adds made meanwhile and swap the result in
+FINISH_REBUILD_SCRIPT = """
+    local live_key, rebuild_key, scan_key = KEYS[1], KEYS[2], KEYS[3]
+    if redis.call('EXISTS', rebuild_key) == 0 then
+        redis.call('DEL', scan_key)
+        return 0
+    end
+    redis.call('BITOP', 'OR', rebuild_key, rebuild_key, scan_key)
+    redis.call('PERSIST', rebuild_key)
+    redis.call('RENAME', rebuild_key, live_key)
+    redis.call('DEL', scan_key)
+    return 1
+"""
+
+
+class TextHashFilter:
+    """Bloom filter of issued text hashes, so lookups of random hashes skip Postgres.
+
+    The filter is a Redis bitmap of TEXT_HASH_FILTER_CAPACITY entries at a
+    TEXT_HASH_FILTER_ERROR_RATE false-positive rate; every process mirrors
+    it and refreshes the mirror every TEXT_HASH_FILTER_MIRROR_SECONDS. The
+    repository adds hashes after committing them, before the client learns
+    them, and the rebuild worker recreates the filter from the active texts
+    so expired ones drop out. Hashes whose add failed are let through
+    (bypass) until the rebuilds have had time to pick them up.
+
+    The mirror answers "present" locally; "absent" is confirmed against
+    Redis, as the mirror may predate the hash. Hashes that pass the filter
+    but have no text are remembered for TEXT_NEGATIVE_CACHE_TTL_SECONDS.
+    Until the filter has been built once, every hash passes.
+    """
+
+    def __init__(self, redis_client: Redis, capacity: int = None, error_rate: float = None,
+                 mirror_interval: float = None, negative_ttl: int = None):
+        self.redis = redis_client
+        capacity = capacity or int(os.getenv("TEXT_HASH_FILTER_CAPACITY", "10000000"))
+        error_rate = error_rate or float(os.getenv("TEXT_HASH_FILTER_ERROR_RATE", "0.01"))
+        # Optimal bit count m = -n ln p / (ln 2)^2, rounded up to whole bytes,
+        # and hash count k = m/n ln 2
+        self.size_bytes = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2) / 8)
+        self.size_bits = self.size_bytes * 8
+        self.hash_count = max(1, round(self.size_bits / capacity * math.log(2)))
+        self.mirror_interval = mirror_interval if mirror_interval is not None else float(
+            os.getenv("TEXT_HASH_FILTER_MIRROR_SECONDS", "30")
+        )
+        self.negative_ttl = negative_ttl if negative_ttl is not None else int(
+            os.getenv("TEXT_NEGATIVE_CACHE_TTL_SECONDS", "30")
+        )
+        self.rebuild_timeout = int(os.getenv("TEXT_HASH_FILTER_REBUILD_TIMEOUT_SECONDS", "3600"))
+        # Long enough for the next scheduled rebuild to have scanned the hash
+        self.unfiltered_ttl = int(os.getenv(
+            "TEXT_HASH_FILTER_UNFILTERED_SECONDS",
+            str(2 * int(os.getenv("TEXT_HASH_FILTER_REBUILD_SECONDS", "3600")))
+        ))
+
+        self._add_script = self.redis.register_script(ADD_SCRIPT)
+        self._contains_script = self.redis.register_script(CONTAINS_SCRIPT)
+        self._begin_rebuild_script = self.redis.register_script(BEGIN_REBUILD_SCRIPT)
+        self._finish_rebuild_script = self.redis.register_script(FINISH_REBUILD_SCRIPT)
+
+        self._mirror: Optional[bytearray] = None
+        self._mirror_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self._rejected = 0
+        self._passed = 0
+
+    def positions(self, hash_value: str) -> list[int]:
+        """Bit positions of a hash (double hashing over one 128-bit digest)"""
+        digest = hashlib.blake2b(hash_value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hash_count)]
+
+    def add(self, hash_values: list[str]):
+        """Record issued hashes and forget any negative cache entries for them"""
+        if not hash_values:
+            return
+        positions = [self.positions(hash_value) for hash_value in hash_values]
+        pipe = self.redis.pipeline(transaction=False)
+        for hash_positions in positions:
+            self._add_script(keys=[FILTER_KEY, REBUILD_KEY], args=[self.size_bytes, *hash_positions], client=pipe)
+        pipe.delete(*[f"{MISSING_PREFIX}{hash_value}" for hash_value in hash_values])
+        pipe.execute()
+
+        with self._mirror_lock:
+            if self._mirror is not None:
+                for hash_positions in positions:
+                    self._set_bits(self._mirror, hash_positions)
+
+    def bypass(self, hash_values: list[str]):
+        """Let committed hashes that could not be added through the filter for a while"""
+        if not hash_values:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for hash_value in hash_values:
+            pipe.setex(f"{UNFILTERED_PREFIX}{hash_value}", self.unfiltered_ttl, 1)
+        pipe.delete(*[f"{MISSING_PREFIX}{hash_value}" for hash_value in hash_values])
+        pipe.execute()
+
+    def might_exist(self, hash_value: str) -> bool:
+        """False if no text can have this hash; True means look it up"""
+        self._ensure_refresher()
+        positions = self.positions(hash_value)
+        with self._mirror_lock:
+            in_mirror = self._mirror is not None and all(
+                self._mirror[position >> 3] & (0x80 >> (position & 7)) for position in positions
+            )
+
+        pipe = self.redis.pipeline(transaction=False)
+        if not in_mirror:
+            self._contains_script(keys=[FILTER_KEY], args=[self.size_bytes, *positions], client=pipe)
+            pipe.exists(f"{UNFILTERED_PREFIX}{hash_value}")
+        pipe.exists(f"{MISSING_PREFIX}{hash_value}")
+        results = pipe.execute()
+
+        exists = (in_mirror or bool(results[0]) or bool(results[1])) and not results[-1]
+        if exists:
+            self._passed += 1
+        else:
+            self._rejected += 1
+        return exists
+
+    def mark_missing(self, hash_value: str):
+        """Negatively cache a hash the filter let through but no text has"""
+        if self.negative_ttl > 0:
+            self.redis.setex(f"{MISSING_PREFIX}{hash_value}", self.negative_ttl, 1)
+
+    def rebuild(self, hash_values: Iterable[str]) -> bool:
+        """Replace the filter with one of the given hashes plus those added meanwhile
+
+        Returns False if another rebuild is running or this one took longer
+        than TEXT_HASH_FILTER_REBUILD_TIMEOUT_SECONDS.
+        """
+        if not self._begin_rebuild_script(keys=[REBUILD_KEY], args=[self.size_bytes, self.rebuild_timeout]):
+            return False
+
+        bits = bytearray(self.size_bytes)
+        count = 0
+        for hash_value in hash_values:
+            self._set_bits(bits, self.positions(hash_value))
+            count += 1
+
+        self.redis.set(SCAN_KEY, bytes(bits), ex=self.rebuild_timeout)
+        swapped = bool(self._finish_rebuild_script(keys=[FILTER_KEY, REBUILD_KEY, SCAN_KEY]))
+        if swapped:
+            logging.info(f"Rebuilt text hash filter from {count} hashes")
+        return swapped
+
+    @staticmethod
+    def _set_bits(bits: bytearray, positions: list[int]):
+        # Redis numbers bits from the most significant bit of the first byte
+        for position in positions:
+            bits[position >> 3] |= 0x80 >> (position & 7)
+
+    def refresh_mirror(self):
+        """Replace the local mirror with the current filter (None until it has been built)"""
+        data = self.redis.get(FILTER_KEY)
+        if data is not None and len(data) != self.size_bytes:
+            logging.error(
+                f"Text hash filter is {len(data)} bytes, expected {self.size_bytes}; "
+                "TEXT_HASH_FILTER_CAPACITY/ERROR_RATE differ between services"
+            )
+            data = None
+        with self._mirror_lock:
+            self._mirror = bytearray(data) if data is not None else None
+
+    def _ensure_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._mirror_lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.refresh_mirror()
+            except Exception as e:
+                logging.error(f"Failed to refresh text hash filter mirror: {e}")
+            self._stopped.wait(self.mirror_interval)
+
+    def close(self):
+        self._stopped.set()
+
+    def stats(self) -> dict:
+        return {
+            "size_bytes": self.size_bytes,
+            "hash_count": self.hash_count,
+            "mirrored": self._mirror is not None,
+            "passed": self._passed,
+            "rejected": self._rejected,
+        }
+
+
+_hash_filter: Optional[TextHashFilter] = None
+_hash_filter_lock = threading.Lock()
+
+
+def get_hash_filter() -> Optional[TextHashFilter]:
+    """Process-wide text hash filter, or None unless TEXT_HASH_FILTER=true"""
+    global _hash_filter
+    if os.getenv("TEXT_HASH_FILTER", "false").lower() != "true":
+        return None
+
+    with _hash_filter_lock:
+        if _hash_filter is None:
+            _hash_filter = TextHashFilter(create_redis_client(decode_responses=False))
+        return _hash_filter
+
+
+def close_hash_filter():
+    """Stop refreshing the mirror (call on shutdown)"""
+    global _hash_filter
+    with _hash_filter_lock:
+        if _hash_filter is not None:
+            _hash_filter.close()
+            _hash_filter = None
@@ -0,0 +1,64 @@
+from redis import Redis
+import json
+import os
+import time
+from app.domain.entities.text import Text as TextEntity
+
+class UploadReservationStore:
+    """Direct-to-storage uploads that were reserved but not finalized yet.
+    
+    Each reservation holds the text (hash already assigned, location pointing
+    at the presigned object key), the size and SHA-256 the client declared
+    and a deadline shortly after its presigned URL expires. Reservations are
+    indexed by deadline so the ones never finalized can be reaped (their
+    object deleted, their hash given back); the record itself is kept for
+    TEXT_UPLOAD_RESERVATION_RETENTION_SECONDS past the deadline for that.
+    """
+
+    def __init__(self, redis_client: Redis):
+        self.redis = redis_client
+        self.reservation_prefix = "text_upload:"
+        self.lock_prefix = "text_upload_lock:"
+        self.deadlines_key = "text_upload_deadlines"
+        self.retention = int(os.getenv("TEXT_UPLOAD_RESERVATION_RETENTION_SECONDS", "86400"))
+
+    def put(self, text_entity: TextEntity, size: int, sha256: str, ttl: int):
+        deadline = time.time() + ttl
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(
+            f"{self.reservation_prefix}{text_entity.hash_value}",
+            json.dumps({"metadata": text_entity.to_dict(), "size": size, "sha256": sha256, "deadline": deadline}),
+            ex=ttl + self.retention
+        )
+        pipe.zadd(self.deadlines_key, {text_entity.hash_value: deadline})
+        pipe.execute()
+
+    def get(self, hash_value: str, include_expired: bool = False) -> dict:
+        """Get a reservation as {"metadata", "size", "sha256", "deadline"}, or None"""
+        data = self.redis.get(f"{self.reservation_prefix}{hash_value}")
+        if not data:
+            return None
+
+        reservation = json.loads(data)
+        if not include_expired and reservation["deadline"] <= time.time():
+            return None
+        reservation["metadata"] = TextEntity.from_dict(reservation["metadata"])
+        return reservation
+
+    def lock(self, hash_value: str, ttl: int = 300) -> bool:
+        """Claim a reservation for finalizing or reaping; False if someone else holds it"""
+        return bool(self.redis.set(f"{self.lock_prefix}{hash_value}", 1, nx=True, ex=ttl))
+
+    def unlock(self, hash_value: str):
+        self.redis.delete(f"{self.lock_prefix}{hash_value}")
+
+    def expired(self, limit: int = 100) -> list[str]:
+        """Hashes of reservations past their deadline"""
+        hash_values = self.redis.zrangebyscore(self.deadlines_key, "-inf", time.time(), start=0, num=limit)
+        return [hash_value.decode() if isinstance(hash_value, bytes) else hash_value for hash_value in hash_values]
+
+    def delete(self, hash_value: str):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(f"{self.reservation_prefix}{hash_value}", f"{self.lock_prefix}{hash_value}")
+        pipe.zrem(self.deadlines_key, hash_value)
+        pipe.execute()
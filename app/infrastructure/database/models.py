@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from typing import Optional
 from sqlmodel import Field, SQLModel
 from uuid import UUID, uuid4
-from sqlalchemy import DateTime
+from sqlalchemy import DateTime, BigInteger, LargeBinary
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.sql import func
 from sqlalchemy import Column
@@ -39,6 +39,13 @@ class TextBase(SQLModel):
         sa_column=Column(DateTime(timezone=True))
     )
     hash_value: str = Field(primary_key=True)
+    content_digest: Optional[str] = Field(default=None, index=True)
+    # Small bodies are stored here instead of S3; excluded from JSON dumps
+    inline_content: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column(LargeBinary, nullable=True),
+        exclude=True
+    )
 
 class Texts(TextBase, table=True):
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
@@ -49,4 +56,45 @@ class Texts(TextBase, table=True):
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    )
\ No newline at end of file
+    )
+
+class TextBlobs(SQLModel, table=True):
+    __tablename__ = "text_blobs"
+
+    digest: str = Field(primary_key=True)
+    location: str
+    ref_count: int = Field(default=0)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+
+class KeyRanges(SQLModel, table=True):
+    __tablename__ = "key_ranges"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    range_start: int = Field(sa_column=Column(BigInteger, index=True, nullable=False))
+    range_end: int = Field(sa_column=Column(BigInteger, nullable=False))
+    leased_by: Optional[str] = Field(default=None, index=True)
+    leased_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True))
+    )
+
+class TextSegments(SQLModel, table=True):
+    __tablename__ = "text_segments"
+
+    key: str = Field(primary_key=True)
+    total_bytes: int = Field(sa_column=Column(BigInteger, nullable=False))
+    # Bytes still referenced by unexpired texts; compaction candidates have little left
+    live_bytes: int = Field(sa_column=Column(BigInteger, nullable=False))
+    record_count: int = Field(default=0)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+    # Set when compaction has moved the live records out; deleted after a grace period
+    retired_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True)
+    )
@@ -2,14 +2,26 @@ import redis
 import os
 from redis_om import get_redis_connection
 
-# Create Redis client
-def get_redis_client():
-    redis_client = get_redis_connection(
+def create_redis_client(decode_responses: bool = True):
+    """Create a Redis client from environment settings"""
+    return get_redis_connection(
         host=os.environ.get('REDIS_HOST', 'localhost'),
         port=int(os.environ.get('REDIS_PORT', '6379')),
         password=os.environ.get('REDIS_PASSWORD', None),
-        decode_responses=True
+        decode_responses=decode_responses
     )
+
+# Create Redis client
+def get_redis_client():
+    redis_client = create_redis_client()
+    try:
+        yield redis_client
+    finally:
+        redis_client.close()
+
+def get_binary_redis_client():
+    """Redis client that returns raw bytes (for binary-safe values)"""
+    redis_client = create_redis_client(decode_responses=False)
     try:
         yield redis_client
     finally:
@@ -0,0 +1,46 @@
+import os
+import threading
+from typing import Optional
+
+from app.domain.repositories.hash_allocator import HashAllocator
+from app.infrastructure.hashing.hash_prefetch_buffer import (
+    close_hash_prefetch_buffer,
+    get_hash_prefetch_buffer,
+)
+
+_key_range_allocator = None
+_key_range_lock = threading.Lock()
+
+
+def get_hash_allocator() -> Optional[HashAllocator]:
+    """Process-wide hash allocator selected by HASH_ALLOCATOR.
+
+    "redis" (default) uses the shared Redis hash queue, through the prefetch
+    buffer when HASH_PREFETCH_SIZE is set. "key_range" leases ranges from
+    Postgres and does not use Redis.
+    """
+    global _key_range_allocator
+    backend = os.getenv("HASH_ALLOCATOR", "redis")
+
+    if backend == "key_range":
+        with _key_range_lock:
+            if _key_range_allocator is None:
+                from app.infrastructure.database.database import engine
+                from app.infrastructure.hashing.key_range_allocator import KeyRangeHashAllocator
+                _key_range_allocator = KeyRangeHashAllocator(engine)
+            return _key_range_allocator
+
+    if backend == "redis":
+        return get_hash_prefetch_buffer()
+
+    raise ValueError(f"Unknown HASH_ALLOCATOR: {backend}")
+
+
+def close_hash_allocator():
+    """Release reserved hashes of the process-wide allocator (call on shutdown)"""
+    global _key_range_allocator
+    with _key_range_lock:
+        if _key_range_allocator is not None:
+            _key_range_allocator.close()
+            _key_range_allocator = None
+    close_hash_prefetch_buffer()
@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Optional
+
+from redis import Redis
+
+from app.domain.repositories.hash_allocator import HashAllocator
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.hashing.refill_policy import HashRefillPolicy
+from app.infrastructure.hashing.scripts import POP_HASH_BATCH_SCRIPT
+from app.infrastructure.hashing.shards import hash_queue_shards, shard_order
+
+
+class HashPrefetchBuffer(HashAllocator):
+    """Per-process buffer of hashes reserved from the shared Redis queue.
+
+    Hashes are popped from `text_hash_queue` in batches and handed out from
+    memory, so creating a text does not need a Redis round trip. The buffer
+    tops itself up in a background thread once it drops to the low-water mark
+    and pushes unused hashes back to the queue on shutdown.
+    """
+
+    def __init__(self, redis_client: Redis, size: int = 100, low_water: int = None,
+                 refill_threshold: int = None):
+        self.redis = redis_client
+        self.size = size
+        self.low_water = low_water if low_water is not None else max(1, size // 4)
+        self.refill_threshold = refill_threshold if refill_threshold is not None else int(
+            os.getenv("HASH_QUEUE_THRESHOLD", "1000")
+        )
+        # Reserve from this process's home shard first, then from the others
+        self.shard_order = shard_order(hash_queue_shards())
+        self.hash_queue_key = self.shard_order[0].queue_key
+        self.service_id = os.getenv("SERVICE_ID", "text-service-1")
+
+        self._hashes = deque()
+        self._lock = threading.Lock()
+        self._refill_in_progress = False
+        self._closed = False
+
+        self.refill_policy = HashRefillPolicy(self.redis)
+        self._pop_batch_script = self.redis.register_script(POP_HASH_BATCH_SCRIPT)
+
+    def take(self) -> Optional[str]:
+        """Hand out one reserved hash, or None if none could be reserved"""
+        with self._lock:
+            hash_value = self._hashes.popleft() if self._hashes else None
+            remaining = len(self._hashes)
+
+        if hash_value is None:
+            # Buffer ran dry before the background refill landed
+            self._refill()
+            with self._lock:
+                hash_value = self._hashes.popleft() if self._hashes else None
+                remaining = len(self._hashes)
+
+        if remaining <= self.low_water:
+            self._schedule_refill()
+        return hash_value
+
+    def give_back(self, hash_value: str):
+        """Return an unused hash to the front of the buffer"""
+        with self._lock:
+            if not self._closed:
+                self._hashes.appendleft(hash_value)
+                return
+        self._push_back([hash_value])
+
+    def _schedule_refill(self):
+        with self._lock:
+            if self._refill_in_progress or self._closed:
+                return
+            self._refill_in_progress = True
+
+        thread = threading.Thread(target=self._refill_in_background, daemon=True)
+        thread.start()
+
+    def _refill_in_background(self):
+        try:
+            self._refill()
+        finally:
+            with self._lock:
+                self._refill_in_progress = False
+
+    def _refill(self):
+        """Reserve enough hashes to fill the buffer up to its size"""
+        with self._lock:
+            needed = self.size - len(self._hashes)
+        if needed <= 0:
+            return
+
+        hashes = []
+        try:
+            for shard in self.shard_order:
+                if len(hashes) >= needed:
+                    break
+                popped = self._pop_batch_script(
+                    keys=[
+                        shard.queue_key,
+                        shard.lock_key,
+                        shard.request_stream,
+                        shard.stats_key,
+                        shard.recycle_key,
+                    ],
+                    args=[
+                        needed - len(hashes),
+                        self.refill_threshold,
+                        60,  # Lock TTL
+                        os.getenv("HASH_BATCH_SIZE", "100"),
+                        self.service_id,
+                        str(uuid.uuid4()),
+                        *self.refill_policy.script_args(),
+                    ],
+                )
+                hashes.extend(popped or [])
+        except Exception as e:
+            logging.error(f"Failed to reserve hashes for prefetch buffer: {e}")
+            if not hashes:
+                return
+
+        hashes = [h.decode() if isinstance(h, bytes) else h for h in hashes]
+        with self._lock:
+            if not self._closed:
+                self._hashes.extend(hashes)
+                return
+        # Closed while the reservation was in flight
+        self._push_back(hashes)
+
+    def _push_back(self, hashes: list[str]):
+        if not hashes:
+            return
+        try:
+            # LPUSH reverses its arguments, so push in reverse to keep the order
+            self.redis.lpush(self.hash_queue_key, *reversed(hashes))
+        except Exception as e:
+            logging.error(f"Failed to return {len(hashes)} hashes to queue: {e}")
+
+    def close(self):
+        """Return all unused hashes to the shared queue"""
+        with self._lock:
+            self._closed = True
+            hashes = list(self._hashes)
+            self._hashes.clear()
+        self._push_back(hashes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "redis_prefetch",
+                "buffered": len(self._hashes),
+                "size": self.size,
+                "low_water": self.low_water,
+                "home_shard": self.shard_order[0].index,
+                "refill_in_progress": self._refill_in_progress,
+            }
+
+
+_buffer: Optional[HashPrefetchBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_hash_prefetch_buffer() -> Optional[HashPrefetchBuffer]:
+    """Process-wide prefetch buffer, or None if HASH_PREFETCH_SIZE is not set"""
+    global _buffer
+    size = int(os.getenv("HASH_PREFETCH_SIZE", "0"))
+    if size <= 0:
+        return None
+
+    with _buffer_lock:
+        if _buffer is None:
+            low_water = os.getenv("HASH_PREFETCH_LOW_WATER")
+            _buffer = HashPrefetchBuffer(
+                create_redis_client(),
+                size=size,
+                low_water=int(low_water) if low_water else None,
+            )
+        return _buffer
+
+
+def close_hash_prefetch_buffer():
+    """Give unused hashes back to the queue (call on shutdown)"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.close()
+            _buffer.redis.close()
+            _buffer = None
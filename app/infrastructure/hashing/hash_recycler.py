@@ -0,0 +1,45 @@
+import os
+import time
+from collections import defaultdict
+
+from redis import Redis
+
+from app.infrastructure.hashing.shards import hash_queue_shards, shard_for_hash
+
+
+class HashRecycler:
+    """Puts hashes of expired texts back into circulation after a cooling period.
+
+    Freed hashes go into their shard's `recycled_hashes` sorted set, scored
+    by the time they become reusable (now + HASH_RECYCLE_GRACE_SECONDS), so
+    stale links, caches and crawlers have time to forget the old text. The
+    consuming Lua scripts hand out cooled-down hashes before taking fresh
+    ones from the queue. Disabled unless the grace period is set.
+    """
+
+    def __init__(self, redis_client: Redis, grace_seconds: int = None):
+        self.redis = redis_client
+        self.grace_seconds = grace_seconds if grace_seconds is not None else int(
+            os.getenv("HASH_RECYCLE_GRACE_SECONDS", "0")
+        )
+        self.shards = hash_queue_shards()
+
+    @property
+    def enabled(self) -> bool:
+        return self.grace_seconds > 0
+
+    def recycle(self, hash_values: list[str]) -> int:
+        """Schedule hashes for reuse once their grace period is over, return how many"""
+        if not self.enabled or not hash_values:
+            return 0
+
+        reusable_at = time.time() + self.grace_seconds
+        by_shard = defaultdict(dict)
+        for hash_value in hash_values:
+            by_shard[shard_for_hash(self.shards, hash_value).recycle_key][hash_value] = reusable_at
+
+        pipe = self.redis.pipeline(transaction=False)
+        for recycle_key, mapping in by_shard.items():
+            pipe.zadd(recycle_key, mapping)
+        pipe.execute()
+        return len(hash_values)
@@ -0,0 +1,203 @@
+import logging
+import os
+import socket
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, or_, text
+from sqlmodel import Session, select
+
+from app.domain.repositories.hash_allocator import HashAllocator
+from app.infrastructure.database.models import KeyRanges as KeyRangeModel
+from app.infrastructure.hashing.short_id import ShortIdEncoder
+
+# Advisory lock key held while a new range is appended after the highest one
+KEY_RANGE_APPEND_LOCK = 0x6B657972
+
+
+class KeyRangeHashAllocator(HashAllocator):
+    """Allocates hashes from numeric ranges leased out of the `key_ranges` table.
+
+    Each process leases a range with `SELECT ... FOR UPDATE SKIP LOCKED` and
+    encodes sequence numbers from it locally as base62, so Redis is not
+    involved at all. The lease is used up in claims of KEY_RANGE_CLAIM_SIZE
+    numbers: a claim moves the row's range_start past the claimed numbers
+    before any of them is handed out, so a row only ever holds numbers nobody
+    has seen. Allocating a hash needs no network round trip until the claim
+    runs out.
+
+    Every claim renews the lease. A lease left alone for KEY_RANGE_LEASE_SECONDS
+    (its process died) can be leased by another process; the dead process
+    loses at most the rest of its last claim.
+    """
+
+    def __init__(self, engine, encoder: ShortIdEncoder = None, range_size: int = None,
+                 claim_size: int = None, lease_seconds: int = None, sequence_base: int = None):
+        self.engine = engine
+        # Same scramble as the hash generation worker, so hashes differ whenever sequences do
+        self.encoder = encoder or ShortIdEncoder()
+        self.range_size = range_size or int(os.getenv("KEY_RANGE_SIZE", "1000"))
+        self.claim_size = min(claim_size or int(os.getenv("KEY_RANGE_CLAIM_SIZE", "100")), self.range_size)
+        self.lease_seconds = lease_seconds or int(os.getenv("KEY_RANGE_LEASE_SECONDS", "600"))
+        # The hash generation worker counts up from 0, so ranges are encoded
+        # from the upper half of the keyspace to never hand out the same hash
+        self.sequence_base = sequence_base if sequence_base is not None else int(
+            os.getenv("KEY_RANGE_SEQUENCE_BASE", str(self.encoder.keyspace // 2))
+        )
+        self.owner = f"{os.getenv('SERVICE_ID', 'text-service-1')}-{socket.gethostname()}-{os.getpid()}"
+
+        self._lock = threading.Lock()
+        self._range_id = None
+        self._next = 0
+        self._end = 0
+        self._returned = deque()
+        self._leases = 0
+
+    def take(self) -> Optional[str]:
+        """Hand out the next hash from the current claim, claiming more if needed"""
+        with self._lock:
+            if self._returned:
+                return self._returned.popleft()
+            if self._next >= self._end:
+                self._claim()
+            sequence = self._next
+            self._next += 1
+        return self.encoder.encode(self.sequence_base + sequence)
+
+    def give_back(self, hash_value: str):
+        """Keep an unused hash for the next take()"""
+        with self._lock:
+            self._returned.append(hash_value)
+
+    def _claim(self):
+        """Claim the next numbers of the leased range, or lease another range"""
+        with Session(self.engine) as session:
+            key_range = None
+            if self._range_id is not None:
+                key_range = session.exec(
+                    select(KeyRangeModel)
+                    .where(KeyRangeModel.id == self._range_id, KeyRangeModel.leased_by == self.owner)
+                    .with_for_update()
+                ).first()
+                if key_range is not None and key_range.range_start >= key_range.range_end:
+                    self._retire(session, key_range)
+                    key_range = None
+
+            if key_range is None:
+                key_range = self._lease_range(session)
+
+            start = key_range.range_start
+            end = min(start + self.claim_size, key_range.range_end)
+            key_range.range_start = end
+            key_range.leased_by = self.owner
+            key_range.leased_at = datetime.now(timezone.utc)
+            session.flush()
+            range_id = key_range.id
+            session.commit()
+
+        self._range_id = range_id
+        self._next = start
+        self._end = end
+
+    def _lease_range(self, session: Session) -> KeyRangeModel:
+        """A free or abandoned range, or a new one appended after the highest range"""
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.lease_seconds)
+        key_range = session.exec(
+            select(KeyRangeModel)
+            .where(
+                KeyRangeModel.range_start < KeyRangeModel.range_end,
+                or_(KeyRangeModel.leased_by.is_(None), KeyRangeModel.leased_at < stale_before)
+            )
+            .order_by(KeyRangeModel.range_start)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+
+        if key_range is None:
+            # Appending processes take turns, so no two append the same range
+            session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": KEY_RANGE_APPEND_LOCK})
+            last_end = session.exec(select(func.max(KeyRangeModel.range_end))).one()
+            start = last_end or 0
+            key_range = KeyRangeModel(range_start=start, range_end=start + self.range_size)
+            session.add(key_range)
+
+        self._leases += 1
+        return key_range
+
+    def _retire(self, session: Session, key_range: KeyRangeModel):
+        """Drop used-up ranges; the highest one stays to mark the end of the allocated space"""
+        highest = session.exec(select(func.max(KeyRangeModel.range_end))).one()
+        if key_range.range_end < highest:
+            session.delete(key_range)
+        else:
+            key_range.leased_by = None
+        session.exec(
+            delete(KeyRangeModel)
+            .where(
+                KeyRangeModel.id != key_range.id,
+                KeyRangeModel.range_start >= KeyRangeModel.range_end,
+                KeyRangeModel.range_end < highest
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def close(self):
+        """Give the unused rest of the current claim and any returned hashes back"""
+        with self._lock:
+            range_id, start, end = self._range_id, self._next, self._end
+            returned = list(self._returned)
+            self._range_id = None
+            self._next = self._end = 0
+            self._returned.clear()
+
+        sequences = []
+        for hash_value in returned:
+            try:
+                sequences.append(self.encoder.decode(hash_value) - self.sequence_base)
+            except ValueError as e:
+                logging.error(f"Dropping returned hash {hash_value}: {e}")
+        # Returned hashes right below the unused rest simply extend it
+        sequences.sort(reverse=True)
+        while sequences and sequences[0] == start - 1:
+            start = sequences.pop(0)
+
+        try:
+            with Session(self.engine) as session:
+                key_range = None
+                if range_id is not None:
+                    key_range = session.exec(
+                        select(KeyRangeModel)
+                        .where(
+                            KeyRangeModel.id == range_id,
+                            KeyRangeModel.leased_by == self.owner,
+                            KeyRangeModel.range_start == end
+                        )
+                        .with_for_update()
+                    ).first()
+                if key_range is not None:
+                    key_range.range_start = start
+                    key_range.leased_by = None
+                    key_range.leased_at = None
+                elif start < end:
+                    # The lease was taken over meanwhile; the rest becomes a range of its own
+                    session.add(KeyRangeModel(range_start=start, range_end=end))
+
+                for sequence in sequences:
+                    if sequence >= 0:
+                        session.add(KeyRangeModel(range_start=sequence, range_end=sequence + 1))
+                session.commit()
+        except Exception as e:
+            logging.error(f"Failed to release key range [{start}, {end}) and {len(sequences)} returned hashes: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "key_range",
+                "remaining_in_claim": max(self._end - self._next, 0),
+                "returned": len(self._returned),
+                "range_size": self.range_size,
+                "claim_size": self.claim_size,
+                "leases": self._leases,
+            }
@@ -0,0 +1,81 @@
+import os
+
+from redis import Redis
+
+from app.infrastructure.hashing.scripts import RECORD_CONSUMPTION_SCRIPT, RECORD_REFILL_LATENCY_SCRIPT
+
+
+class HashRefillPolicy:
+    """Rate-aware refill policy for the shared hash queue.
+
+    The consuming Lua scripts keep an exponentially decayed rate of hashes
+    taken per second in each queue shard's stats hash (shared by every
+    service, `hash_refill_stats` when the queue isn't sharded) and the
+    hash generation worker records how long refills take, from request to
+    hashes being available. From both, each pop derives:
+
+    - threshold: refill once the queue holds fewer hashes than are consumed
+      during one refill, times HASH_REFILL_SAFETY_FACTOR;
+    - batch size: HASH_REFILL_HORIZON_SECONDS worth of consumption, capped
+      at HASH_REFILL_MAX_BATCH.
+
+    HASH_QUEUE_THRESHOLD and HASH_BATCH_SIZE act as the floors, so an idle
+    system behaves exactly like the fixed policy.
+    """
+
+    def __init__(self, redis_client: Redis):
+        self.redis = redis_client
+        self.stats_key = "hash_refill_stats"
+        self.rate_window = float(os.getenv("HASH_REFILL_RATE_WINDOW_SECONDS", "60"))
+        self.safety_factor = float(os.getenv("HASH_REFILL_SAFETY_FACTOR", "2"))
+        self.horizon = float(os.getenv("HASH_REFILL_HORIZON_SECONDS", "60"))
+        self.max_batch = int(os.getenv("HASH_REFILL_MAX_BATCH", "1000000"))
+        # Assumed refill latency until the worker has measured one
+        self.initial_latency = float(os.getenv("HASH_REFILL_INITIAL_LATENCY_SECONDS", "1"))
+        self.latency_alpha = float(os.getenv("HASH_REFILL_LATENCY_ALPHA", "0.2"))
+
+        self._record_latency_script = self.redis.register_script(RECORD_REFILL_LATENCY_SCRIPT)
+        self._record_consumption_script = self.redis.register_script(RECORD_CONSUMPTION_SCRIPT)
+
+    def script_args(self) -> list:
+        """Trailing ARGV the consuming scripts pass to refill_policy()"""
+        return [self.rate_window, self.safety_factor, self.horizon, self.max_batch, self.initial_latency]
+
+    def record_consumption(self, stats_key: str, consumed: int, min_threshold: int, min_batch: int):
+        """Count hashes taken without a consuming script (blocking pops) towards the rate"""
+        self._record_consumption_script(
+            keys=[stats_key], args=[consumed, min_threshold, min_batch, *self.script_args()]
+        )
+
+    def record_refill_latency(self, seconds: float, stats_key: str = None) -> float:
+        """Fold an observed refill latency into the moving average, return the new average"""
+        result = self._record_latency_script(
+            keys=[stats_key or self.stats_key], args=[max(seconds, 0), self.latency_alpha]
+        )
+        return float(result)
+
+    def snapshot(self, stats_key: str = None) -> dict:
+        """Current estimates and the last decisions, for health checks"""
+        stats = self.redis.hgetall(stats_key or self.stats_key)
+        stats = {
+            (key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+            for key, value in stats.items()
+        }
+
+        def number(name, cast=float):
+            return cast(float(stats[name])) if name in stats else None
+
+        return {
+            "consumption_rate_per_second": number("rate"),
+            "refill_latency_seconds": number("refill_latency"),
+            "refills": number("refills", int),
+            "threshold": number("threshold", int),
+            "batch_size": number("batch_size", int),
+            "updated_at": number("updated_at"),
+            "config": {
+                "rate_window_seconds": self.rate_window,
+                "safety_factor": self.safety_factor,
+                "horizon_seconds": self.horizon,
+                "max_batch": self.max_batch,
+            },
+        }
@@ -0,0 +1,111 @@
+# Lua scripts shared by the components that consume the Redis hash queue
+
+# Adaptive refill policy, prepended to the consuming scripts (see HashRefillPolicy).
+# Records `consumed` hashes in an exponentially decayed consumption rate and
+# returns the refill threshold and batch size for that rate and the observed
+# refill latency: refill once the queue holds less than the latency's worth
+# of hashes (times a safety factor), and ask for `horizon` seconds' worth.
+# The configured threshold and batch size are the floors.
+REFILL_POLICY_LUA = """
+    local function refill_policy(stats_key, consumed, min_threshold, min_batch,
+                                 window, safety, horizon, max_batch, initial_latency)
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local stats = redis.call('HMGET', stats_key, 'rate', 'updated_at', 'refill_latency')
+        local rate = tonumber(stats[1]) or 0
+        local updated_at = tonumber(stats[2]) or now
+        local latency = tonumber(stats[3]) or initial_latency
+
+        local elapsed = math.max(now - updated_at, 0)
+        rate = rate * math.exp(-elapsed / window) + consumed / window
+
+        local threshold = math.max(min_threshold, math.ceil(rate * latency * safety))
+        local batch_size = math.min(max_batch, math.max(min_batch, math.ceil(rate * horizon)))
+
+        redis.call('HSET', stats_key,
+            'rate', tostring(rate),
+            'updated_at', tostring(now),
+            'threshold', threshold,
+            'batch_size', batch_size)
+        return threshold, batch_size
+    end
+"""
+
+# Hashes of expired texts whose cooling period is over are handed out before
+# fresh ones from the queue (see HashRecycler)
+TAKE_RECYCLED_LUA = """
+    local function take_recycled(recycle_key, count)
+        local now = redis.call('TIME')[1]
+        local hashes = redis.call('ZRANGEBYSCORE', recycle_key, '-inf', now, 'LIMIT', 0, count)
+        if #hashes > 0 then
+            redis.call('ZREM', recycle_key, unpack(hashes))
+        end
+        return hashes
+    end
+"""
+
+# Pop up to N hashes and, like the single-hash script in SQLAlchemyTextRepository,
+# request a generation batch when the shared queue runs low
+POP_HASH_BATCH_SCRIPT = REFILL_POLICY_LUA + TAKE_RECYCLED_LUA + """
+    local queue_key = KEYS[1]
+    local lock_key = KEYS[2]
+    local stream_key = KEYS[3]
+    local stats_key = KEYS[4]
+    local recycle_key = KEYS[5]
+    local count = tonumber(ARGV[1])
+    local lock_ttl = tonumber(ARGV[3])
+    local service_id = ARGV[5]
+    local request_id = ARGV[6]
+
+    local hashes = take_recycled(recycle_key, count)
+    local popped = {}
+    if #hashes < count then
+        popped = redis.call('LPOP', queue_key, count - #hashes) or {}
+        for _, hash_value in ipairs(popped) do
+            table.insert(hashes, hash_value)
+        end
+    end
+    local queue_length = redis.call('LLEN', queue_key)
+
+    -- Only hashes taken from the queue count towards its consumption rate
+    local threshold, batch_size = refill_policy(
+        stats_key, #popped, tonumber(ARGV[2]), tonumber(ARGV[4]),
+        tonumber(ARGV[7]), tonumber(ARGV[8]), tonumber(ARGV[9]), tonumber(ARGV[10]), tonumber(ARGV[11]))
+
+    if queue_length < threshold then
+        local lock_acquired = redis.call('SET', lock_key, service_id, 'NX', 'EX', lock_ttl)
+        if lock_acquired then
+            redis.call('XADD', stream_key, '*',
+                'batch_size', batch_size,
+                'requesting_service', service_id,
+                'timestamp', redis.call('TIME')[1],
+                'request_id', request_id,
+                'lock_key', lock_key,
+                'queue_length', queue_length)
+        end
+    end
+
+    return hashes
+"""
+
+# Count hashes taken outside the consuming scripts (BLPOP) towards the rate
+RECORD_CONSUMPTION_SCRIPT = REFILL_POLICY_LUA + """
+    refill_policy(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]),
+        tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6]), tonumber(ARGV[7]), tonumber(ARGV[8]))
+    return 1
+"""
+
+# Fold one observed refill latency (seconds) into its moving average
+RECORD_REFILL_LATENCY_SCRIPT = """
+    local stats_key = KEYS[1]
+    local latency = tonumber(ARGV[1])
+    local alpha = tonumber(ARGV[2])
+
+    local previous = tonumber(redis.call('HGET', stats_key, 'refill_latency'))
+    if previous then
+        latency = alpha * latency + (1 - alpha) * previous
+    end
+    redis.call('HSET', stats_key, 'refill_latency', tostring(latency))
+    redis.call('HINCRBY', stats_key, 'refills', 1)
+    return tostring(latency)
+"""
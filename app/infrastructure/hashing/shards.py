@@ -0,0 +1,66 @@
+import os
+import socket
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class HashQueueShard:
+    """Redis keys of one hash queue shard.
+
+    All keys of a shard share a hash tag, so the Lua scripts that touch them
+    together stay within one Redis Cluster slot while different shards spread
+    across the cluster.
+    """
+    index: int
+    queue_key: str
+    lock_key: str
+    request_stream: str
+    stats_key: str
+    # Sorted set of hashes freed by expired texts, scored by when they may be reused
+    recycle_key: str
+
+
+def hash_queue_shards(count: Optional[int] = None, prefix: str = "") -> list[HashQueueShard]:
+    """The HASH_QUEUE_SHARDS hash queue shards; a single shard keeps the original key names"""
+    count = count or int(os.getenv("HASH_QUEUE_SHARDS", "1"))
+    if count <= 1:
+        return [HashQueueShard(
+            0,
+            f"{prefix}text_hash_queue",
+            f"{prefix}hash_generation_lock",
+            f"{prefix}hash_generation_requests",
+            f"{prefix}hash_refill_stats",
+            f"{prefix}recycled_hashes",
+        )]
+
+    return [
+        HashQueueShard(
+            index,
+            f"{{{prefix}hash_shard:{index}}}:text_hash_queue",
+            f"{{{prefix}hash_shard:{index}}}:hash_generation_lock",
+            f"{{{prefix}hash_shard:{index}}}:hash_generation_requests",
+            f"{{{prefix}hash_shard:{index}}}:hash_refill_stats",
+            f"{{{prefix}hash_shard:{index}}}:recycled_hashes",
+        )
+        for index in range(count)
+    ]
+
+
+def shard_for_hash(shards: list[HashQueueShard], hash_value: str) -> HashQueueShard:
+    """Shard a given hash belongs to when it is handed back for reuse"""
+    return shards[zlib.crc32(hash_value.encode()) % len(shards)]
+
+
+def default_worker_id() -> str:
+    """Identity used to pick this process's home shard"""
+    return os.getenv("HASH_QUEUE_WORKER_ID") or (
+        f"{os.getenv('SERVICE_ID', 'text-service-1')}:{socket.gethostname()}:{os.getpid()}"
+    )
+
+
+def shard_order(shards: list[HashQueueShard], worker_id: Optional[str] = None) -> list[HashQueueShard]:
+    """Shards in the order a worker should try them: its home shard first, then the rest"""
+    start = zlib.crc32((worker_id or default_worker_id()).encode()) % len(shards)
+    return shards[start:] + shards[:start]
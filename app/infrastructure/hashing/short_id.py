@@ -0,0 +1,58 @@
+import os
+
+BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# Multiplier for the affine scramble. It must be coprime with 62 (odd and not a
+# multiple of 31) so that the mapping stays a bijection over the keyspace.
+DEFAULT_SCRAMBLE_MULTIPLIER = 2654435761
+DEFAULT_SCRAMBLE_OFFSET = 1013904223
+
+
+class ShortIdEncoder:
+    """Collision-free mapping of sequence numbers to fixed-length base62 hashes.
+
+    Sequence numbers are always scrambled over the whole keyspace, so every
+    allocator encoding with the same settings hands out distinct hashes as
+    long as their sequence numbers are distinct.
+    """
+
+    def __init__(self, length: int = None, multiplier: int = None, offset: int = None):
+        self.length = length or int(os.getenv("HASH_LENGTH", "8"))
+        self.keyspace = len(BASE62_ALPHABET) ** self.length
+        self.multiplier = multiplier or int(os.getenv("HASH_SCRAMBLE_MULTIPLIER", str(DEFAULT_SCRAMBLE_MULTIPLIER)))
+        self.offset = offset if offset is not None else int(os.getenv("HASH_SCRAMBLE_OFFSET", str(DEFAULT_SCRAMBLE_OFFSET)))
+
+        if self.multiplier % 2 == 0 or self.multiplier % 31 == 0:
+            raise ValueError("Scramble multiplier must be coprime with 62")
+        self._inverse = pow(self.multiplier, -1, self.keyspace)
+
+    def encode(self, sequence: int) -> str:
+        """Encode a sequence number as a base62 hash of fixed length"""
+        if sequence < 0 or sequence >= self.keyspace:
+            raise ValueError(f"Sequence {sequence} is outside of the {self.length}-char keyspace")
+
+        # Affine permutation of [0, keyspace): distinct inputs give distinct outputs
+        value = (sequence * self.multiplier + self.offset) % self.keyspace
+
+        chars = []
+        for _ in range(self.length):
+            value, remainder = divmod(value, 62)
+            chars.append(BASE62_ALPHABET[remainder])
+        return "".join(reversed(chars))
+
+    def decode(self, hash_value: str) -> int:
+        """Sequence number a hash was encoded from"""
+        if len(hash_value) != self.length:
+            raise ValueError(f"Hash {hash_value!r} is not {self.length} characters long")
+
+        value = 0
+        for char in hash_value:
+            index = BASE62_ALPHABET.find(char)
+            if index < 0:
+                raise ValueError(f"Hash {hash_value!r} is not base62")
+            value = value * 62 + index
+        return (value - self.offset) * self._inverse % self.keyspace
+
+    def encode_range(self, start: int, count: int) -> list[str]:
+        """Encode the half-open range [start, start + count)"""
+        return [self.encode(sequence) for sequence in range(start, start + count)]
@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from sqlmodel import Session
+
+from app.domain.entities.text import Text as TextEntity
+
+
+class TextGroupCommitter:
+    """Merges concurrent single creates into one transaction and one INSERT.
+
+    Callers block in submit() while a background thread collects texts for up
+    to `window_ms` (or until `max_batch` are waiting) and writes them with
+    `create_many`. If the batch fails, its texts are retried one by one so
+    every caller gets its own result or error. Callers always wait for the
+    outcome of their batch: a caller that gave up early could not tell
+    whether its row was committed, and cleaning up after a committed row
+    would leave it without a body and its hash back in circulation.
+    `timeout` only bounds how long close() waits for the last batch.
+    """
+
+    def __init__(self, engine, repository_factory: Callable[[Session], object],
+                 window_ms: float = 5, max_batch: int = 100, timeout: float = 30):
+        self.engine = engine
+        self.repository_factory = repository_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+
+        self._pending: list[tuple[TextEntity, Future]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._batches = 0
+        self._texts = 0
+
+    def submit(self, text: TextEntity) -> TextEntity:
+        """Queue a text for the next group commit and wait for its result"""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise Exception("Group committer is closed")
+            self._pending.append((text, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        # No timeout of our own: only the batch's outcome tells whether the
+        # caller has to clean up
+        return future.result()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+
+                # Give concurrent callers a short window to join this batch
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            self._flush(batch)
+
+    def _flush(self, batch: list[tuple[TextEntity, Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            with Session(self.engine) as session:
+                created = self.repository_factory(session).create_many(texts)
+            for (_, future), text_entity in zip(batch, created):
+                future.set_result(text_entity)
+            self._batches += 1
+            self._texts += len(batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            logging.warning(f"Group commit of {len(batch)} texts failed, retrying individually: {e}")
+
+        # Isolate the failing texts so the others still succeed
+        for text, future in batch:
+            try:
+                with Session(self.engine) as session:
+                    future.set_result(self.repository_factory(session).create(text))
+            except Exception as e:
+                future.set_exception(e)
+
+    def close(self):
+        """Flush what is pending and stop the background thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "batches": self._batches,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else None,
+            }
+
+
+_committer: Optional[TextGroupCommitter] = None
+_committer_lock = threading.Lock()
+
+
+def get_text_group_committer() -> Optional[TextGroupCommitter]:
+    """Process-wide group committer, or None if TEXT_GROUP_COMMIT_WINDOW_MS is not set"""
+    global _committer
+    window_ms = float(os.getenv("TEXT_GROUP_COMMIT_WINDOW_MS", "0"))
+    if window_ms <= 0:
+        return None
+
+    with _committer_lock:
+        if _committer is None:
+            from app.infrastructure.database.database import engine
+            from app.infrastructure.database.redis_client import create_redis_client
+            from app.infrastructure.hashing.hash_allocator_factory import get_hash_allocator
+            from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+
+            redis_client = create_redis_client()
+            _committer = TextGroupCommitter(
+                engine,
+                lambda session: SQLAlchemyTextRepository(
+                    session, redis_client,
+                    hash_allocator=get_hash_allocator()
+                ),
+                window_ms=window_ms,
+                max_batch=int(os.getenv("TEXT_GROUP_COMMIT_MAX_BATCH", "100")),
+            )
+        return _committer
+
+
+def close_text_group_committer():
+    """Flush pending creates (call on shutdown)"""
+    global _committer
+    with _committer_lock:
+        if _committer is not None:
+            _committer.close()
+            _committer = None
@@ -2,55 +2,94 @@
 from app.domain.entities.text import Text
 from app.domain.repositories.text_repository import TextRepository
 from app.infrastructure.database.models import Texts as TextModel
+from app.infrastructure.database.models import TextBlobs as TextBlobModel
+from app.infrastructure.database.models import TextSegments as TextSegmentModel
+from app.infrastructure.storage.segment_storage_service import is_segment_location, parse_segment_location
 from sqlmodel import select
+from sqlalchemy import insert, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.domain.entities.text import Text as TextEntity
 from redis import Redis
+import logging
 import os
 import time
 import uuid
 import random
+import threading
 from datetime import datetime, timezone
 from sqlmodel import Session
 from typing import Optional
+from collections import Counter
+from app.domain.repositories.hash_allocator import HashAllocator
+from app.infrastructure.hashing.refill_policy import HashRefillPolicy
+from app.infrastructure.hashing.hash_recycler import HashRecycler
+from app.infrastructure.hashing.scripts import POP_HASH_BATCH_SCRIPT, REFILL_POLICY_LUA, TAKE_RECYCLED_LUA
+from app.infrastructure.hashing.shards import HashQueueShard, hash_queue_shards, shard_order
+from app.infrastructure.cache.text_hash_filter import get_hash_filter
+
+logger = logging.getLogger(__name__)
 
 class SQLAlchemyTextRepository(TextRepository):
-    def __init__(self, db, redis_client: Redis = None, hash_threshold: int = 10):
+    # Shared by all instances in the process (one repository is built per request)
+    _waiting_threads = 0
+    _waiters_lock = threading.Lock()
+
+    def __init__(self, db, redis_client: Redis = None, hash_threshold: int = None,
+                 hash_allocator: Optional[HashAllocator] = None, group_committer=None):
         self.db = db
         self.redis = redis_client
-        self.hash_threshold = hash_threshold
-        self.hash_queue_key = "text_hash_queue"
-        self.hash_generation_lock = "hash_generation_lock"
-        self.hash_request_stream = "hash_generation_requests"
+        # Minimum queue length before a refill is requested (the adaptive policy may raise it)
+        self.hash_threshold = int(
+            hash_threshold if hash_threshold is not None else os.getenv("HASH_QUEUE_THRESHOLD", "1000")
+        )
+        self.hash_allocator = hash_allocator
+        self.group_committer = group_committer
+        # Filter of issued hashes that lets lookups of unknown ones skip the database
+        self.hash_filter = get_hash_filter()
+        # Hashes are taken from this process's home shard first, then from the others
+        self.shard_order = shard_order(hash_queue_shards())
+        self.hash_queue_key = self.shard_order[0].queue_key
+        self.hash_generation_lock = self.shard_order[0].lock_key
+        self.hash_request_stream = self.shard_order[0].request_stream
         self.service_id = os.getenv("SERVICE_ID", "text-service-1")
+        self.hash_wait_timeout = float(os.getenv("HASH_WAIT_TIMEOUT_SECONDS", "10"))
+        self.hash_wait_slice = float(os.getenv("HASH_WAIT_SLICE_SECONDS", "1"))
         
-        # NEW: Atomic check-consume-or-request script
-        self.atomic_check_consume_script = """
+        # Atomic check-consume-or-request script. The refill threshold and
+        # batch size come from the adaptive refill policy, with the configured
+        # values as floors; generation is requested as soon as the queue drops
+        # below the threshold, not only once it is empty.
+        self.atomic_check_consume_script = REFILL_POLICY_LUA + TAKE_RECYCLED_LUA + """
             local queue_key = KEYS[1]
             local lock_key = KEYS[2]
             local stream_key = KEYS[3]
-            local threshold = tonumber(ARGV[1])
+            local stats_key = KEYS[4]
+            local recycle_key = KEYS[5]
             local lock_ttl = tonumber(ARGV[2])
-            local batch_size = ARGV[3]
             local service_id = ARGV[4]
             local request_id = ARGV[5]
             
-            -- Try to consume a hash first
-            local hash_value = redis.call('LPOP', queue_key)
+            -- Reuse a cooled-down hash of an expired text first, then consume from the queue
+            local hash_value = take_recycled(recycle_key, 1)[1]
+            local popped = 0
+            if not hash_value then
+                hash_value = redis.call('LPOP', queue_key)
+                if hash_value then
+                    popped = 1
+                end
+            end
             local queue_length = redis.call('LLEN', queue_key)
             
-            if hash_value then
-                -- Success: got a hash
-                return {
-                    'status', 'success',
-                    'hash', hash_value,
-                    'queue_length', queue_length
-                }
-            end
+            local threshold, batch_size = refill_policy(
+                stats_key, popped, tonumber(ARGV[1]), tonumber(ARGV[3]),
+                tonumber(ARGV[6]), tonumber(ARGV[7]), tonumber(ARGV[8]), tonumber(ARGV[9]), tonumber(ARGV[10]))
             
-            -- No hash available, check if we need to request generation
+            -- Check if we need to request generation
+            local lock_acquired = false
+            local message_id = nil
             if queue_length < threshold then
                 -- Try to acquire lock for hash generation
-                local lock_acquired = redis.call('SET', lock_key, service_id, 'NX', 'EX', lock_ttl)
+                lock_acquired = redis.call('SET', lock_key, service_id, 'NX', 'EX', lock_ttl)
                 
                 if lock_acquired then
                     -- Send generation request
@@ -63,22 +102,33 @@ class SQLAlchemyTextRepository(TextRepository):
                         'queue_length', queue_length
                     }
                     
-                    local message_id = redis.call('XADD', stream_key, '*', unpack(message))
-                    
-                    return {
-                        'status', 'generation_requested',
-                        'message_id', message_id,
-                        'queue_length', queue_length,
-                        'lock_acquired', 1
-                    }
-                else
-                    -- Someone else is already requesting
-                    return {
-                        'status', 'generation_in_progress',
-                        'queue_length', queue_length,
-                        'lock_acquired', 0
-                    }
+                    message_id = redis.call('XADD', stream_key, '*', unpack(message))
                 end
+            end
+            
+            if hash_value then
+                -- Success: got a hash
+                return {
+                    'status', 'success',
+                    'hash', hash_value,
+                    'queue_length', queue_length
+                }
+            end
+            
+            if message_id then
+                return {
+                    'status', 'generation_requested',
+                    'message_id', message_id,
+                    'queue_length', queue_length,
+                    'lock_acquired', 1
+                }
+            elseif queue_length < threshold then
+                -- Someone else is already requesting
+                return {
+                    'status', 'generation_in_progress',
+                    'queue_length', queue_length,
+                    'lock_acquired', 0
+                }
             else
                 -- Queue has enough hashes but all consumed by other threads
                 return {
@@ -89,7 +139,10 @@ class SQLAlchemyTextRepository(TextRepository):
         """
         
         # Register the script
+        self.refill_policy = HashRefillPolicy(self.redis)
+        self.hash_recycler = HashRecycler(self.redis)
         self.atomic_script = self.redis.register_script(self.atomic_check_consume_script)
+        self.batch_consume_script = self.redis.register_script(POP_HASH_BATCH_SCRIPT)
     
     def check_hash_availability(self):
         """Atomically check availability and acquire lock if needed"""
@@ -151,6 +204,10 @@ class SQLAlchemyTextRepository(TextRepository):
     def create(self, text: Text, max_retries: int = 5) -> TextEntity:
         """Create text with atomic hash consumption and proper cleanup"""
         
+        # Group-commit mode: merged with concurrent creates into one transaction
+        if self.group_committer:
+            return self.group_committer.submit(text)
+        
         consumed_hash = None
         db_transaction_started = False
         
@@ -159,10 +216,16 @@ class SQLAlchemyTextRepository(TextRepository):
             self.db.begin()
             db_transaction_started = True
             
-            # Atomic hash consumption with intelligent retry
-            consumed_hash = self._atomic_consume_hash_with_retry(max_retries)
+            # Use a hash reserved up front by the caller (who also gives it back on
+            # failure), else take one from the allocator or consume one atomically
+            hash_value = text.hash_value
+            if not hash_value:
+                consumed_hash = self.hash_allocator.take() if self.hash_allocator else None
+                if not consumed_hash:
+                    consumed_hash = self._atomic_consume_hash_with_retry(max_retries)
+                hash_value = consumed_hash
             
-            if not consumed_hash:
+            if not hash_value:
                 raise Exception("Failed to acquire hash after all retries")
             
             # Create database record
@@ -170,14 +233,17 @@ class SQLAlchemyTextRepository(TextRepository):
                 id=text.id,
                 location=text.location,
                 expiration_date=text.expiration_date,
-                hash_value=consumed_hash,
+                hash_value=hash_value,
                 created_at=text.created_at,
-                updated_at=text.updated_at
+                updated_at=text.updated_at,
+                content_digest=text.content_digest,
+                inline_content=text.inline_content
             )
             
             self.db.add(text_model)
             self.db.commit()
             self.db.refresh(text_model)
+            self._add_to_hash_filter([hash_value])
             
             return TextEntity.from_model(text_model)
             
@@ -191,29 +257,234 @@ class SQLAlchemyTextRepository(TextRepository):
             
             raise e
 
-    def _atomic_consume_hash_with_retry(self, max_retries: int) -> str:
-        """Atomically consume hash with intelligent retry strategy"""
+    def create_many(self, texts: list[Text], max_retries: int = 5) -> list[TextEntity]:
+        """Create texts with one hash reservation and a single multi-row INSERT"""
+        if not texts:
+            return []
         
-        for attempt in range(max_retries):
+        consumed_hashes = []
+        db_transaction_started = False
+        
+        try:
+            self.db.begin()
+            db_transaction_started = True
+            
+            # Texts may arrive with hashes reserved up front; consume the rest
+            consumed_hashes = self._consume_hashes(
+                sum(1 for text in texts if not text.hash_value), max_retries
+            )
+            remaining = iter(consumed_hashes)
+            hash_values = [text.hash_value or next(remaining) for text in texts]
+            
+            rows = [
+                {
+                    "id": uuid.UUID(str(text.id)),
+                    "location": text.location,
+                    "expiration_date": text.expiration_date,
+                    "hash_value": hash_value,
+                    "created_at": text.created_at,
+                    "updated_at": text.updated_at,
+                    "content_digest": text.content_digest,
+                    "inline_content": text.inline_content,
+                }
+                for text, hash_value in zip(texts, hash_values)
+            ]
+            
+            # One INSERT ... VALUES (...), (...) statement; every column value is
+            # already known so there is nothing to refresh afterwards
+            self.db.execute(insert(TextModel).values(rows))
+            self.db.commit()
+            self._add_to_hash_filter(hash_values)
+            
+            return [TextEntity(**row) for row in rows]
+            
+        except Exception as e:
+            if db_transaction_started:
+                self.db.rollback()
+            
+            self._return_hashes_to_queue(consumed_hashes)
+            
+            raise e
+
+    def reserve_hash(self, max_retries: int = 5) -> str:
+        """Consume a hash up front, outside of any database transaction"""
+        hash_value = self.hash_allocator.take() if self.hash_allocator else None
+        if not hash_value:
+            hash_value = self._atomic_consume_hash_with_retry(max_retries)
+        if not hash_value:
+            raise Exception("Failed to acquire hash after all retries")
+        return hash_value
+
+    def release_hash(self, hash_value: str):
+        """Give back a hash from reserve_hash that ended up unused"""
+        self._return_hash_to_queue(hash_value)
+
+    def persist(self, text: Text) -> TextEntity:
+        """Insert a text whose hash was assigned up front; a no-op if it already exists"""
+        statement = pg_insert(TextModel).values(
+            id=uuid.UUID(str(text.id)),
+            location=text.location,
+            expiration_date=text.expiration_date,
+            hash_value=text.hash_value,
+            created_at=text.created_at,
+            updated_at=text.updated_at,
+            content_digest=text.content_digest,
+            inline_content=text.inline_content
+        ).on_conflict_do_nothing()
+        
+        try:
+            result = self.db.execute(statement)
+            # A retry took a blob reference of its own, but only the first
+            # successful attempt keeps one
+            if not result.rowcount:
+                if text.content_digest:
+                    self._dereference_blobs(Counter([text.content_digest]))
+                # Likewise for the segment record the retry appended
+                self._release_segment_bytes([text.location])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        self._add_to_hash_filter([text.hash_value])
+        return text
+    
+    def _add_to_hash_filter(self, hash_values: list[str]):
+        """Record committed hashes in the filter, before anyone is told about them
+        
+        Adding only after the commit means a concurrent filter rebuild either
+        finds the row or receives the add.
+        """
+        if not self.hash_filter:
+            return
+        # The rows are committed, so never fail the create from here
+        for attempt in range(3):
             try:
-                # Execute atomic script
-                result = self.atomic_script(
-                    keys=[
-                        self.hash_queue_key,
-                        self.hash_generation_lock, 
-                        self.hash_request_stream
-                    ],
+                self.hash_filter.add(hash_values)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to add {len(hash_values)} hashes to the hash filter (attempt {attempt + 1}): {e}")
+                time.sleep(0.05 * (attempt + 1))
+        
+        # Fail open: let them bypass the filter until a rebuild has picked them up
+        try:
+            self.hash_filter.bypass(hash_values)
+        except Exception:
+            logger.exception(
+                f"Failed to let {len(hash_values)} hashes bypass the hash filter; "
+                "they read as missing until the next rebuild"
+            )
+
+    def reference_blob(self, digest: str, location: str):
+        """Take a reference on a content-addressed blob before its object is stored or verified
+        
+        Committed right away, in a session of its own (uploads run concurrently):
+        once the row counts this reference, cleanup_expired_texts won't delete
+        the object, and if the create fails release_blobs gives it back so a
+        freshly uploaded object is still reaped.
+        """
+        statement = pg_insert(TextBlobModel).values(digest=digest, location=location, ref_count=1)
+        with Session(self.db.get_bind()) as session:
+            session.execute(statement.on_conflict_do_update(
+                index_elements=[TextBlobModel.digest],
+                set_={"ref_count": TextBlobModel.ref_count + 1}
+            ))
+            session.commit()
+    
+    def release_blobs(self, digests: list[str]):
+        """Give back references from reference_blob whose texts were never created"""
+        references = Counter(digest for digest in digests if digest)
+        if not references:
+            return
+        with Session(self.db.get_bind()) as session:
+            for digest, count in references.items():
+                session.execute(
+                    update(TextBlobModel)
+                    .where(TextBlobModel.digest == digest)
+                    .values(ref_count=TextBlobModel.ref_count - count)
+                )
+            session.commit()
+    
+    def _dereference_blobs(self, references: Counter):
+        """Drop references to blobs (inside the caller's transaction)"""
+        for digest, count in references.items():
+            self.db.execute(
+                update(TextBlobModel)
+                .where(TextBlobModel.digest == digest)
+                .values(ref_count=TextBlobModel.ref_count - count)
+            )
+
+    def _consume_hashes(self, count: int, max_retries: int) -> list[str]:
+        """Reserve `count` hashes, popping from the queue in a single script call"""
+        hashes = []
+        
+        if self.hash_allocator:
+            while len(hashes) < count:
+                hash_value = self.hash_allocator.take()
+                if not hash_value:
+                    break
+                hashes.append(hash_value)
+        
+        try:
+            # Own shard first; others cover it while its refill is in flight
+            for shard in self.shard_order:
+                if len(hashes) >= count:
+                    break
+                popped = self.batch_consume_script(
+                    keys=self._shard_keys(shard),
                     args=[
+                        count - len(hashes),
                         str(self.hash_threshold),
                         "60",  # Lock TTL
                         os.getenv("HASH_BATCH_SIZE", "100"),
                         self.service_id,
-                        str(uuid.uuid4())
+                        str(uuid.uuid4()),
+                        *self.refill_policy.script_args()
                     ]
                 )
+                hashes.extend(h.decode() if isinstance(h, bytes) else h for h in popped or [])
+            
+            # Queue ran short: wait for the remainder like single creates do
+            while len(hashes) < count:
+                hash_value = self._atomic_consume_hash_with_retry(max_retries)
+                if not hash_value:
+                    raise Exception(f"Failed to acquire {count} hashes after all retries")
+                hashes.append(hash_value)
+        except Exception:
+            self._return_hashes_to_queue(hashes)
+            raise
+        
+        return hashes
+
+    def _atomic_consume_hash_with_retry(self, max_retries: int) -> str:
+        """Atomically consume hash, blocking on the queue until one arrives or the wait budget runs out"""
+        
+        deadline = time.monotonic() + self.hash_wait_timeout
+        errors = 0
+        
+        while True:
+            try:
+                # Execute atomic script on each shard, own shard first, until one has a hash.
+                # Empty shards request their own refill along the way.
+                result_dict = None
+                for shard in self.shard_order:
+                    shard_result = self._parse_lua_result(self.atomic_script(
+                        keys=self._shard_keys(shard),
+                        args=[
+                            str(self.hash_threshold),
+                            "60",  # Lock TTL
+                            os.getenv("HASH_BATCH_SIZE", "100"),
+                            self.service_id,
+                            str(uuid.uuid4()),
+                            *self.refill_policy.script_args()
+                        ]
+                    ))
+                    if result_dict is None or shard_result['status'] == 'success':
+                        result_dict = shard_result
+                    if shard_result['status'] == 'success':
+                        break
                 
-                # Parse result
-                result_dict = self._parse_lua_result(result)
+                # Status of the successful shard, otherwise of the own shard
                 status = result_dict['status']
                 
                 if status == 'success':
@@ -221,33 +492,77 @@ class SQLAlchemyTextRepository(TextRepository):
                     
                 elif status == 'generation_requested':
                     print(f"Hash generation requested. Message ID: {result_dict.get('message_id')}")
-                    delay = self._calculate_generation_delay(attempt)
                     
                 elif status == 'generation_in_progress': 
                     print("Hash generation already in progress")
-                    delay = self._calculate_wait_delay(attempt)
                     
                 elif status == 'temporarily_unavailable':
                     print("Hashes temporarily unavailable")
-                    delay = self._calculate_backoff_delay(attempt)
                     
                 else:
                     raise Exception(f"Unknown status: {status}")
                 
-                # Wait before retry (except on last attempt)
-                if attempt < max_retries - 1:
-                    print(f"Attempt {attempt + 1} failed, retrying in {delay:.2f}s")
-                    time.sleep(delay)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                
+                # Block on the queue itself so we wake as soon as hashes are pushed.
+                # Waiting in slices lets us re-run the script and re-request
+                # generation if the lock holder went away.
+                hash_value = self._wait_for_hash(min(remaining, self.hash_wait_slice))
+                if hash_value:
+                    return hash_value
                     
             except Exception as e:
-                if attempt < max_retries - 1:
-                    delay = self._calculate_error_delay(attempt)
-                    print(f"Error on attempt {attempt + 1}: {str(e)}, retrying in {delay:.2f}s")
-                    time.sleep(delay)
-                else:
+                errors += 1
+                remaining = deadline - time.monotonic()
+                if errors >= max_retries or remaining <= 0:
                     raise e
+                delay = min(self._calculate_error_delay(errors - 1), remaining)
+                logger.warning(f"Error on attempt {errors}: {e}, retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _shard_keys(self, shard: HashQueueShard) -> list[str]:
+        """KEYS for the consuming scripts (all in the shard's cluster slot)"""
+        return [shard.queue_key, shard.lock_key, shard.request_stream, shard.stats_key, shard.recycle_key]
+
+    def _wait_for_hash(self, timeout: float) -> Optional[str]:
+        """BLPOP a hash from any shard's queue, counting this thread as a waiter meanwhile
         
-        return None
+        BLPOP takes from the first non-empty key, so the home shard still goes first.
+        """
+        with SQLAlchemyTextRepository._waiters_lock:
+            SQLAlchemyTextRepository._waiting_threads += 1
+        try:
+            # BLPOP treats 0 as "forever", so never pass less than 10ms
+            result = self.redis.blpop(
+                [shard.queue_key for shard in self.shard_order], timeout=max(timeout, 0.01)
+            )
+        finally:
+            with SQLAlchemyTextRepository._waiters_lock:
+                SQLAlchemyTextRepository._waiting_threads -= 1
+        
+        if not result:
+            return None
+        queue_key, hash_value = result
+        queue_key = queue_key.decode() if isinstance(queue_key, bytes) else queue_key
+        hash_value = hash_value.decode() if isinstance(hash_value, bytes) else hash_value
+        
+        # The pop scripts count what they take towards the refill policy; so must we
+        shard = next(shard for shard in self.shard_order if shard.queue_key == queue_key)
+        try:
+            self.refill_policy.record_consumption(
+                shard.stats_key, 1, self.hash_threshold, int(os.getenv("HASH_BATCH_SIZE", "100"))
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record hash consumption on {shard.stats_key}: {e}")
+        return hash_value
+
+    @classmethod
+    def waiting_threads(cls) -> int:
+        """Number of threads in this process currently blocked waiting for a hash"""
+        with cls._waiters_lock:
+            return cls._waiting_threads
 
     def _parse_lua_result(self, result: list) -> dict:
         """Convert Lua script result to dictionary"""
@@ -262,6 +577,10 @@ class SQLAlchemyTextRepository(TextRepository):
 
     def _return_hash_to_queue(self, hash_value: str):
         """Return unused hash back to queue (compensating action)"""
+        if self.hash_allocator and hash_value:
+            self.hash_allocator.give_back(hash_value)
+            return
+
         try:
             if self.redis and hash_value:
                 self.redis.lpush(self.hash_queue_key, hash_value)
@@ -270,22 +589,22 @@ class SQLAlchemyTextRepository(TextRepository):
             print(f"Failed to return hash to queue: {str(e)}")
             # Log this for manual intervention
 
-    def _calculate_generation_delay(self, attempt: int) -> float:
-        """Calculate delay when waiting for hash generation"""
-        # Longer delays since generation takes time
-        base_delay = 2.0
-        return base_delay * (1.5 ** attempt) + random.uniform(0, 1)
-
-    def _calculate_wait_delay(self, attempt: int) -> float:
-        """Calculate delay when generation is already in progress"""
-        # Shorter delays since we're just waiting
-        base_delay = 0.5
-        return base_delay * (1.2 ** attempt) + random.uniform(0, 0.5)
-
-    def _calculate_backoff_delay(self, attempt: int) -> float:
-        """Calculate exponential backoff delay"""
-        base_delay = 0.1
-        return base_delay * (2 ** attempt) + random.uniform(0, 0.2)
+    def _return_hashes_to_queue(self, hash_values: list[str]):
+        """Return several unused hashes back to queue (compensating action)"""
+        if not hash_values:
+            return
+        
+        if self.hash_allocator:
+            for hash_value in hash_values:
+                self.hash_allocator.give_back(hash_value)
+            return
+        
+        try:
+            if self.redis:
+                self.redis.lpush(self.hash_queue_key, *reversed(hash_values))
+                logger.info(f"Returned {len(hash_values)} hashes to queue")
+        except Exception as e:
+            logger.exception(f"Failed to return {len(hash_values)} hashes to queue: {e}")
 
     def _calculate_error_delay(self, attempt: int) -> float:
         """Calculate delay for error scenarios"""
@@ -308,22 +627,39 @@ class SQLAlchemyTextRepository(TextRepository):
             return {"status": "unhealthy", "reason": "Redis unavailable"}
         
         try:
-            queue_length = self.redis.llen(self.hash_queue_key)
-            lock_exists = self.redis.exists(self.hash_generation_lock)
-            lock_ttl = self.redis.ttl(self.hash_generation_lock) if lock_exists else None
-            
-            # Detect stuck locks (Point 2 monitoring)
-            if lock_exists and (lock_ttl is None or lock_ttl < 5):
-                print("Detected potentially stuck lock, releasing...")
-                self.redis.delete(self.hash_generation_lock)
+            shards = []
+            for shard in sorted(self.shard_order, key=lambda shard: shard.index):
+                lock_exists = self.redis.exists(shard.lock_key)
+                lock_ttl = self.redis.ttl(shard.lock_key) if lock_exists else None
+                
+                # Detect stuck locks (Point 2 monitoring)
+                if lock_exists and (lock_ttl is None or lock_ttl < 5):
+                    logger.warning(f"Detected potentially stuck lock {shard.lock_key}, releasing...")
+                    self.redis.delete(shard.lock_key)
+                
+                shards.append({
+                    "index": shard.index,
+                    "home": shard == self.shard_order[0],
+                    "queue_length": self.redis.llen(shard.queue_key),
+                    "lock_exists": bool(lock_exists),
+                    "lock_ttl": lock_ttl,
+                    "recycled_hashes": self.redis.zcard(shard.recycle_key),
+                    "refill_policy": self.refill_policy.snapshot(shard.stats_key),
+                })
+            home = next(shard for shard in shards if shard["home"])
             
             return {
                 "status": "healthy",
-                "queue_length": queue_length,
-                "lock_exists": bool(lock_exists),
-                "lock_ttl": lock_ttl,
+                "queue_length": sum(shard["queue_length"] for shard in shards),
+                "lock_exists": home["lock_exists"],
+                "lock_ttl": home["lock_ttl"],
                 "atomic_operations": "lua_scripts",  # Point 1 status
                 "retry_capability": True,  # Point 3 status
+                "hash_waiters": self.waiting_threads(),
+                "hash_allocator": self.hash_allocator.stats() if self.hash_allocator else None,
+                "group_commit": self.group_committer.stats() if self.group_committer else None,
+                "refill_policy": home["refill_policy"],
+                "shards": shards,
             }
         except Exception as e:
             return {"status": "unhealthy", "reason": str(e)}
@@ -338,6 +674,15 @@ class SQLAlchemyTextRepository(TextRepository):
         )
         return self.db.exec(statement).first()
     
+    def iter_active_hashes(self, batch_size: int = 10000):
+        """Stream the hashes of all non-expired texts"""
+        statement = select(TextModel.hash_value).where(
+            (TextModel.expiration_date.is_(None)) | 
+            (TextModel.expiration_date > datetime.now(timezone.utc))
+        ).execution_options(yield_per=batch_size)
+        for hash_value in self.db.exec(statement):
+            yield hash_value
+    
     def get_all_active_texts(self) -> list[TextModel]:
         """Get all non-expired texts"""
         statement = select(TextModel).where(
@@ -348,14 +693,85 @@ class SQLAlchemyTextRepository(TextRepository):
     
     def cleanup_expired_texts(self) -> int:
         """Remove expired texts - run this as a background job"""
+        return len(self.expire_texts())
+    
+    def expire_texts(self) -> list[str]:
+        """Remove expired texts and return their hashes"""
+        # Rows another cleanup run is already removing are skipped
         statement = select(TextModel).where(
             TextModel.expiration_date.is_not(None),
             TextModel.expiration_date <= datetime.now(timezone.utc)
-        )
+        ).with_for_update(skip_locked=True)
         expired_texts = self.db.exec(statement).all()
+        released = Counter(text.content_digest for text in expired_texts if text.content_digest)
         
         for text in expired_texts:
             self.db.delete(text)
         
+        # Drop the references the expired texts held on shared blobs
+        self._dereference_blobs(released)
+        
+        # Segment space they used becomes reclaimable by compaction
+        self._release_segment_bytes([text.location for text in expired_texts])
+        
+        self.db.commit()
+        
+        # Only once the rows are gone may their hashes be handed out again
+        expired_hashes = [text.hash_value for text in expired_texts]
+        self._recycle_hashes(expired_hashes)
+        return expired_hashes
+    
+    def _release_segment_bytes(self, locations: list[str]):
+        """Subtract the records at these locations from their segments' live bytes (not committed)"""
+        released = Counter()
+        for location in locations:
+            if is_segment_location(location):
+                _, key, _, length = parse_segment_location(location)
+                released[key] += length
+        
+        for key, length in released.items():
+            self.db.execute(
+                update(TextSegmentModel)
+                .where(TextSegmentModel.key == key)
+                .values(live_bytes=TextSegmentModel.live_bytes - length)
+            )
+    
+    def _recycle_hashes(self, hash_values: list[str]):
+        """Queue freed hashes for reuse; only the Redis-backed allocators take them"""
+        if os.getenv("HASH_ALLOCATOR", "redis") != "redis":
+            return
+        try:
+            self.hash_recycler.recycle(hash_values)
+        except Exception as e:
+            logger.exception(f"Failed to recycle {len(hash_values)} hashes: {e}")
+    
+    def delete_unreferenced_blobs(self, delete_object, limit: int = 100) -> int:
+        """Delete blobs no text references any more, return how many
+        
+        Each object is deleted by `delete_object(location)` while its row is
+        still locked, and the row only afterwards. A create referencing the
+        blob meanwhile waits for the row, then inserts it anew and finds the
+        object gone, so it uploads the body again instead of pointing at a
+        deleted object. Blobs whose object could not be deleted stay for the
+        next run.
+        """
+        statement = (
+            select(TextBlobModel)
+            .where(TextBlobModel.ref_count <= 0)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        blobs = self.db.exec(statement).all()
+        
+        deleted = []
+        for blob in blobs:
+            try:
+                delete_object(blob.location)
+                deleted.append(blob.digest)
+            except Exception as e:
+                logger.exception(f"Failed to delete unreferenced blob {blob.location}: {e}")
+        
+        if deleted:
+            self.db.execute(delete(TextBlobModel).where(TextBlobModel.digest.in_(deleted)))
         self.db.commit()
-        return len(expired_texts)
+        return len(deleted)
@@ -0,0 +1,135 @@
+import gzip
+import os
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+
+class TextCodec:
+    """Compression codec for stored text bodies.
+
+    `name` doubles as the HTTP Content-Encoding token. Every codec's magic
+    bytes are invalid as the start of UTF-8 text, so stored bodies are
+    self-describing: anything without a known magic prefix is plain text.
+    """
+    name: str = None
+    magic: bytes = None
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def compressor(self):
+        """Streaming compressor with compress(chunk) / flush() methods"""
+        raise NotImplementedError
+
+    def decompressor(self):
+        """Streaming decompressor with decompress(chunk) / flush() methods"""
+        raise NotImplementedError
+
+
+class GzipCodec(TextCodec):
+    name = "gzip"
+    magic = b"\x1f\x8b"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+    def compressor(self):
+        # wbits=31 writes a gzip header and trailer, same format as compress()
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def decompressor(self):
+        return zlib.decompressobj(31)
+
+
+class ZstdCodec(TextCodec):
+    name = "zstd"
+    magic = b"\x28\xb5\x2f\xfd"
+
+    def __init__(self, level: int = 3):
+        if zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        # decompressobj also handles streamed frames without a content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+
+    def decompressor(self):
+        return zstandard.ZstdDecompressor().decompressobj()
+
+
+_CODECS = {"gzip": GzipCodec, "zstd": ZstdCodec}
+_MAGICS = {GzipCodec.magic: "gzip", ZstdCodec.magic: "zstd"}
+CODEC_NAMES = tuple(_CODECS)
+
+
+def get_codec(name: Optional[str] = None) -> Optional[TextCodec]:
+    """Codec configured by TEXT_COMPRESSION (gzip, zstd or none)"""
+    name = (name or os.getenv("TEXT_COMPRESSION", "none")).lower()
+    if name in ("", "none"):
+        return None
+    if name not in _CODECS:
+        raise ValueError(f"Unknown TEXT_COMPRESSION codec: {name}")
+
+    level = os.getenv("TEXT_COMPRESSION_LEVEL")
+    return _CODECS[name](int(level)) if level else _CODECS[name]()
+
+
+def detect_codec(data: bytes) -> Optional[TextCodec]:
+    """Codec a stored body was compressed with, or None for plain text"""
+    for magic, name in _MAGICS.items():
+        if data.startswith(magic):
+            return _CODECS[name]()
+    return None
+
+
+def encode_text(text: str, codec: Optional[TextCodec]) -> bytes:
+    """Text to stored bytes"""
+    data = text.encode("utf-8")
+    return codec.compress(data) if codec else data
+
+
+def decode_body(data) -> str:
+    """Stored bytes (compressed or not) back to text"""
+    if isinstance(data, str):
+        return data
+    codec = detect_codec(data)
+    if codec:
+        data = codec.decompress(data)
+    return data.decode("utf-8")
+
+
+def accepts_encoding(accept_encoding: Optional[str], name: str) -> bool:
+    """Whether an Accept-Encoding header allows the given content coding"""
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() not in (name, "*"):
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
@@ -1,11 +1,67 @@
 import boto3
+import logging
 from botocore.exceptions import ClientError
 import os
 from dotenv import load_dotenv
 import uuid
+import hashlib
+import base64
+import codecs
+from app.infrastructure.storage.codecs import get_codec, encode_text, decode_body
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+class S3MultipartUpload:
+    """An in-progress S3 multipart upload; parts are sent in order"""
+    
+    def __init__(self, s3_client, bucket_name: str, file_name: str, upload_id: str):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.file_name = file_name
+        self.upload_id = upload_id
+        self.parts = []
+    
+    def upload_part(self, data: bytes):
+        """Upload the next part (all but the last must be at least 5 MiB)"""
+        part_number = len(self.parts) + 1
+        try:
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=self.file_name,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=data
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to upload part {part_number} to S3: {str(e)}")
+        self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+    
+    def complete(self) -> str:
+        """Assemble the parts into the final object and return its S3 location"""
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.file_name,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts}
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to complete multipart upload to S3: {str(e)}")
+        return f"s3://{self.bucket_name}/{self.file_name}"
+    
+    def abort(self):
+        """Discard the uploaded parts"""
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.file_name,
+                UploadId=self.upload_id
+            )
+        except ClientError as e:
+            logger.warning(f"Failed to abort multipart upload {self.upload_id}: {e}")
+
 class S3StorageService:
     def __init__(self):
         self.s3_client = boto3.client(
@@ -16,24 +72,29 @@ class S3StorageService:
             endpoint_url=os.getenv('BACKBLAZE_ENDPOINT_URL')
         )
         self.bucket_name = os.getenv('BACKBLAZE_BUCKET_NAME')
+        self.content_addressed = os.getenv('CONTENT_ADDRESSED_STORAGE', 'false').lower() == 'true'
+        self.codec = get_codec()
+    
+    @staticmethod
+    def content_digest(text: str) -> str:
+        """SHA-256 digest identifying a text body"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
     
-    def upload_text(self, content: str, text: str = None) -> str:
-        """Upload text and return S3 location"""
+    def upload_text(self, content: str, text: str = None, file_name: str = None) -> str:
+        """Upload text and return S3 location (pass file_name to make retries overwrite)"""
         if not text:
             text = content
+        
+        if self.content_addressed:
+            return self.upload_blob(text)
             
         try:
             
             # Generate a unique file name
-            file_name = f"{uuid.uuid4()}.txt"
+            file_name = file_name or f"{uuid.uuid4()}.txt"
             
             # Upload text directly to S3
-            self.s3_client.put_object(
-                Body=text,
-                Bucket=self.bucket_name,
-                Key=file_name,
-                ContentType='text/plain'
-            )
+            self._put_text(file_name, text)
             
             location = f"s3://{self.bucket_name}/{file_name}"
             return location
@@ -41,18 +102,171 @@ class S3StorageService:
         except ClientError as e:
             raise Exception(f"Failed to upload text to S3: {str(e)}")
     
+    def blob_location(self, digest: str) -> str:
+        """S3 location of the blob stored under a content digest"""
+        return f"s3://{self.bucket_name}/blobs/{digest}.txt"
+    
+    def upload_blob(self, text: str, digest: str = None) -> str:
+        """Store text under its content digest, skipping the PUT if it is already stored
+        
+        Take the blob reference first (TextRepository.reference_blob), so the
+        object can't be deleted between this check and the text's insert.
+        """
+        digest = digest or self.content_digest(text)
+        file_name = f"blobs/{digest}.txt"
+        
+        try:
+            if not self.object_exists(file_name):
+                self._put_text(file_name, text)
+            
+            return self.blob_location(digest)
+        
+        except ClientError as e:
+            raise Exception(f"Failed to upload text to S3: {str(e)}")
+    
+    def _put_text(self, file_name: str, text: str):
+        """PUT a body, compressed with the configured codec"""
+        extra_args = {'ContentEncoding': self.codec.name} if self.codec else {}
+        self.s3_client.put_object(
+            Body=encode_text(text, self.codec),
+            Bucket=self.bucket_name,
+            Key=file_name,
+            ContentType='text/plain; charset=utf-8',
+            **extra_args
+        )
+    
+    def start_multipart_upload(self, file_name: str = None) -> S3MultipartUpload:
+        """Start a multipart upload for a body streamed in parts (already encoded with self.codec)"""
+        file_name = file_name or f"{uuid.uuid4()}.txt"
+        extra_args = {'ContentEncoding': self.codec.name} if self.codec else {}
+        try:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=file_name,
+                ContentType='text/plain; charset=utf-8',
+                **extra_args
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to start multipart upload to S3: {str(e)}")
+        return S3MultipartUpload(self.s3_client, self.bucket_name, file_name, response["UploadId"])
+    
+    @staticmethod
+    def checksum_sha256(sha256: str) -> str:
+        """A hex SHA-256 digest in the base64 form S3 uses for x-amz-checksum-sha256"""
+        return base64.b64encode(bytes.fromhex(sha256)).decode()
+    
+    def presign_put(self, file_key: str, size: int, sha256: str, expires_in: int) -> str:
+        """Presigned URL a client can PUT a plain-text body of `size` bytes to
+        
+        The SHA-256 is signed too (the client sends it as x-amz-checksum-sha256),
+        so S3 rejects any body with a different digest, also after finalizing.
+        """
+        try:
+            return self.s3_client.generate_presigned_url(
+                'put_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': file_key,
+                    'ContentType': 'text/plain; charset=utf-8',
+                    'ContentLength': size,
+                    'ChecksumSHA256': self.checksum_sha256(sha256)
+                },
+                ExpiresIn=expires_in
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to presign S3 upload: {str(e)}")
+    
+    def object_checksum(self, file_key: str) -> tuple[int, str]:
+        """Size and S3's SHA-256 checksum (base64) of an object, without downloading it
+        
+        (None, None) if it doesn't exist; the checksum is None if the object
+        was stored without one.
+        """
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=file_key, ChecksumMode='ENABLED')
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None, None
+            raise Exception(f"Failed to inspect object in S3: {str(e)}")
+        return response['ContentLength'], response.get('ChecksumSHA256')
+    
+    def is_utf8_object(self, file_key: str, chunk_size: int = 1024 * 1024) -> bool:
+        """Whether a stored object is valid UTF-8, read in chunks"""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_key)
+        except ClientError as e:
+            raise Exception(f"Failed to retrieve text from S3: {str(e)}")
+        
+        # Split multi-byte characters are carried over between chunks
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for chunk in response['Body'].iter_chunks(chunk_size):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            response['Body'].close()
+            return False
+        return True
+    
+    def object_exists(self, file_key: str) -> bool:
+        """Check whether an object exists without downloading it"""
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=file_key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+    
     def get_text_content(self, file_key: str) -> str:
         """Get text content from S3"""
+        return decode_body(self.get_text_body(file_key))
+    
+    def get_text_body(self, file_key: str) -> bytes:
+        """Get the stored bytes from S3 as-is (compressed if stored compressed)"""
         try:
             print(f"Getting text content from S3: {file_key}, {self.bucket_name}")
             response = self.s3_client.get_object(
                 Bucket=self.bucket_name,
                 Key=file_key
             )
-            return response['Body'].read().decode('utf-8')
+            return response['Body'].read()
+        except ClientError as e:
+            raise Exception(f"Failed to retrieve text from S3: {str(e)}")
+    
+    def get_text_range(self, file_key: str, offset: int, length: int) -> bytes:
+        """Get `length` stored bytes starting at `offset` with a ranged GET"""
+        if length == 0:
+            return b""
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket_name,
+                Key=file_key,
+                Range=f"bytes={offset}-{offset + length - 1}"
+            )
+            return response['Body'].read()
         except ClientError as e:
             raise Exception(f"Failed to retrieve text from S3: {str(e)}")
     
+    def open_text_stream(self, file_key: str, start: int = None, end: int = None) -> tuple[object, int, int]:
+        """Open a stored object for streaming, optionally bytes start..end (inclusive)
+        
+        Returns the botocore body stream, the number of bytes it will yield
+        and the object's total size.
+        """
+        kwargs = {}
+        if start is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_key, **kwargs)
+        except ClientError as e:
+            raise Exception(f"Failed to retrieve text from S3: {str(e)}")
+        
+        length = response['ContentLength']
+        content_range = response.get('ContentRange')
+        total = int(content_range.rsplit('/', 1)[1]) if content_range else length
+        return response['Body'], length, total
+    
     def parse_s3_location(self, location: str) -> str:
         """Parse S3 location to get file key"""
         parts = location.replace('s3://', '').split('/', 1)
@@ -0,0 +1,321 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from sqlmodel import Session, select
+
+from app.infrastructure.database.models import Texts as TextModel
+from app.infrastructure.database.models import TextSegments as TextSegmentModel
+from app.infrastructure.storage.codecs import encode_text
+from app.infrastructure.storage.s3_storage_service import S3StorageService
+
+SEGMENT_SCHEME = "segment://"
+
+
+def is_segment_location(location: Optional[str]) -> bool:
+    return bool(location) and location.startswith(SEGMENT_SCHEME)
+
+
+def segment_location(bucket_name: str, key: str, offset: int, length: int) -> str:
+    """Location of one record: segment://<bucket>/<segment key>#<offset>:<length>"""
+    return f"{SEGMENT_SCHEME}{bucket_name}/{key}#{offset}:{length}"
+
+
+def parse_segment_location(location: str) -> tuple[str, str, int, int]:
+    """Split a segment location into (bucket, segment key, offset, length)"""
+    try:
+        path, _, span = location[len(SEGMENT_SCHEME):].partition("#")
+        bucket_name, key = path.split("/", 1)
+        offset, length = span.split(":")
+        return bucket_name, key, int(offset), int(length)
+    except ValueError:
+        raise ValueError(f"Invalid segment location format: {location}")
+
+
+class SegmentStorageService:
+    """Log-structured text storage: many texts per S3 object.
+
+    Concurrent appends are collected for up to `window_ms` (or until
+    `max_bytes` are waiting) and written as one immutable segment object;
+    each text's location records its (segment, offset, length) and reads
+    are ranged GETs. Every body is encoded on its own, so a range is a
+    complete stored body. The `text_segments` table tracks how many bytes
+    of each segment unexpired texts still use; compact() rewrites segments
+    that have dropped below `min_live_ratio` and purge_retired() deletes
+    the old objects once readers can no longer hold their locations.
+    """
+
+    def __init__(self, engine, storage_service: S3StorageService = None,
+                 window_ms: float = 20, max_bytes: int = 16 * 1024 * 1024, timeout: float = 30):
+        self.engine = engine
+        self.storage_service = storage_service or S3StorageService()
+        self.s3_client = self.storage_service.s3_client
+        self.bucket_name = self.storage_service.bucket_name
+        self.codec = self.storage_service.codec
+        self.window = window_ms / 1000
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.key_prefix = "segments/"
+
+        self.min_live_ratio = float(os.getenv("SEGMENT_COMPACTION_LIVE_RATIO", "0.5"))
+        self.min_age = int(os.getenv("SEGMENT_COMPACTION_MIN_AGE_SECONDS", "3600"))
+        self.retire_grace = int(os.getenv("SEGMENT_RETIRE_GRACE_SECONDS", "600"))
+
+        self._pending: list[tuple[bytes, Future]] = []
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._segments = 0
+        self._records = 0
+
+    def append(self, text: str) -> str:
+        """Append a body to the next segment and wait for its location"""
+        record = encode_text(text, self.codec)
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise Exception("Segment storage is closed")
+            self._pending.append((record, future))
+            self._pending_bytes += len(record)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        # No timeout of our own: the record is written whether or not we
+        # wait, and only the caller can release it
+        return future.result()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+
+                # Let concurrent appends join this segment
+                deadline = time.monotonic() + self.window
+                while self._pending_bytes < self.max_bytes and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch, size = [], 0
+                while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_bytes):
+                    record, future = self._pending.pop(0)
+                    batch.append((record, future))
+                    size += len(record)
+                self._pending_bytes -= size
+
+            self._flush(batch)
+
+    def _flush(self, batch: list[tuple[bytes, Future]]):
+        key = f"{self.key_prefix}{uuid.uuid4()}.seg"
+        body = b"".join(record for record, _ in batch)
+        try:
+            self._write_segment(key, body, len(batch))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for record, future in batch:
+            future.set_result(segment_location(self.bucket_name, key, offset, len(record)))
+            offset += len(record)
+        self._segments += 1
+        self._records += len(batch)
+
+    def _write_segment(self, key: str, body: bytes, record_count: int):
+        """PUT a segment object and register it; the object is removed again if registering fails"""
+        try:
+            self.s3_client.put_object(
+                Body=body,
+                Bucket=self.bucket_name,
+                Key=key,
+                ContentType='application/octet-stream'
+            )
+        except ClientError as e:
+            raise Exception(f"Failed to upload segment to S3: {str(e)}")
+
+        try:
+            with Session(self.engine) as session:
+                session.add(TextSegmentModel(
+                    key=key,
+                    total_bytes=len(body),
+                    live_bytes=len(body),
+                    record_count=record_count
+                ))
+                session.commit()
+        except Exception:
+            self._delete_object(key)
+            raise
+
+    def read(self, location: str) -> bytes:
+        """Stored bytes of one record, fetched with a ranged GET"""
+        _, key, offset, length = parse_segment_location(location)
+        return self.storage_service.get_text_range(key, offset, length)
+
+    def release(self, locations: list[str]):
+        """Give back the bytes of records no text will reference (failed creates)"""
+        released = {}
+        for location in locations:
+            _, key, _, length = parse_segment_location(location)
+            released[key] = released.get(key, 0) + length
+
+        with Session(self.engine) as session:
+            for key, length in released.items():
+                segment = session.get(TextSegmentModel, key)
+                if segment:
+                    segment.live_bytes -= length
+            session.commit()
+
+    def compact(self, limit: int = 10) -> int:
+        """Rewrite up to `limit` mostly-expired segments, return how many were compacted"""
+        compacted = 0
+        for _ in range(limit):
+            if not self._compact_one():
+                break
+            compacted += 1
+        return compacted
+
+    def _compact_one(self) -> bool:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.min_age)
+        with Session(self.engine) as session:
+            segment = session.exec(
+                select(TextSegmentModel)
+                .where(
+                    TextSegmentModel.retired_at.is_(None),
+                    TextSegmentModel.created_at <= cutoff,
+                    TextSegmentModel.live_bytes < TextSegmentModel.total_bytes * self.min_live_ratio
+                )
+                .order_by(TextSegmentModel.live_bytes)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if not segment:
+                return False
+
+            # Lock the live texts so cleanup can't expire them mid-move
+            prefix = f"{SEGMENT_SCHEME}{self.bucket_name}/{segment.key}#"
+            texts = session.exec(
+                select(TextModel)
+                .where(TextModel.location.startswith(prefix, autoescape=True))
+                .with_for_update()
+            ).all()
+
+            new_key = None
+            if texts:
+                data = self.s3_client.get_object(Bucket=self.bucket_name, Key=segment.key)['Body'].read()
+                records, locations, offset = [], [], 0
+                new_key = f"{self.key_prefix}{uuid.uuid4()}.seg"
+                for text in texts:
+                    _, _, start, length = parse_segment_location(text.location)
+                    records.append(data[start:start + length])
+                    locations.append(segment_location(self.bucket_name, new_key, offset, length))
+                    offset += length
+
+                self._write_segment(new_key, b"".join(records), len(records))
+                for text, location in zip(texts, locations):
+                    text.location = location
+
+            segment.live_bytes = 0
+            segment.retired_at = datetime.now(timezone.utc)
+            try:
+                session.commit()
+            except Exception:
+                if new_key:
+                    self._discard_segment(new_key)
+                raise
+
+            logging.info(f"Compacted segment {segment.key}: {len(texts)} live texts moved to {new_key}")
+            return True
+
+    def purge_retired(self, limit: int = 100) -> int:
+        """Delete retired segments whose grace period has passed"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retire_grace)
+        with Session(self.engine) as session:
+            segments = session.exec(
+                select(TextSegmentModel)
+                .where(TextSegmentModel.retired_at.is_not(None), TextSegmentModel.retired_at <= cutoff)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+            for segment in segments:
+                self._delete_object(segment.key)
+                session.delete(segment)
+            session.commit()
+            return len(segments)
+
+    def _discard_segment(self, key: str):
+        """Undo _write_segment for a segment no text ended up referencing"""
+        self._delete_object(key)
+        with Session(self.engine) as session:
+            segment = session.get(TextSegmentModel, key)
+            if segment:
+                session.delete(segment)
+                session.commit()
+
+    def _delete_object(self, key: str):
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            logging.error(f"Failed to delete segment {key}: {e}")
+
+    def close(self):
+        """Flush pending appends and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "pending_bytes": self._pending_bytes,
+                "segments": self._segments,
+                "records": self._records,
+                "avg_records_per_segment": round(self._records / self._segments, 2) if self._segments else None,
+            }
+
+
+_segment_storage: Optional[SegmentStorageService] = None
+_segment_storage_lock = threading.Lock()
+
+
+def get_segment_storage() -> Optional[SegmentStorageService]:
+    """Process-wide segment store, or None unless TEXT_STORAGE_BACKEND=segment"""
+    global _segment_storage
+    if os.getenv("TEXT_STORAGE_BACKEND", "s3").lower() != "segment":
+        return None
+
+    with _segment_storage_lock:
+        if _segment_storage is None:
+            from app.infrastructure.database.database import engine
+
+            _segment_storage = SegmentStorageService(
+                engine,
+                window_ms=float(os.getenv("SEGMENT_WINDOW_MS", "20")),
+                max_bytes=int(os.getenv("SEGMENT_MAX_BYTES", str(16 * 1024 * 1024))),
+            )
+        return _segment_storage
+
+
+def close_segment_storage():
+    """Flush pending appends (call on shutdown)"""
+    global _segment_storage
+    with _segment_storage_lock:
+        if _segment_storage is not None:
+            _segment_storage.close()
+            _segment_storage = None
@@ -2,6 +2,12 @@ from fastapi import FastAPI
 from app.presentation.api import item_router
 from app.presentation.api import user_router
 from app.presentation.api import text_router
+from app.infrastructure.hashing.hash_allocator_factory import close_hash_allocator
+from app.infrastructure.repositories.group_commit import close_text_group_committer
+from app.infrastructure.storage.segment_storage_service import close_segment_storage
+from app.infrastructure.cache.local_text_cache import close_local_text_cache
+from app.infrastructure.cache.text_hash_filter import close_hash_filter
+from app.infrastructure.cache.popularity_counter import close_popularity_counter
 from dotenv import load_dotenv
 
 app = FastAPI(title="FastAPI Project with DDD")
@@ -13,6 +19,16 @@ app.include_router(text_router.router, prefix="/api/v1", tags=["texts"])
 
 load_dotenv()
 
+@app.on_event("shutdown")
+def release_reserved_hashes():
+    # Flush pending group commits first, they may still need hashes
+    close_text_group_committer()
+    close_hash_allocator()
+    close_segment_storage()
+    close_local_text_cache()
+    close_hash_filter()
+    close_popularity_counter()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to FastAPI Project with DDD"}
\ No newline at end of file
@@ -0,0 +1,127 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request
+
+from app.domain.entities.text import Text as TextEntity
+
+# max-age for texts without an expiration date (and the cap for all others)
+TEXT_HTTP_MAX_AGE_SECONDS = int(os.getenv("TEXT_HTTP_MAX_AGE_SECONDS", str(365 * 24 * 3600)))
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def text_etag(metadata: TextEntity, weak: bool = False, encoding: str = None) -> str:
+    """ETag of a text: its hash plus the content digest (or row id, for texts stored without one)
+
+    Hashes of expired texts can be reused, so the hash alone doesn't identify a body.
+    Bodies sent with a content coding get a strong ETag of their own.
+    """
+    version = metadata.content_digest or str(metadata.id).replace("-", "")
+    suffix = f"-{encoding}" if encoding else ""
+    etag = f'"{metadata.hash_value}-{version[:16]}{suffix}"'
+    return f"W/{etag}" if weak else etag
+
+
+def text_cache_headers(metadata: TextEntity, weak_etag: bool = False, encoding: str = None) -> dict:
+    """Validators and freshness for a text, which never changes until it expires"""
+    max_age = TEXT_HTTP_MAX_AGE_SECONDS
+    if metadata.expiration_date:
+        remaining = (_as_utc(metadata.expiration_date) - datetime.now(timezone.utc)).total_seconds()
+        max_age = max(0, min(max_age, int(remaining)))
+
+    headers = {
+        "ETag": text_etag(metadata, weak_etag, encoding),
+        "Cache-Control": f"public, max-age={max_age}, immutable" if max_age else "no-cache",
+    }
+    if metadata.created_at:
+        headers["Last-Modified"] = format_datetime(_as_utc(metadata.created_at), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, headers: dict) -> bool:
+    """Whether the request's validators match, so a 304 can be sent
+
+    If-None-Match takes precedence over If-Modified-Since and, as for GET,
+    is compared weakly.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = headers["ETag"].removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole seconds
+        return parsedate_to_datetime(last_modified) <= _as_utc(since)
+    return False
+
+
+def has_validators(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the body"""
+
+
+def requested_range(request: Request, headers: dict) -> str:
+    """The byte range spec of a Range request that should be honoured, else None
+
+    Ranges are ignored (the whole body is sent) when If-Range doesn't match.
+    Entity tags there need a strong match, which weak ETags never give.
+    """
+    value = request.headers.get("range")
+    if not value:
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range is not None:
+        if_range = if_range.strip()
+        etag = headers.get("ETag", "")
+        if if_range.startswith(("\"", "W/")):
+            if etag.startswith("W/") or if_range != etag:
+                return None
+        elif if_range != headers.get("Last-Modified"):
+            return None
+
+    unit, _, spec = value.partition("=")
+    # Only single ranges are served as such; multipart ranges get the whole body
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    return spec.strip()
+
+
+def parse_byte_range(spec: str, total: int) -> tuple[int, int]:
+    """First and last byte (inclusive) of a range spec for a body of `total` bytes
+
+    Returns None for a malformed spec (the range is ignored) and raises
+    RangeNotSatisfiable for one that selects nothing.
+    """
+    first, _, last = spec.partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or total == 0:
+                raise RangeNotSatisfiable()
+            return max(total - suffix, 0), total - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if end is not None and end < start:
+        return None
+    if start >= total:
+        raise RangeNotSatisfiable()
+    return start, total - 1 if end is None else min(end, total - 1)
@@ -1,15 +1,33 @@
-from fastapi import APIRouter, Depends, Response, HTTPException, status
+from fastapi import APIRouter, Depends, Request, Response, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.infrastructure.database.database import get_db
 from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
-from pydantic import BaseModel
-from app.application.services.text_service import TextService
+from pydantic import BaseModel, Field
+from app.application.services.text_service import TextService, TextTooLargeError, UploadVerificationError
+from app.application.dto.text_dto import (
+    TextResponseDTO, TextBatchResponseDTO, TextUploadReservationDTO, TextGetResponseDTO
+)
 from datetime import datetime
-from app.infrastructure.database.redis_client import get_redis_client
+from app.infrastructure.database.redis_client import get_binary_redis_client
 from redis import Redis
 import os
+import itertools
+import logging
 from app.infrastructure.storage.s3_storage_service import S3StorageService
 from app.infrastructure.cache.text_cache_service import TextCacheService
+from app.infrastructure.cache.local_text_cache import get_local_text_cache
+from app.infrastructure.cache.pending_text_store import PendingTextStore
+from app.infrastructure.cache.upload_reservation_store import UploadReservationStore
+from app.infrastructure.hashing.hash_allocator_factory import get_hash_allocator
+from app.infrastructure.repositories.group_commit import get_text_group_committer
+from app.infrastructure.storage.segment_storage_service import get_segment_storage
+from app.infrastructure.storage.codecs import CODEC_NAMES, detect_codec, accepts_encoding
+from app.presentation.api.http_caching import (
+    RangeNotSatisfiable, has_validators, is_not_modified, parse_byte_range, requested_range, text_cache_headers,
+    text_etag
+)
 
 router = APIRouter()
 
@@ -17,43 +35,313 @@ class TextRequest(BaseModel):
     text: str
     expiration_date: datetime
 
+class TextBatchRequest(BaseModel):
+    texts: list[TextRequest]
+
+class TextUploadRequest(BaseModel):
+    expiration_date: datetime
+    size: int = Field(ge=0)
+    # Hex SHA-256 of the UTF-8 body the client is going to upload
+    sha256: str = Field(pattern=r"^[0-9a-fA-F]{64}$")
+
+TEXT_BATCH_MAX_ITEMS = int(os.getenv("TEXT_BATCH_MAX_ITEMS", "500"))
+# Largest body accepted by the streaming upload endpoint
+TEXT_UPLOAD_MAX_BYTES = int(os.getenv("TEXT_UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+RAW_MEDIA_TYPE = "text/plain; charset=utf-8"
+# Fast-ack creates, persisted by the text persistence worker
+TEXT_WRITE_BEHIND = os.getenv("TEXT_WRITE_BEHIND", "false").lower() == "true"
+
 def get_text_service(
     db: Session = Depends(get_db),
-    redis_client: Redis = Depends(get_redis_client)
+    redis_client: Redis = Depends(get_binary_redis_client)
 ):
-    repo = SQLAlchemyTextRepository(db, redis_client, os.getenv("HASH_BATCH_SIZE"))
-    cache_service = TextCacheService(redis_client)
+    repo = SQLAlchemyTextRepository(
+        db, redis_client,
+        hash_allocator=get_hash_allocator(),
+        group_committer=get_text_group_committer()
+    )
+    cache_service = TextCacheService(redis_client, get_local_text_cache())
     storage_service = S3StorageService()
-    return TextService(repo, cache_service, storage_service)
+    pending_store = PendingTextStore(redis_client) if TEXT_WRITE_BEHIND else None
+    return TextService(
+        repo, cache_service, storage_service, pending_store, get_segment_storage(),
+        upload_store=UploadReservationStore(redis_client)
+    )
 
-@router.post("/text")
+@router.post("/text", response_model=TextResponseDTO)
 def create_text(
     request: TextRequest,
     text_service: TextService = Depends(get_text_service)
 ):
     return text_service.create_text(request.text, request.expiration_date)
 
-@router.get("/text/{hash_value}")
+@router.post("/text/upload", response_model=TextResponseDTO)
+async def upload_text(
+    request: Request,
+    expiration_date: datetime,
+    text_service: TextService = Depends(get_text_service)
+):
+    """Create a text from the raw request body, streamed into S3 in parts"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > TEXT_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Text exceeds {TEXT_UPLOAD_MAX_BYTES} bytes"
+        )
+    
+    upload = text_service.start_text_upload(TEXT_UPLOAD_MAX_BYTES)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(upload.write, chunk)
+        return await run_in_threadpool(upload.finish, expiration_date)
+    except TextTooLargeError as e:
+        await run_in_threadpool(upload.abort)
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except UnicodeDecodeError:
+        await run_in_threadpool(upload.abort)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Text must be UTF-8")
+    except Exception:
+        await run_in_threadpool(upload.abort)
+        raise
+
+@router.post("/text/uploads", response_model=TextUploadReservationDTO)
+def reserve_text_upload(
+    request: TextUploadRequest,
+    text_service: TextService = Depends(get_text_service)
+):
+    """Reserve a hash and a presigned URL to upload the body straight to storage"""
+    if request.size > TEXT_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Text exceeds {TEXT_UPLOAD_MAX_BYTES} bytes"
+        )
+    return text_service.reserve_upload(request.size, request.sha256, request.expiration_date)
+
+@router.post("/text/uploads/{hash_value}/complete", response_model=TextResponseDTO)
+def finalize_text_upload(
+    hash_value: str,
+    text_service: TextService = Depends(get_text_service)
+):
+    """Verify the uploaded object against its reservation and create the text"""
+    try:
+        text = text_service.finalize_upload(hash_value)
+    except UploadVerificationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    if not text:
+        raise HTTPException(status_code=404, detail="Upload reservation not found or expired")
+    return text
+
+@router.post("/texts/batch", response_model=TextBatchResponseDTO)
+def create_texts(
+    request: TextBatchRequest,
+    text_service: TextService = Depends(get_text_service)
+):
+    if len(request.texts) > TEXT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {TEXT_BATCH_MAX_ITEMS} texts"
+        )
+    
+    results = text_service.create_texts(
+        [(item.text, item.expiration_date) for item in request.texts]
+    )
+    return {"results": results}
+
+def _not_modified_response(request: Request, text_service: TextService, hash_value: str,
+                           weak_etag: bool = False, encodings: tuple = ()) -> Response:
+    """304 for a conditional request whose validators still match, checked from metadata only
+    
+    The stored codec isn't known from metadata, so the ETags of the body
+    sent with any of `encodings` match too; the 304 carries the one matched.
+    """
+    if not has_validators(request):
+        return None
+    
+    metadata = text_service.get_active_metadata(hash_value)
+    if not metadata:
+        raise HTTPException(status_code=404, detail="Text not found")
+    
+    for encoding in (None, *encodings):
+        headers = text_cache_headers(metadata, weak_etag, encoding)
+        if is_not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
+
+def _metadata_headers(hash_value: str, metadata) -> dict:
+    """Text metadata as response headers"""
+    headers = {"X-Text-Hash": hash_value}
+    if metadata.created_at:
+        headers["X-Created-At"] = metadata.created_at.isoformat()
+    if metadata.expiration_date:
+        headers["X-Expires-At"] = metadata.expiration_date.isoformat()
+    return headers
+
+@router.get("/text/{hash_value}", response_model=TextGetResponseDTO)
 def get_text(
     hash_value: str,
+    request: Request,
     response: Response,
     text_service: TextService = Depends(get_text_service)
 ):
+    # The JSON body reports from_cache, so the same text isn't always the
+    # same bytes: its ETag can only be weak
+    not_modified = _not_modified_response(request, text_service, hash_value, weak_etag=True)
+    if not_modified:
+        return not_modified
+    
     result = text_service.get_text(hash_value)
     if not result:
         raise HTTPException(status_code=404, detail="Text not found")
     
-    if result.get("from_cache"):
-        response.headers["X-Cache"] = "HIT"
-        response.headers["Cache-Control"] = "public, max-age=3600"
-    else:
-        response.headers["X-Cache"] = "MISS"
-        response.headers["Cache-Control"] = "public, max-age=1800"
+    response.headers["X-Cache"] = "HIT" if result.get("from_cache") else "MISS"
+    response.headers.update(text_cache_headers(result["metadata"], weak_etag=True))
+    response.headers.update(_metadata_headers(hash_value, result["metadata"]))
     
     return {
-        "content": result,
+        "content": {
+            "metadata": TextResponseDTO.model_validate(result["metadata"]),
+            "content": result["content"],
+            "from_cache": result["from_cache"]
+        },
         "headers": {
             "X-Text-Hash": hash_value,
             "X-Created-At": result["metadata"].created_at.isoformat()
         }
-    }
\ No newline at end of file
+    }
+
+@router.get("/text/{hash_value}/raw")
+def get_raw_text(
+    hash_value: str,
+    request: Request,
+    text_service: TextService = Depends(get_text_service)
+):
+    """The body as text/plain, straight from the cached or stored bytes; metadata goes in headers
+    
+    The service runs on the binary Redis client, so cached bodies are never
+    decoded and re-encoded on the way out.
+    """
+    accept_encoding = request.headers.get("accept-encoding")
+    
+    # Each content coding of the body has a strong ETag of its own, so If-Range works for all of them
+    encodings = tuple(name for name in CODEC_NAMES if accepts_encoding(accept_encoding, name))
+    not_modified = _not_modified_response(request, text_service, hash_value, encodings=encodings)
+    if not_modified:
+        not_modified.headers["Vary"] = "Accept-Encoding"
+        return not_modified
+    
+    result = text_service.open_text_body(hash_value)
+    if not result:
+        raise HTTPException(status_code=404, detail="Text not found")
+    
+    headers = {
+        "X-Cache": "HIT" if result.get("from_cache") else "MISS",
+        "Vary": "Accept-Encoding",
+        # User content: never let browsers sniff it into HTML
+        "X-Content-Type-Options": "nosniff",
+        **text_cache_headers(result["metadata"]),
+        **_metadata_headers(hash_value, result["metadata"]),
+    }
+    
+    # Misses on texts stored as their own object are piped from storage
+    if "file_key" in result:
+        return _stream_raw_text(request, text_service, hash_value, result, headers, accept_encoding)
+    
+    # Pass compressed bodies through untouched when the client can take them
+    body = result["body"]
+    codec = detect_codec(body)
+    if codec and accepts_encoding(accept_encoding, codec.name):
+        headers["Content-Encoding"] = codec.name
+        headers["ETag"] = text_etag(result["metadata"], encoding=codec.name)
+    elif codec:
+        body = codec.decompress(body)
+    
+    headers["Accept-Ranges"] = "bytes"
+    spec = requested_range(request, headers)
+    if spec:
+        try:
+            byte_range = parse_byte_range(spec, len(body))
+        except RangeNotSatisfiable:
+            return _range_not_satisfiable(len(body), headers)
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            return Response(
+                content=body[start:end + 1], status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=RAW_MEDIA_TYPE, headers=headers
+            )
+    
+    return Response(content=body, media_type=RAW_MEDIA_TYPE, headers=headers)
+
+def _stream_raw_text(request: Request, text_service: TextService, hash_value: str, result: dict,
+                     headers: dict, accept_encoding: str) -> Response:
+    """Pipe a stored object to the client; single byte ranges become ranged storage reads"""
+    metadata, file_key = result["metadata"], result["file_key"]
+    
+    if request.headers.get("range"):
+        # The stored codec decides whether ranges of the stored bytes can be
+        # sent, and which ETag If-Range is compared with
+        spec = None
+        try:
+            head, _, total = text_service.stream_text_object(hash_value, metadata, file_key, 0, 3)
+            codec = detect_codec(b"".join(head))
+        except Exception as e:
+            logging.warning(f"Failed to read the start of text {hash_value}, ignoring its Range: {e}")
+        else:
+            if not codec or accepts_encoding(accept_encoding, codec.name):
+                headers["ETag"] = text_etag(metadata, encoding=codec.name if codec else None)
+                spec = requested_range(request, headers)
+        
+        if spec:
+            try:
+                byte_range = parse_byte_range(spec, total)
+            except RangeNotSatisfiable:
+                return _range_not_satisfiable(total, headers)
+            if byte_range:
+                start, end = byte_range
+                chunks, length, _ = text_service.stream_text_object(hash_value, metadata, file_key, start, end)
+                headers["Accept-Ranges"] = "bytes"
+                headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+                headers["Content-Length"] = str(length)
+                if codec:
+                    headers["Content-Encoding"] = codec.name
+                return StreamingResponse(
+                    chunks, status_code=status.HTTP_206_PARTIAL_CONTENT,
+                    media_type=RAW_MEDIA_TYPE, headers=headers
+                )
+    
+    chunks, length, _ = text_service.stream_text_object(hash_value, metadata, file_key)
+    first = next(chunks, b"")
+    codec = detect_codec(first)
+    
+    if codec and not accepts_encoding(accept_encoding, codec.name):
+        # Decompressed on the fly: the length isn't known up front and ranges can't be served
+        headers["ETag"] = text_etag(metadata)
+        headers["Accept-Ranges"] = "none"
+        return StreamingResponse(
+            _decompress_chunks(codec, itertools.chain([first], chunks)),
+            media_type=RAW_MEDIA_TYPE, headers=headers
+        )
+    
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Length"] = str(length)
+    headers["ETag"] = text_etag(metadata, encoding=codec.name if codec else None)
+    if codec:
+        headers["Content-Encoding"] = codec.name
+    return StreamingResponse(itertools.chain([first], chunks), media_type=RAW_MEDIA_TYPE, headers=headers)
+
+def _decompress_chunks(codec, chunks):
+    decompressor = codec.decompressor()
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+def _range_not_satisfiable(total: int, headers: dict) -> Response:
+    return Response(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        headers={**headers, "Content-Range": f"bytes */{total}"}
+    )
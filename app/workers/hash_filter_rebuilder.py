@@ -0,0 +1,81 @@
+# app/workers/hash_filter_rebuilder.py
+"""
+Text hash filter rebuild worker.
+
+Builds the Bloom filter of issued text hashes (see TextHashFilter) from
+the active texts, then rebuilds it every TEXT_HASH_FILTER_REBUILD_SECONDS
+so hashes of expired texts drop out and the false-positive rate stays
+near its target. Hashes created during a rebuild are carried over. Only
+one rebuild runs at a time; extra workers skip their turn.
+
+Run as its own process (with TEXT_HASH_FILTER=true):
+
+    python -m app.workers.hash_filter_rebuilder
+"""
+import logging
+import os
+import signal
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlmodel import Session
+
+from app.infrastructure.cache.text_hash_filter import TextHashFilter
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class HashFilterRebuildWorker:
+    def __init__(self, engine, hash_filter: TextHashFilter, redis_client):
+        self.engine = engine
+        self.hash_filter = hash_filter
+        self.redis = redis_client
+        self.interval = float(os.getenv("TEXT_HASH_FILTER_REBUILD_SECONDS", "3600"))
+        self._stopped = threading.Event()
+
+    def run_once(self) -> bool:
+        """Rebuild the filter from the active texts, return whether it was replaced"""
+        started = time.monotonic()
+        with Session(self.engine) as session:
+            repository = SQLAlchemyTextRepository(session, self.redis)
+            rebuilt = self.hash_filter.rebuild(repository.iter_active_hashes())
+        if rebuilt:
+            logger.info(f"Text hash filter rebuilt in {time.monotonic() - started:.1f}s")
+        else:
+            logger.info("Text hash filter rebuild skipped (another rebuild is running or timed out)")
+        return rebuilt
+
+    def run(self):
+        """Rebuild until stopped"""
+        logger.info("Text hash filter rebuild worker started")
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Text hash filter rebuild error: {e}")
+            self._stopped.wait(self.interval)
+
+    def stop(self, *_):
+        """Stop the worker after the current rebuild"""
+        self._stopped.set()
+
+
+def main():
+    from app.infrastructure.database.database import engine
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    worker = HashFilterRebuildWorker(
+        engine, TextHashFilter(create_redis_client(decode_responses=False)), create_redis_client()
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# app/workers/hash_generator.py
+"""
+Hash generation worker.
+
+Consumes refill requests that SQLAlchemyTextRepository publishes to the
+`hash_generation_requests` stream, pushes freshly generated hashes to
+`text_hash_queue` and releases `hash_generation_lock` once they are available.
+With HASH_QUEUE_SHARDS > 1 every shard has its own queue, lock and stream;
+a worker serves all shards, or those listed in HASH_WORKER_SHARDS.
+
+Run as its own process:
+
+    python -m app.workers.hash_generator
+"""
+import logging
+import os
+import signal
+import socket
+from typing import Optional
+
+from dotenv import load_dotenv
+from redis import Redis
+from redis.exceptions import ResponseError
+
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.hashing.refill_policy import HashRefillPolicy
+from app.infrastructure.hashing.shards import HashQueueShard, hash_queue_shards
+from app.infrastructure.hashing.short_id import ShortIdEncoder
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class HashGenerationWorker:
+    def __init__(self, redis_client: Redis, encoder: ShortIdEncoder = None,
+                 shards: Optional[list[HashQueueShard]] = None):
+        self.redis = redis_client
+        self.encoder = encoder or ShortIdEncoder()
+        self.refill_policy = HashRefillPolicy(redis_client)
+        self.shards = shards or self._served_shards()
+        self.hash_queue_key = self.shards[0].queue_key
+        self.hash_generation_lock = self.shards[0].lock_key
+        self.hash_request_stream = self.shards[0].request_stream
+        # Counter shared by all shards, so their hash ranges never overlap
+        self.hash_counter_key = "hash_generation_counter"
+        self.group_name = os.getenv("HASH_WORKER_GROUP", "hash-generators")
+        self.consumer_name = os.getenv(
+            "HASH_WORKER_NAME", f"hash-worker-{socket.gethostname()}-{os.getpid()}"
+        )
+        self.min_batch_size = int(os.getenv("HASH_WORKER_MIN_BATCH_SIZE", "10000"))
+        self.push_chunk_size = int(os.getenv("HASH_WORKER_PUSH_CHUNK_SIZE", "1000"))
+        self.block_ms = int(os.getenv("HASH_WORKER_BLOCK_MS", "5000"))
+        self._running = False
+        self._next_blocking_shard = 0
+
+        # Only release the lock if it is still held by the service that asked
+        # for this refill, so a newer request's lock is never dropped
+        self._release_lock_script = self.redis.register_script("""
+            local lock_key = KEYS[1]
+            local owner = ARGV[1]
+            if redis.call('GET', lock_key) == owner then
+                return redis.call('DEL', lock_key)
+            end
+            return 0
+        """)
+
+    @staticmethod
+    def _served_shards() -> list[HashQueueShard]:
+        shards = hash_queue_shards()
+        served = os.getenv("HASH_WORKER_SHARDS")
+        if not served:
+            return shards
+        indexes = {int(index) for index in served.split(",") if index.strip()}
+        return [shard for shard in shards if shard.index in indexes]
+
+    def ensure_consumer_group(self):
+        """Create the consumer groups (and the streams) if they don't exist yet"""
+        for shard in self.shards:
+            try:
+                self.redis.xgroup_create(
+                    shard.request_stream, self.group_name, id="0", mkstream=True
+                )
+                logger.info(f"Created consumer group {self.group_name} on {shard.request_stream}")
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def generate_batch(self, count: int) -> list[str]:
+        """Reserve a range of sequence numbers and encode it as hashes"""
+        # INCRBY is atomic, so concurrent workers always get disjoint ranges
+        end = self.redis.incrby(self.hash_counter_key, count)
+        return self.encoder.encode_range(end - count, count)
+
+    def push_hashes(self, hashes: list[str], queue_key: str = None) -> int:
+        """RPUSH hashes in chunks over a single pipelined round trip"""
+        queue_key = queue_key or self.hash_queue_key
+        pipe = self.redis.pipeline(transaction=False)
+        for i in range(0, len(hashes), self.push_chunk_size):
+            pipe.rpush(queue_key, *hashes[i:i + self.push_chunk_size])
+        results = pipe.execute()
+        return results[-1] if results else self.redis.llen(queue_key)
+
+    def refill(self, batch_size: int, queue_key: str = None) -> int:
+        """Generate and enqueue at least `batch_size` hashes, return new queue length"""
+        count = max(batch_size, self.min_batch_size)
+        hashes = self.generate_batch(count)
+        return self.push_hashes(hashes, queue_key)
+
+    def record_refill_latency(self, message_id, stats_key: str = None) -> float:
+        """Time from the refill request to hashes being available, fed to the refill policy"""
+        # Stream IDs start with the request's Redis server time in milliseconds
+        requested_ms = int(str(message_id).split("-")[0])
+        seconds, microseconds = self.redis.time()
+        latency = max(seconds + microseconds / 1_000_000 - requested_ms / 1000, 0)
+        try:
+            self.refill_policy.record_refill_latency(latency, stats_key or self.shards[0].stats_key)
+        except Exception as e:
+            logger.warning(f"Failed to record refill latency: {e}")
+        return latency
+
+    def release_lock(self, lock_key: str, owner: str) -> bool:
+        """Release the generation lock taken by the requesting service"""
+        return bool(self._release_lock_script(keys=[lock_key], args=[owner]))
+
+    def handle_message(self, message_id: str, fields: dict, shard: HashQueueShard = None):
+        """Process one refill request: generate, push, release lock, ack"""
+        shard = shard or self.shards[0]
+        batch_size = int(fields.get("batch_size") or 0)
+        lock_key = fields.get("lock_key") or shard.lock_key
+        owner = fields.get("requesting_service", "")
+
+        # A redelivered request may already have been served
+        queue_length = self.redis.llen(shard.queue_key)
+        if queue_length >= max(batch_size, self.min_batch_size):
+            logger.info(f"Queue already holds {queue_length} hashes, skipping request {message_id}")
+        else:
+            queue_length = self.refill(batch_size, shard.queue_key)
+            latency = self.record_refill_latency(message_id, shard.stats_key)
+            logger.info(
+                f"Refilled hash queue shard {shard.index} for request {message_id} in {latency:.3f}s, "
+                f"queue length: {queue_length}"
+            )
+
+        self.release_lock(lock_key, owner)
+        self.redis.xack(shard.request_stream, self.group_name, message_id)
+
+    def run_once(self, stream_id: str = ">", block_ms: Optional[int] = None) -> int:
+        """Read and process one batch of stream messages, return how many were handled
+
+        Shards are read one stream at a time (their streams live in different
+        cluster slots): a non-blocking pass over all of them, then, if none
+        had work, a block on one shard, rotating through them.
+        """
+        block_ms = self.block_ms if block_ms is None else block_ms
+        if len(self.shards) == 1:
+            return self._read_shard(self.shards[0], stream_id, block_ms)
+
+        handled = 0
+        for shard in self.shards:
+            handled += self._read_shard(shard, stream_id, None)
+        if handled or stream_id != ">":
+            return handled
+
+        shard = self.shards[self._next_blocking_shard % len(self.shards)]
+        self._next_blocking_shard += 1
+        return self._read_shard(shard, stream_id, max(1, block_ms // len(self.shards)))
+
+    def _read_shard(self, shard: HashQueueShard, stream_id: str, block_ms: Optional[int]) -> int:
+        response = self.redis.xreadgroup(
+            self.group_name,
+            self.consumer_name,
+            {shard.request_stream: stream_id},
+            count=10,
+            block=block_ms,
+        )
+
+        handled = 0
+        for _, messages in response or []:
+            for message_id, fields in messages:
+                try:
+                    self.handle_message(message_id, fields, shard)
+                    handled += 1
+                except Exception as e:
+                    # Leave the message pending so it is retried
+                    logger.error(f"Failed to handle hash generation request {message_id}: {e}")
+        return handled
+
+    def run(self):
+        """Serve refill requests until stopped"""
+        self.ensure_consumer_group()
+        self._running = True
+
+        # Messages this consumer read but never acked (e.g. after a crash)
+        while self._running and self.run_once(stream_id="0", block_ms=None) > 0:
+            pass
+
+        logger.info(f"Hash generation worker {self.consumer_name} started")
+        while self._running:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Hash generation worker error: {e}")
+
+    def stop(self, *_):
+        """Stop the worker after the current batch"""
+        self._running = False
+
+
+def main():
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    worker = HashGenerationWorker(create_redis_client())
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
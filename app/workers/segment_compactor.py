@@ -0,0 +1,72 @@
+# app/workers/segment_compactor.py
+"""
+Segment compaction worker.
+
+Periodically rewrites text segments whose live bytes have dropped below
+SEGMENT_COMPACTION_LIVE_RATIO (as texts expire), then deletes retired
+segment objects once SEGMENT_RETIRE_GRACE_SECONDS have passed. Several
+compactors can run side by side; segments are claimed with SKIP LOCKED.
+
+Run as its own process:
+
+    python -m app.workers.segment_compactor
+"""
+import logging
+import os
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+from app.infrastructure.storage.segment_storage_service import SegmentStorageService
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentCompactionWorker:
+    def __init__(self, segment_store: SegmentStorageService):
+        self.segment_store = segment_store
+        self.interval = float(os.getenv("SEGMENT_COMPACTION_INTERVAL_SECONDS", "60"))
+        self.batch_size = int(os.getenv("SEGMENT_COMPACTION_BATCH_SIZE", "10"))
+        self._stopped = threading.Event()
+
+    def run_once(self) -> tuple[int, int]:
+        """Compact one batch of segments and purge retired ones, return both counts"""
+        compacted = self.segment_store.compact(self.batch_size)
+        purged = self.segment_store.purge_retired()
+        if compacted or purged:
+            logger.info(f"Compacted {compacted} segments, purged {purged} retired segments")
+        return compacted, purged
+
+    def run(self):
+        """Compact until stopped"""
+        logger.info("Segment compaction worker started")
+        while not self._stopped.is_set():
+            try:
+                compacted, _ = self.run_once()
+                # A full batch means more candidates are likely waiting
+                if compacted >= self.batch_size:
+                    continue
+            except Exception as e:
+                logger.error(f"Segment compaction error: {e}")
+            self._stopped.wait(self.interval)
+
+    def stop(self, *_):
+        """Stop the worker after the current batch"""
+        self._stopped.set()
+
+
+def main():
+    from app.infrastructure.database.database import engine
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    worker = SegmentCompactionWorker(SegmentStorageService(engine))
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# app/workers/text_cleanup.py
+"""
+Expired text cleanup worker.
+
+Every TEXT_CLEANUP_INTERVAL_SECONDS removes expired texts, which drops
+them from every cache (Redis and the L1 caches, through the invalidation
+channel), hands their hashes to the recycler's cooling queue (with
+HASH_RECYCLE_GRACE_SECONDS set) and deletes content-addressed blobs no
+text references any more. It also reaps direct-upload reservations that
+were never finalized: their uploaded object is deleted and their hash
+given back. Several workers can run side by side; expired rows are
+claimed with SKIP LOCKED.
+
+Run as its own process:
+
+    python -m app.workers.text_cleanup
+"""
+import logging
+import os
+import signal
+import threading
+
+from dotenv import load_dotenv
+from redis import Redis
+from sqlmodel import Session
+
+from app.application.services.text_service import TextService
+from app.infrastructure.cache.text_cache_service import TextCacheService
+from app.infrastructure.cache.upload_reservation_store import UploadReservationStore
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+from app.infrastructure.storage.s3_storage_service import S3StorageService
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class TextCleanupWorker:
+    def __init__(self, engine, redis_client: Redis, storage_service: S3StorageService = None):
+        self.engine = engine
+        # Binary-safe client, like the cache records it invalidates
+        self.redis = redis_client
+        self.storage_service = storage_service or S3StorageService()
+        self.interval = float(os.getenv("TEXT_CLEANUP_INTERVAL_SECONDS", "60"))
+        self._stopped = threading.Event()
+
+    def run_once(self) -> tuple[int, int]:
+        """Remove expired texts and reap abandoned uploads, return both counts"""
+        with Session(self.engine) as session:
+            repository = SQLAlchemyTextRepository(session, self.redis)
+            text_service = TextService(
+                repository, TextCacheService(self.redis), self.storage_service,
+                upload_store=UploadReservationStore(self.redis)
+            )
+            expired = text_service.cleanup_expired_texts()
+            reaped = text_service.reap_expired_uploads()
+        if expired or reaped:
+            logger.info(f"Removed {expired} expired texts, reaped {reaped} abandoned uploads")
+        return expired, reaped
+
+    def run(self):
+        """Clean up until stopped"""
+        logger.info("Text cleanup worker started")
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Text cleanup error: {e}")
+            self._stopped.wait(self.interval)
+
+    def stop(self, *_):
+        """Stop the worker after the current run"""
+        self._stopped.set()
+
+
+def main():
+    from app.infrastructure.database.database import engine
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    worker = TextCleanupWorker(engine, create_redis_client(decode_responses=False))
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
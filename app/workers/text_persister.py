@@ -0,0 +1,182 @@
+# app/workers/text_persister.py
+"""
+Text persistence worker.
+
+Drains the `text_persistence` stream filled by write-behind (fast-ack)
+creates: each pending text is uploaded to storage, inserted into Postgres
+and only then removed from its Redis pending record. Failed messages stay
+pending and are reclaimed after TEXT_PERSISTER_RETRY_IDLE_MS; after
+TEXT_PERSISTER_MAX_ATTEMPTS they are moved to `text_persistence_dead`, and
+the text stops being served: its pending record is moved aside for
+TEXT_PERSISTER_DEAD_LETTER_TTL_SECONDS so it can still be replayed.
+
+Run as its own process:
+
+    python -m app.workers.text_persister
+"""
+import logging
+import os
+import signal
+import socket
+from typing import Optional
+
+from dotenv import load_dotenv
+from redis import Redis
+from redis.exceptions import ResponseError
+from sqlmodel import Session
+
+from app.application.services.text_service import TextService
+from app.infrastructure.cache.pending_text_store import PendingTextStore
+from app.infrastructure.cache.text_cache_service import TextCacheService
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+from app.infrastructure.storage.codecs import decode_body
+from app.infrastructure.storage.s3_storage_service import S3StorageService
+from app.infrastructure.storage.segment_storage_service import get_segment_storage
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _field(fields: dict, name: str) -> Optional[str]:
+    value = fields.get(name.encode(), fields.get(name))
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class TextPersistenceWorker:
+    def __init__(self, redis_client: Redis, engine, storage_service: S3StorageService = None):
+        # Binary-safe client: pending bodies may be compressed
+        self.redis = redis_client
+        self.engine = engine
+        self.storage_service = storage_service or S3StorageService()
+        self.pending_store = PendingTextStore(redis_client)
+        self.dead_letter_stream = "text_persistence_dead"
+        self.attempts_key = "text_persistence_attempts"
+        self.group_name = os.getenv("TEXT_PERSISTER_GROUP", "text-persisters")
+        self.consumer_name = os.getenv(
+            "TEXT_PERSISTER_NAME", f"text-persister-{socket.gethostname()}-{os.getpid()}"
+        )
+        self.max_attempts = int(os.getenv("TEXT_PERSISTER_MAX_ATTEMPTS", "5"))
+        self.dead_letter_ttl = int(os.getenv("TEXT_PERSISTER_DEAD_LETTER_TTL_SECONDS", str(7 * 24 * 3600)))
+        self.retry_idle_ms = int(os.getenv("TEXT_PERSISTER_RETRY_IDLE_MS", "30000"))
+        self.block_ms = int(os.getenv("TEXT_PERSISTER_BLOCK_MS", "5000"))
+        self._running = False
+
+    def ensure_consumer_group(self):
+        """Create the consumer group (and the stream) if they don't exist yet"""
+        try:
+            self.redis.xgroup_create(
+                self.pending_store.stream_key, self.group_name, id="0", mkstream=True
+            )
+            logger.info(f"Created consumer group {self.group_name} on {self.pending_store.stream_key}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def persist(self, hash_value: str) -> bool:
+        """Persist one pending text; False if there was nothing (left) to persist"""
+        pending = self.pending_store.get(hash_value)
+        if not pending:
+            # Already persisted by an earlier delivery
+            return False
+
+        with Session(self.engine) as session:
+            repository = SQLAlchemyTextRepository(session, self.redis)
+            text_service = TextService(
+                repository, TextCacheService(self.redis), self.storage_service,
+                segment_store=get_segment_storage()
+            )
+            text_service.persist_text(pending["metadata"], decode_body(pending["body"]))
+
+        # Readers fall back to the database from here on
+        self.pending_store.delete(hash_value)
+        return True
+
+    def handle_message(self, message_id, fields: dict):
+        """Persist a text, retrying through redelivery and dead-lettering after max attempts"""
+        hash_value = _field(fields, "hash_value")
+        try:
+            self.persist(hash_value)
+        except Exception as e:
+            attempts = self.redis.hincrby(self.attempts_key, message_id, 1)
+            if attempts < self.max_attempts:
+                logger.warning(f"Failed to persist text {hash_value} (attempt {attempts}): {e}")
+                return
+            logger.error(f"Giving up on text {hash_value} after {attempts} attempts: {e}")
+            self.redis.xadd(self.dead_letter_stream, {
+                "hash_value": hash_value,
+                "error": str(e),
+                "record": f"{self.pending_store.dead_letter_prefix}{hash_value}"
+            })
+            # Never persisted, so it must not keep being served from Redis
+            if not self.pending_store.dead_letter(hash_value, self.dead_letter_ttl):
+                logger.error(f"No pending record left for dead-lettered text {hash_value}")
+
+        pipe = self.redis.pipeline()
+        pipe.xack(self.pending_store.stream_key, self.group_name, message_id)
+        pipe.hdel(self.attempts_key, message_id)
+        pipe.execute()
+
+    def run_once(self, stream_id: str = ">", block_ms: Optional[int] = None) -> int:
+        """Read and process one batch of stream messages, return how many were read"""
+        response = self.redis.xreadgroup(
+            self.group_name,
+            self.consumer_name,
+            {self.pending_store.stream_key: stream_id},
+            count=50,
+            block=self.block_ms if block_ms is None else block_ms,
+        )
+
+        handled = 0
+        for _, messages in response or []:
+            for message_id, fields in messages:
+                self.handle_message(message_id, fields)
+                handled += 1
+        return handled
+
+    def retry_stale(self) -> int:
+        """Claim messages that failed or whose consumer died, and retry them"""
+        _, messages, *_ = self.redis.xautoclaim(
+            self.pending_store.stream_key,
+            self.group_name,
+            self.consumer_name,
+            min_idle_time=self.retry_idle_ms,
+            start_id="0-0",
+            count=50,
+        )
+        for message_id, fields in messages:
+            if fields:
+                self.handle_message(message_id, fields)
+        return len(messages)
+
+    def run(self):
+        """Persist pending texts until stopped"""
+        self.ensure_consumer_group()
+        self._running = True
+
+        logger.info(f"Text persistence worker {self.consumer_name} started")
+        while self._running:
+            try:
+                self.run_once()
+                self.retry_stale()
+            except Exception as e:
+                logger.error(f"Text persistence worker error: {e}")
+
+    def stop(self, *_):
+        """Stop the worker after the current batch"""
+        self._running = False
+
+
+def main():
+    from app.infrastructure.database.database import engine
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    worker = TextPersistenceWorker(create_redis_client(decode_responses=False), engine)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Cache record benchmark.
+
+Compares the binary single-key cache record (text_cache_record) with the
+previous JSON metadata entry (json.loads + Text.from_dict): encoded size
+of the metadata and encode/decode time per entry. Needs no services.
+
+    python -m benchmarks.cache_record_benchmark --size 4096 --rounds 100000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.domain.entities.text import Text
+from app.infrastructure.cache.text_cache_record import decode_text_record, encode_text_record
+
+
+def per_call_us(fn, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--rounds", type=int, default=100000)
+    args = parser.parse_args()
+
+    text = Text.create(
+        "s3://pastebin/texts/0b9f6c1e-5d8a-4f0e-9a51-6f1a0c2d7e3b.txt",
+        datetime.now(timezone.utc) + timedelta(days=7),
+        content_digest="9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+    )
+    text.hash_value = "aZ3kP9q"
+    body = b"x" * args.size
+
+    metadata_json = json.dumps(text.to_dict()).encode()
+    record = encode_text_record(text, body)
+
+    results = {
+        "json": (
+            len(metadata_json),
+            per_call_us(lambda: json.dumps(text.to_dict()).encode(), args.rounds),
+            per_call_us(lambda: Text.from_dict(json.loads(metadata_json)), args.rounds),
+        ),
+        "record": (
+            len(record) - len(body),
+            per_call_us(lambda: encode_text_record(text, body), args.rounds),
+            per_call_us(lambda: decode_text_record(record), args.rounds),
+        ),
+    }
+
+    print(f"{'format':<8}{'metadata bytes':>16}{'encode us':>12}{'decode us':>12}")
+    for name, (size, encode_us, decode_us) in results.items():
+        print(f"{name:<8}{size:>16}{encode_us:>12.2f}{decode_us:>12.2f}")
+    print("(json also needs a second key and GET for the body)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Group-commit benchmark.
+
+Runs concurrent single creates through SQLAlchemyTextRepository with and
+without TextGroupCommitter and reports transactions per paste, throughput
+and p50/p99 create latency. Needs Postgres (DATABASE_URL) and Redis; rows
+are written with a `bench://` location and deleted afterwards.
+
+    python -m benchmarks.group_commit_benchmark --threads 64 --creates 20 --window-ms 5
+"""
+import argparse
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event
+from sqlmodel import Session
+
+from app.domain.entities.text import Text as TextEntity
+from app.infrastructure.database.database import engine
+from app.infrastructure.database.models import Texts as TextModel
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.repositories.group_commit import TextGroupCommitter
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+from app.workers.hash_generator import HashGenerationWorker
+
+
+def run(redis_client, threads: int, creates: int, committer=None) -> dict:
+    commits = 0
+    commits_lock = threading.Lock()
+
+    def count_commit(_):
+        nonlocal commits
+        with commits_lock:
+            commits += 1
+
+    event.listen(engine, "commit", count_commit)
+    latencies = []
+    latencies_lock = threading.Lock()
+    expiration = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    def client():
+        local = []
+        for _ in range(creates):
+            with Session(engine) as session:
+                repo = SQLAlchemyTextRepository(session, redis_client, 0, group_committer=committer)
+                started = time.perf_counter()
+                repo.create(TextEntity.create("bench://text", expiration))
+                local.append(time.perf_counter() - started)
+        with latencies_lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "commit", count_commit)
+
+    latencies.sort()
+    return {
+        "pastes": len(latencies),
+        "tx_per_paste": commits / len(latencies),
+        "pastes_per_sec": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--creates", type=int, default=20)
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=100)
+    args = parser.parse_args()
+
+    redis_client = create_redis_client()
+    # Make sure neither run waits on hash generation
+    HashGenerationWorker(redis_client).refill(args.threads * args.creates * 2)
+
+    committer = TextGroupCommitter(
+        engine,
+        lambda session: SQLAlchemyTextRepository(session, redis_client, 0),
+        window_ms=args.window_ms,
+        max_batch=args.max_batch,
+    )
+
+    try:
+        results = {
+            "single": run(redis_client, args.threads, args.creates),
+            "group": run(redis_client, args.threads, args.creates, committer),
+        }
+        print(f"{'mode':<8}{'pastes':>8}{'tx/paste':>10}{'pastes/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        for mode, r in results.items():
+            print(f"{mode:<8}{r['pastes']:>8}{r['tx_per_paste']:>10.3f}{r['pastes_per_sec']:>10.0f}"
+                  f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+        print(f"group commit batches: {committer.stats()}")
+    finally:
+        committer.close()
+        with Session(engine) as session:
+            session.exec(delete(TextModel).where(TextModel.location == "bench://text"))
+            session.commit()
+        redis_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Hash queue throughput benchmark.
+
+Compares how fast HashGenerationWorker refills the hash queue (hashes/sec)
+against how fast SQLAlchemyTextRepository drains it (creates/sec, one
+atomic Lua pop per create). Needs a running Redis; uses separate keys so it
+does not touch the real queue.
+
+    python -m benchmarks.hash_refill_benchmark --batch-size 50000 --threads 16
+"""
+import argparse
+import threading
+import time
+
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.hashing.shards import hash_queue_shards
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+from app.workers.hash_generator import HashGenerationWorker
+
+SHARD = hash_queue_shards(1, prefix="bench:")[0]
+QUEUE_KEY = SHARD.queue_key
+COUNTER_KEY = "bench:hash_generation_counter"
+LOCK_KEY = SHARD.lock_key
+STREAM_KEY = SHARD.request_stream
+STATS_KEY = SHARD.stats_key
+RECYCLE_KEY = SHARD.recycle_key
+
+
+def bench_refill(redis_client, batch_size: int, rounds: int) -> float:
+    worker = HashGenerationWorker(redis_client)
+    worker.hash_queue_key = QUEUE_KEY
+    worker.hash_counter_key = COUNTER_KEY
+    worker.min_batch_size = batch_size
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        worker.refill(batch_size)
+    elapsed = time.perf_counter() - started
+    return batch_size * rounds / elapsed
+
+
+def bench_consume(redis_client, total: int, threads: int) -> float:
+    repo = SQLAlchemyTextRepository(None, redis_client, hash_threshold=0)
+    repo.shard_order = [SHARD]
+    repo.hash_queue_key = QUEUE_KEY
+
+    per_thread = total // threads
+
+    def consume():
+        for _ in range(per_thread):
+            repo._atomic_consume_hash_with_retry(1)
+
+    workers = [threading.Thread(target=consume) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    redis_client = create_redis_client()
+    redis_client.delete(QUEUE_KEY, COUNTER_KEY, LOCK_KEY, STREAM_KEY, STATS_KEY, RECYCLE_KEY)
+
+    try:
+        refill_rate = bench_refill(redis_client, args.batch_size, args.rounds)
+        total = args.batch_size * args.rounds
+        consume_rate = bench_consume(redis_client, total, args.threads)
+
+        print(f"refilled:  {refill_rate:>12,.0f} hashes/sec  (batch={args.batch_size})")
+        print(f"consumed:  {consume_rate:>12,.0f} creates/sec (threads={args.threads})")
+        print(f"headroom:  {refill_rate / consume_rate:>12.1f}x")
+    finally:
+        redis_client.delete(QUEUE_KEY, COUNTER_KEY, LOCK_KEY, STREAM_KEY, STATS_KEY, RECYCLE_KEY)
+        redis_client.close()
+
+
+if __name__ == "__main__":
+    main()
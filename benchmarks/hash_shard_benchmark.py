@@ -0,0 +1,114 @@
+"""
+Sharded hash queue scaling benchmark.
+
+Measures aggregate hash consumption (one atomic Lua pop per create, as
+SQLAlchemyTextRepository does it) from several processes at once, for
+different HASH_QUEUE_SHARDS counts. Each process gets its own worker id, so
+processes spread over the shards' home queues and fall back to the others
+when theirs runs dry. Needs a running Redis; uses separate keys so it does
+not touch the real queues.
+
+Against a single Redis instance the shards share one event loop, so this
+mostly shows the cost of contention on one hot list; against a Redis Cluster
+each shard's hash tag lands in its own slot and throughput scales with the
+nodes serving them.
+
+    python -m benchmarks.hash_shard_benchmark --processes 1 2 4 8 --shards 1 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.hashing.shards import hash_queue_shards, shard_order
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+from app.workers.hash_generator import HashGenerationWorker
+
+PREFIX = "bench:"
+COUNTER_KEY = "bench:hash_generation_counter"
+
+
+def _shard_keys(shard_count: int) -> list[str]:
+    return [
+        key
+        for shard in hash_queue_shards(shard_count, prefix=PREFIX)
+        for key in (shard.queue_key, shard.lock_key, shard.request_stream, shard.stats_key, shard.recycle_key)
+    ]
+
+
+def fill(redis_client, shard_count: int, per_shard: int):
+    """Put `per_shard` fresh hashes on every shard's queue"""
+    worker = HashGenerationWorker(redis_client, shards=hash_queue_shards(shard_count, prefix=PREFIX))
+    worker.hash_counter_key = COUNTER_KEY
+    worker.min_batch_size = per_shard
+    for shard in worker.shards:
+        worker.refill(per_shard, shard.queue_key)
+
+
+def consume(shard_count: int, count: int, worker_id: str, start, results):
+    redis_client = create_redis_client()
+    repo = SQLAlchemyTextRepository(None, redis_client, hash_threshold=0)
+    repo.shard_order = shard_order(hash_queue_shards(shard_count, prefix=PREFIX), worker_id)
+    repo.hash_queue_key = repo.shard_order[0].queue_key
+
+    start.wait()
+    started = time.perf_counter()
+    taken = 0
+    for _ in range(count):
+        if repo._atomic_consume_hash_with_retry(1):
+            taken += 1
+    results.put((taken, time.perf_counter() - started))
+    redis_client.close()
+
+
+def run(shard_count: int, processes: int, per_process: int) -> float:
+    """Aggregate hashes/sec consumed by `processes` processes"""
+    redis_client = create_redis_client()
+    redis_client.delete(COUNTER_KEY, *_shard_keys(shard_count))
+    # Enough stock that nobody waits on a refill (there is no worker running)
+    fill(redis_client, shard_count, -(-per_process * processes // shard_count) * 2)
+
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    children = [
+        multiprocessing.Process(
+            target=consume,
+            args=(shard_count, per_process, f"bench-{os.getpid()}-{index}", start, results),
+        )
+        for index in range(processes)
+    ]
+    for child in children:
+        child.start()
+    start.set()
+
+    outcomes = [results.get() for _ in children]
+    for child in children:
+        child.join()
+
+    redis_client.delete(COUNTER_KEY, *_shard_keys(shard_count))
+    redis_client.close()
+
+    taken = sum(taken for taken, _ in outcomes)
+    elapsed = max(elapsed for _, elapsed in outcomes)
+    return taken / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--per-process", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'shards':>6} {'processes':>9} {'hashes/sec':>12} {'vs 1 process':>13}")
+    for shard_count in args.shards:
+        baseline = None
+        for processes in args.processes:
+            rate = run(shard_count, processes, args.per_process)
+            baseline = baseline or rate
+            print(f"{shard_count:>6} {processes:>9} {rate:>12,.0f} {rate / baseline:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Inline storage benchmark.
+
+Creates small pastes with the inline tier enabled and disabled, then reads
+them back uncached (metadata + body, the cache-miss path of GET /text) and
+reports create and read latency per tier. Needs Postgres, Redis and S3
+configured as for the app.
+
+    python -m benchmarks.inline_storage_benchmark --count 200 --size 1024
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from app.application.services.text_service import TextService
+from app.infrastructure.cache.text_cache_service import TextCacheService
+from app.infrastructure.database.database import engine
+from app.infrastructure.database.models import Texts as TextModel
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+from app.infrastructure.storage.s3_storage_service import S3StorageService
+from app.workers.hash_generator import HashGenerationWorker
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    samples = sorted(samples)
+    return samples[max(int(len(samples) * pct) - 1, 0)] * 1000
+
+
+def run(redis_client, storage, inline_max_bytes: int, count: int, size: int) -> dict:
+    with Session(engine) as session:
+        return _run(session, redis_client, storage, inline_max_bytes, count, size)
+
+
+def _run(session, redis_client, storage, inline_max_bytes: int, count: int, size: int) -> dict:
+    repo = SQLAlchemyTextRepository(session, redis_client, 0)
+    service = TextService(repo, TextCacheService(redis_client), storage)
+    service.inline_max_bytes = inline_max_bytes
+    expiration = datetime.now(timezone.utc) + timedelta(hours=1)
+    body = "x" * size
+
+    created, create_times, read_times = [], [], []
+    for _ in range(count):
+        started = time.perf_counter()
+        created.append(service.create_text(body, expiration))
+        create_times.append(time.perf_counter() - started)
+
+    for text in created:
+        started = time.perf_counter()
+        service.get_full_text_body(text.hash_value)
+        read_times.append(time.perf_counter() - started)
+
+    return {
+        "created": created,
+        "create_p50": percentile(create_times, 0.5),
+        "create_p99": percentile(create_times, 0.99),
+        "read_p50": percentile(read_times, 0.5),
+        "read_p99": percentile(read_times, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--size", type=int, default=1024)
+    args = parser.parse_args()
+
+    redis_client = create_redis_client(decode_responses=False)
+    HashGenerationWorker(create_redis_client()).refill(args.count * 2)
+    storage = S3StorageService()
+
+    results = {
+        "s3": run(redis_client, storage, 0, args.count, args.size),
+        "inline": run(redis_client, storage, args.size, args.count, args.size),
+    }
+
+    print(f"{'tier':<8}{'create p50':>12}{'create p99':>12}{'read p50':>10}{'read p99':>10}  (ms)")
+    for tier, r in results.items():
+        print(f"{tier:<8}{r['create_p50']:>12.1f}{r['create_p99']:>12.1f}{r['read_p50']:>10.2f}{r['read_p99']:>10.2f}")
+
+    with Session(engine) as session:
+        created = [text for r in results.values() for text in r["created"]]
+        for text in created:
+            if text.location.startswith("s3://"):
+                storage.delete_text(storage.parse_s3_location(text.location))
+        session.exec(delete(TextModel).where(TextModel.hash_value.in_([t.hash_value for t in created])))
+        session.commit()
+
+    redis_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Read coalescing benchmark.
+
+Creates a few hot and many cold pastes, drops them from the cache, then
+reads them from many threads at once (each with its own session, like
+concurrent requests): every read hits a hot paste with probability
+--hot-ratio, otherwise a cold one. Runs once with per-hash singleflight
+(TextService.get_text_body) and once with a single process-wide lock
+around the miss path, and reports throughput, per-kind latency and how
+many database/storage loads each mode made. Needs Postgres, Redis and S3
+configured as for the app.
+
+    python -m benchmarks.read_coalescing_benchmark --hot 5 --cold 500 --threads 32
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from app.application.services.text_service import TextService
+from app.infrastructure.cache.text_cache_service import TextCacheService
+from app.infrastructure.database.database import engine
+from app.infrastructure.database.models import Texts as TextModel
+from app.infrastructure.database.redis_client import create_redis_client
+from app.infrastructure.repositories.text_repository import SQLAlchemyTextRepository
+from app.infrastructure.storage.s3_storage_service import S3StorageService
+from app.workers.hash_generator import HashGenerationWorker
+
+GLOBAL_LOCK = threading.Lock()
+
+
+class CountingTextService(TextService):
+    """Counts the database/storage loads the miss path makes"""
+    loads = 0
+    loads_lock = threading.Lock()
+
+    def get_full_text_body(self, hash_value: str):
+        with CountingTextService.loads_lock:
+            CountingTextService.loads += 1
+        return super().get_full_text_body(hash_value)
+
+
+class GlobalLockTextService(CountingTextService):
+    """The previous behaviour: one lock serializes every miss in the process"""
+
+    def get_text_body(self, hash_value: str) -> dict:
+        cached = self.cache_service.get_complete_text_body(hash_value)
+        if cached:
+            return {**cached, "from_cache": True}
+        with GLOBAL_LOCK:
+            return self._load_text_body(hash_value)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[max(int(len(samples) * pct) - 1, 0)] * 1000
+
+
+def evict(redis_client, hashes: list[str]):
+    pipe = redis_client.pipeline(transaction=False)
+    for hash_value in hashes:
+        pipe.delete(f"text_record:{hash_value}")
+    pipe.execute()
+
+
+def run(service_class, redis_client, storage, hot: list[str], cold: list[str],
+        threads: int, reads: int, hot_ratio: float) -> dict:
+    evict(redis_client, hot + cold)
+    CountingTextService.loads = 0
+    latencies = {"hot": [], "cold": []}
+    latencies_lock = threading.Lock()
+    cold_queue = list(cold)
+    random.shuffle(cold_queue)
+    per_thread = reads // threads
+    start = threading.Barrier(threads + 1)
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        samples = {"hot": [], "cold": []}
+        with Session(engine) as session:
+            repo = SQLAlchemyTextRepository(session, redis_client, 0)
+            service = service_class(repo, TextCacheService(redis_client), storage)
+            start.wait()
+            for _ in range(per_thread):
+                kind = "hot" if rng.random() < hot_ratio else "cold"
+                hash_value = rng.choice(hot) if kind == "hot" else rng.choice(cold_queue)
+                started = time.perf_counter()
+                service.get_text_body(hash_value)
+                samples[kind].append(time.perf_counter() - started)
+        with latencies_lock:
+            for kind, values in samples.items():
+                latencies[kind].extend(values)
+
+    workers = [threading.Thread(target=reader, args=(seed,)) for seed in range(threads)]
+    for t in workers:
+        t.start()
+    start.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "reads_per_sec": per_thread * threads / elapsed,
+        "loads": CountingTextService.loads,
+        "hot_p50": percentile(latencies["hot"], 0.5),
+        "hot_p99": percentile(latencies["hot"], 0.99),
+        "cold_p50": percentile(latencies["cold"], 0.5),
+        "cold_p99": percentile(latencies["cold"], 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hot", type=int, default=5)
+    parser.add_argument("--cold", type=int, default=500)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--reads", type=int, default=4000)
+    parser.add_argument("--hot-ratio", type=float, default=0.8)
+    args = parser.parse_args()
+
+    redis_client = create_redis_client(decode_responses=False)
+    HashGenerationWorker(create_redis_client()).refill((args.hot + args.cold) * 2)
+    storage = S3StorageService()
+    expiration = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    with Session(engine) as session:
+        repo = SQLAlchemyTextRepository(session, redis_client, 0)
+        service = TextService(repo, TextCacheService(redis_client), storage)
+        # Keep the bodies in storage so misses pay for the S3 fetch
+        service.inline_max_bytes = 0
+        service.write_through_max_bytes = 0
+        # Distinct bodies, so content-addressed storage can't share one cached blob
+        results = service.create_texts([
+            (f"{index:08d}" + "x" * args.size, expiration) for index in range(args.hot + args.cold)
+        ])
+    created = [result["text"] for result in results if result["status"] == "created"]
+    hashes = [text.hash_value for text in created]
+    hot, cold = hashes[:args.hot], hashes[args.hot:]
+
+    try:
+        results = {
+            "global-lock": run(GlobalLockTextService, redis_client, storage, hot, cold,
+                               args.threads, args.reads, args.hot_ratio),
+            "singleflight": run(CountingTextService, redis_client, storage, hot, cold,
+                                args.threads, args.reads, args.hot_ratio),
+        }
+
+        print(f"{'mode':<14}{'reads/s':>10}{'loads':>8}{'hot p50':>10}{'hot p99':>10}"
+              f"{'cold p50':>10}{'cold p99':>10}  (ms)")
+        for mode, r in results.items():
+            print(f"{mode:<14}{r['reads_per_sec']:>10.0f}{r['loads']:>8}{r['hot_p50']:>10.1f}"
+                  f"{r['hot_p99']:>10.1f}{r['cold_p50']:>10.1f}{r['cold_p99']:>10.1f}")
+    finally:
+        evict(redis_client, hashes)
+        with Session(engine) as session:
+            for text in created:
+                if text.location.startswith("s3://"):
+                    storage.delete_text(storage.parse_s3_location(text.location))
+            session.exec(delete(TextModel).where(TextModel.hash_value.in_(hashes)))
+            session.commit()
+        redis_client.close()
+
+
+if __name__ == "__main__":
+    main()
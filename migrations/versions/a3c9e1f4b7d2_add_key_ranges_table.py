@@ -0,0 +1,40 @@
+"""add key_ranges table
+
+Revision ID: a3c9e1f4b7d2
+Revises: 6205e737aa88
+Create Date: 2026-10-17 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1f4b7d2'
+down_revision: Union[str, None] = '6205e737aa88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'key_ranges',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('range_start', sa.BigInteger(), nullable=False),
+        sa.Column('range_end', sa.BigInteger(), nullable=False),
+        sa.Column('leased_by', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('leased_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    # Not unique: claims move range_start up to the next range's start and
+    # returned hashes become one-number ranges; appends take an advisory lock
+    op.create_index(op.f('ix_key_ranges_range_start'), 'key_ranges', ['range_start'], unique=False)
+    op.create_index(op.f('ix_key_ranges_leased_by'), 'key_ranges', ['leased_by'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_key_ranges_leased_by'), table_name='key_ranges')
+    op.drop_index(op.f('ix_key_ranges_range_start'), table_name='key_ranges')
+    op.drop_table('key_ranges')
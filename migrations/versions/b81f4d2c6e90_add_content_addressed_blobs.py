@@ -0,0 +1,37 @@
+"""add content addressed blobs
+
+Revision ID: b81f4d2c6e90
+Revises: a3c9e1f4b7d2
+Create Date: 2026-10-17 11:03:48.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f4d2c6e90'
+down_revision: Union[str, None] = 'a3c9e1f4b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'text_blobs',
+        sa.Column('digest', sqlmodel.sql.sqltypes.AutoString(), primary_key=True, nullable=False),
+        sa.Column('location', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    )
+    op.add_column('texts', sa.Column('content_digest', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.create_index(op.f('ix_texts_content_digest'), 'texts', ['content_digest'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_texts_content_digest'), table_name='texts')
+    op.drop_column('texts', 'content_digest')
+    op.drop_table('text_blobs')
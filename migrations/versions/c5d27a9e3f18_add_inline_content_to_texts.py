@@ -0,0 +1,26 @@
+"""add inline_content to texts
+
+Revision ID: c5d27a9e3f18
+Revises: b81f4d2c6e90
+Create Date: 2026-10-17 11:48:02.530671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d27a9e3f18'
+down_revision: Union[str, None] = 'b81f4d2c6e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('texts', sa.Column('inline_content', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('texts', 'inline_content')
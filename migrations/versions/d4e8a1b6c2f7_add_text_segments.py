@@ -0,0 +1,43 @@
+"""add text segments
+
+Revision ID: d4e8a1b6c2f7
+Revises: c5d27a9e3f18
+Create Date: 2026-10-17 13:21:37.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e8a1b6c2f7'
+down_revision: Union[str, None] = 'c5d27a9e3f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'text_segments',
+        sa.Column('key', sqlmodel.sql.sqltypes.AutoString(), primary_key=True, nullable=False),
+        sa.Column('total_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('live_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('record_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('retired_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(op.f('ix_text_segments_retired_at'), 'text_segments', ['retired_at'], unique=False)
+    # Compaction looks texts up by location prefix (segment://bucket/key#...)
+    op.create_index(
+        'ix_texts_location_pattern', 'texts', ['location'], unique=False,
+        postgresql_ops={'location': 'varchar_pattern_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_texts_location_pattern', table_name='texts')
+    op.drop_index(op.f('ix_text_segments_retired_at'), table_name='text_segments')
+    op.drop_table('text_segments')
@@ -0,0 +1,21 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.domain.entities.text import Text
+
+TEXT_ID = uuid.UUID("0b9f6c1e-5d8a-4f0e-9a51-6f1a0c2d7e3b")
+TEXT_HASH = "aZ3kP9q1"
+CREATED_AT = datetime(2026, 10, 17, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def make_text():
+    """Factory for text metadata with a fixed id, hash and creation time"""
+    def make(location="s3://pastebin/0b9f6c1e.txt", expiration_date=None,
+             content_digest="9f86d081884c7d659a2feaa0c55ad015", updated_at=None):
+        return Text.from_fields(
+            TEXT_ID, location, expiration_date, TEXT_HASH, CREATED_AT, updated_at, content_digest
+        )
+    return make
@@ -0,0 +1,72 @@
+import pytest
+
+from app.infrastructure.storage.codecs import (
+    GzipCodec,
+    ZstdCodec,
+    accepts_encoding,
+    decode_body,
+    detect_codec,
+    encode_text,
+    get_codec,
+    zstandard,
+)
+
+TEXT = "print('hello, pastebin')\n" * 20
+
+codecs = [GzipCodec, pytest.param(ZstdCodec, marks=pytest.mark.skipif(
+    zstandard is None, reason="zstandard is not installed"
+))]
+
+
+@pytest.mark.parametrize("codec_class", codecs)
+def test_compressed_body_is_detected_by_magic(codec_class):
+    data = encode_text(TEXT, codec_class())
+
+    assert data.startswith(codec_class.magic)
+    assert isinstance(detect_codec(data), codec_class)
+    assert decode_body(data) == TEXT
+
+
+@pytest.mark.parametrize("codec_class", codecs)
+def test_streamed_body_is_detected_by_magic(codec_class):
+    compressor = codec_class().compressor()
+    data = b"".join([compressor.compress(TEXT[:100].encode()), compressor.compress(TEXT[100:].encode()),
+                     compressor.flush()])
+
+    assert isinstance(detect_codec(data), codec_class)
+    assert decode_body(data) == TEXT
+
+
+@pytest.mark.parametrize("data", [TEXT.encode(), "ünïcode".encode(), b"", b"\x1f"])
+def test_plain_text_has_no_codec(data):
+    assert detect_codec(data) is None
+
+
+def test_plain_bodies_decode_as_utf8():
+    assert encode_text(TEXT, None) == TEXT.encode()
+    assert decode_body("ünïcode".encode()) == "ünïcode"
+    assert decode_body(TEXT) == TEXT
+
+
+def test_get_codec(monkeypatch):
+    monkeypatch.delenv("TEXT_COMPRESSION_LEVEL", raising=False)
+    monkeypatch.setenv("TEXT_COMPRESSION", "none")
+
+    assert get_codec() is None
+    assert isinstance(get_codec("GZIP"), GzipCodec)
+    with pytest.raises(ValueError):
+        get_codec("brotli")
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.0, *", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("br, zstd", False),
+    (None, False),
+])
+def test_accepts_encoding(header, expected):
+    assert accepts_encoding(header, "gzip") is expected
@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.infrastructure.repositories.group_commit import TextGroupCommitter
+
+
+class FakeRepository:
+    """Records create_many batches; texts whose location is in `failing` fail to insert"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.batches = []
+        self.creates = []
+        self.lock = threading.Lock()
+
+    def create_many(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        if self.failing & set(texts):
+            raise ValueError("duplicate key")
+        return [f"created:{text}" for text in texts]
+
+    def create(self, text):
+        with self.lock:
+            self.creates.append(text)
+        if text in self.failing:
+            raise ValueError(f"duplicate key {text}")
+        return f"created:{text}"
+
+
+def make_committer(repository, **kwargs):
+    return TextGroupCommitter(None, lambda session: repository, **kwargs)
+
+
+def submit_all(committer, texts):
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        futures = [executor.submit(committer.submit, text) for text in texts]
+        return futures, [future.exception() for future in futures]
+
+
+def test_concurrent_submits_share_one_batch():
+    repository = FakeRepository()
+    committer = make_committer(repository, window_ms=200)
+    texts = [f"text-{i}" for i in range(5)]
+
+    futures, errors = submit_all(committer, texts)
+    committer.close()
+
+    assert errors == [None] * 5
+    assert [future.result() for future in futures] == [f"created:{text}" for text in texts]
+    assert len(repository.batches) == 1
+    assert sorted(repository.batches[0]) == texts
+    assert committer.stats() == {"pending": 0, "batches": 1, "texts": 5, "avg_batch_size": 5.0}
+
+
+def test_batches_are_capped_at_max_batch():
+    repository = FakeRepository()
+    committer = make_committer(repository, window_ms=200, max_batch=2)
+
+    _, errors = submit_all(committer, [f"text-{i}" for i in range(5)])
+    committer.close()
+
+    assert errors == [None] * 5
+    assert all(len(batch) <= 2 for batch in repository.batches)
+    assert sum(len(batch) for batch in repository.batches) == 5
+
+
+def test_failed_batch_is_retried_text_by_text():
+    repository = FakeRepository(failing={"text-2"})
+    committer = make_committer(repository, window_ms=200)
+    texts = [f"text-{i}" for i in range(4)]
+
+    futures, errors = submit_all(committer, texts)
+    committer.close()
+
+    assert len(repository.batches) == 1
+    assert sorted(repository.creates) == texts
+    assert [isinstance(error, ValueError) for error in errors] == [False, False, True, False]
+    assert futures[0].result() == "created:text-0"
+
+
+def test_single_text_failure_reaches_its_caller():
+    repository = FakeRepository(failing={"text-0"})
+    committer = make_committer(repository, window_ms=1)
+
+    with pytest.raises(ValueError):
+        committer.submit("text-0")
+    committer.close()
+
+    assert repository.creates == []
+
+
+def test_submit_after_close_fails():
+    committer = make_committer(FakeRepository())
+    committer.close()
+
+    with pytest.raises(Exception, match="closed"):
+        committer.submit("text-0")
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from starlette.requests import Request
+
+from app.presentation.api.http_caching import (
+    TEXT_HTTP_MAX_AGE_SECONDS,
+    RangeNotSatisfiable,
+    is_not_modified,
+    parse_byte_range,
+    requested_range,
+    text_cache_headers,
+    text_etag,
+)
+
+LAST_MODIFIED = "Sat, 17 Oct 2026 12:30:15 GMT"
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_etag_uses_content_digest(make_text):
+    assert text_etag(make_text()) == '"aZ3kP9q1-9f86d081884c7d65"'
+    assert text_etag(make_text(), weak=True) == 'W/"aZ3kP9q1-9f86d081884c7d65"'
+
+
+def test_each_content_coding_has_its_own_strong_etag(make_text):
+    assert text_etag(make_text(), encoding="gzip") == '"aZ3kP9q1-9f86d081884c7d65-gzip"'
+    assert text_cache_headers(make_text(), encoding="zstd")["ETag"] == '"aZ3kP9q1-9f86d081884c7d65-zstd"'
+
+
+def test_etag_falls_back_to_row_id(make_text):
+    assert text_etag(make_text(content_digest=None)) == '"aZ3kP9q1-0b9f6c1e5d8a4f0e"'
+
+
+def test_cache_headers_without_expiration(make_text):
+    headers = text_cache_headers(make_text())
+
+    assert headers["Cache-Control"] == f"public, max-age={TEXT_HTTP_MAX_AGE_SECONDS}, immutable"
+    assert headers["Last-Modified"] == LAST_MODIFIED
+
+
+def test_max_age_is_capped_by_expiration(make_text):
+    expiration_date = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    cache_control = text_cache_headers(make_text(expiration_date=expiration_date))["Cache-Control"]
+    max_age = int(cache_control.split("max-age=")[1].split(",")[0])
+
+    assert 3590 <= max_age <= 3600
+
+
+def test_expired_text_is_not_cached(make_text):
+    expiration_date = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    assert text_cache_headers(make_text(expiration_date=expiration_date))["Cache-Control"] == "no-cache"
+
+
+def test_if_none_match_strong_and_weak(make_text):
+    strong = text_cache_headers(make_text())
+    weak = text_cache_headers(make_text(), weak_etag=True)
+    tag = text_etag(make_text())
+
+    assert is_not_modified(make_request(if_none_match=tag), strong)
+    assert is_not_modified(make_request(if_none_match=f"W/{tag}"), strong)
+    assert is_not_modified(make_request(if_none_match=tag), weak)
+    assert is_not_modified(make_request(if_none_match=f'"other", {tag}'), strong)
+    assert not is_not_modified(make_request(if_none_match='"aZ3kP9q1-0000000000000000"'), strong)
+
+
+def test_if_none_match_any(make_text):
+    assert is_not_modified(make_request(if_none_match="*"), text_cache_headers(make_text()))
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(make_text):
+    request = make_request(if_none_match='"other"', if_modified_since=LAST_MODIFIED)
+
+    assert not is_not_modified(request, text_cache_headers(make_text()))
+
+
+def test_if_modified_since(make_text):
+    headers = text_cache_headers(make_text())
+
+    assert is_not_modified(make_request(if_modified_since=LAST_MODIFIED), headers)
+    assert is_not_modified(make_request(if_modified_since="Sun, 18 Oct 2026 00:00:00 GMT"), headers)
+    assert not is_not_modified(make_request(if_modified_since="Sat, 17 Oct 2026 12:30:14 GMT"), headers)
+    assert not is_not_modified(make_request(if_modified_since="yesterday"), headers)
+    assert not is_not_modified(make_request(), headers)
+
+
+def test_requested_range(make_text):
+    headers = text_cache_headers(make_text())
+
+    assert requested_range(make_request(), headers) is None
+    assert requested_range(make_request(range="bytes=0-99"), headers) == "0-99"
+    assert requested_range(make_request(range="bytes=0-9, 20-29"), headers) is None
+    assert requested_range(make_request(range="items=0-9"), headers) is None
+
+
+def test_if_range_needs_strong_etag_match(make_text):
+    strong = text_cache_headers(make_text())
+    weak = text_cache_headers(make_text(), weak_etag=True)
+    tag = text_etag(make_text())
+
+    assert requested_range(make_request(range="bytes=10-", if_range=tag), strong) == "10-"
+    assert requested_range(make_request(range="bytes=10-", if_range='"other"'), strong) is None
+    assert requested_range(make_request(range="bytes=10-", if_range=f"W/{tag}"), weak) is None
+    assert requested_range(make_request(range="bytes=10-", if_range=tag), weak) is None
+
+
+def test_if_range_matches_etag_of_content_coding(make_text):
+    headers = text_cache_headers(make_text(), encoding="gzip")
+    tag = text_etag(make_text(), encoding="gzip")
+
+    assert requested_range(make_request(range="bytes=10-", if_range=tag), headers) == "10-"
+    assert requested_range(make_request(range="bytes=10-", if_range=text_etag(make_text())), headers) is None
+
+
+def test_if_range_date_must_equal_last_modified(make_text):
+    headers = text_cache_headers(make_text())
+
+    assert requested_range(make_request(range="bytes=10-", if_range=LAST_MODIFIED), headers) == "10-"
+    assert requested_range(
+        make_request(range="bytes=10-", if_range="Sun, 18 Oct 2026 00:00:00 GMT"), headers
+    ) is None
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("0-99", (0, 99)),
+    ("500-", (500, 999)),
+    ("900-5000", (900, 999)),
+    ("999-999", (999, 999)),
+    ("-100", (900, 999)),
+    ("-2000", (0, 999)),
+])
+def test_parse_byte_range(spec, expected):
+    assert parse_byte_range(spec, 1000) == expected
+
+
+@pytest.mark.parametrize("spec", ["abc", "5-2", "-", "1-x", ""])
+def test_malformed_range_is_ignored(spec):
+    assert parse_byte_range(spec, 1000) is None
+
+
+@pytest.mark.parametrize("spec, total", [("1000-", 1000), ("1000-1200", 1000), ("-0", 1000), ("-10", 0), ("0-", 0)])
+def test_unsatisfiable_range(spec, total):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range(spec, total)
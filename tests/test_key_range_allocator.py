@@ -0,0 +1,128 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlmodel import Session, select
+
+from app.infrastructure.database.models import KeyRanges as KeyRangeModel
+from app.infrastructure.hashing.key_range_allocator import KeyRangeHashAllocator
+from app.infrastructure.hashing.short_id import ShortIdEncoder
+
+# Leases rely on FOR UPDATE SKIP LOCKED and advisory locks, so these need Postgres
+pytestmark = pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set"
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    KeyRangeModel.__table__.drop(engine, checkfirst=True)
+    KeyRangeModel.__table__.create(engine)
+    yield engine
+    KeyRangeModel.__table__.drop(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_allocator(engine):
+    def make(owner: str, lease_seconds: int = 600) -> KeyRangeHashAllocator:
+        allocator = KeyRangeHashAllocator(
+            engine, ShortIdEncoder(length=8), range_size=10, claim_size=4,
+            lease_seconds=lease_seconds, sequence_base=0
+        )
+        allocator.owner = owner
+        return allocator
+    return make
+
+
+def ranges(engine) -> list[tuple]:
+    with Session(engine) as session:
+        rows = session.exec(select(KeyRangeModel).order_by(KeyRangeModel.range_start)).all()
+        return [(row.range_start, row.range_end, row.leased_by) for row in rows]
+
+
+def sequences(allocator, hashes) -> list[int]:
+    return [allocator.encoder.decode(hash_value) for hash_value in hashes]
+
+
+def test_claim_moves_range_start_before_handing_out(engine, make_allocator):
+    allocator = make_allocator("a")
+
+    first = allocator.take()
+
+    assert sequences(allocator, [first]) == [0]
+    assert ranges(engine) == [(4, 10, "a")]
+
+
+def test_claims_continue_in_leased_range_then_lease_the_next(engine, make_allocator):
+    allocator = make_allocator("a")
+
+    hashes = [allocator.take() for _ in range(12)]
+
+    assert sequences(allocator, hashes) == list(range(12))
+    # The used-up first range was the highest when retired, so it stays as the
+    # end marker until a later retire drops it
+    assert ranges(engine) == [(10, 10, None), (14, 20, "a")]
+
+
+def test_concurrent_leases_get_distinct_ranges(engine, make_allocator):
+    first, second = make_allocator("a"), make_allocator("b")
+
+    hashes = [first.take(), second.take(), first.take(), second.take()]
+
+    assert sequences(first, hashes) == [0, 10, 1, 11]
+    assert len(set(hashes)) == 4
+
+
+def test_stale_lease_is_taken_over(engine, make_allocator):
+    dead, alive = make_allocator("dead", lease_seconds=60), make_allocator("alive", lease_seconds=60)
+    dead_hashes = [dead.take()]
+    with Session(engine) as session:
+        session.exec(update(KeyRangeModel).values(leased_at=datetime.now(timezone.utc) - timedelta(seconds=61)))
+        session.commit()
+
+    alive_hashes = [alive.take() for _ in range(6)]
+    # The old owner's claim is still its own; once used up it leases elsewhere
+    dead_hashes += [dead.take() for _ in range(4)]
+
+    assert sequences(alive, alive_hashes) == [4, 5, 6, 7, 8, 9]
+    assert sequences(dead, dead_hashes) == [0, 1, 2, 3, 10]
+    assert not set(alive_hashes) & set(dead_hashes)
+
+
+def test_close_gives_back_unused_rest(engine, make_allocator):
+    allocator = make_allocator("a")
+    allocator.take()
+
+    allocator.close()
+
+    assert ranges(engine) == [(1, 10, None)]
+    assert sequences(allocator, [make_allocator("b").take()]) == [1]
+
+
+def test_close_after_takeover_keeps_rest_as_own_range(engine, make_allocator):
+    dead, alive = make_allocator("dead", lease_seconds=60), make_allocator("alive", lease_seconds=60)
+    dead.take()
+    with Session(engine) as session:
+        session.exec(update(KeyRangeModel).values(leased_at=datetime.now(timezone.utc) - timedelta(seconds=61)))
+        session.commit()
+    alive.take()
+
+    dead.close()
+
+    assert ranges(engine) == [(1, 4, None), (8, 10, "alive")]
+
+
+def test_returned_hashes_are_reused_and_given_back(engine, make_allocator):
+    allocator = make_allocator("a")
+    hashes = [allocator.take() for _ in range(3)]
+    allocator.give_back(hashes[2])
+    allocator.give_back(hashes[0])
+
+    assert allocator.take() == hashes[2]
+
+    allocator.close()
+    # Sequence 0 can't extend the rest [3, 4), so it becomes a range of its own
+    assert ranges(engine) == [(0, 1, None), (3, 10, None)]
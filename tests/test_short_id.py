@@ -0,0 +1,55 @@
+import pytest
+
+from app.infrastructure.hashing.short_id import BASE62_ALPHABET, ShortIdEncoder
+
+
+@pytest.fixture
+def encoder():
+    return ShortIdEncoder(length=8)
+
+
+def test_round_trip(encoder):
+    for sequence in [0, 1, 2, 61, 62, 123456789, encoder.keyspace - 1]:
+        hash_value = encoder.encode(sequence)
+
+        assert len(hash_value) == 8
+        assert set(hash_value) <= set(BASE62_ALPHABET)
+        assert encoder.decode(hash_value) == sequence
+
+
+def test_encoding_is_a_bijection_over_the_keyspace():
+    encoder = ShortIdEncoder(length=2)
+
+    hashes = encoder.encode_range(0, encoder.keyspace)
+
+    assert len(set(hashes)) == encoder.keyspace == 62 ** 2
+    assert [encoder.decode(hash_value) for hash_value in hashes] == list(range(encoder.keyspace))
+
+
+def test_consecutive_sequences_are_scrambled(encoder):
+    first, second = encoder.encode_range(1000, 2)
+
+    assert first[:-1] != second[:-1]
+
+
+def test_same_settings_give_same_hashes():
+    assert ShortIdEncoder(length=8).encode(42) == ShortIdEncoder(length=8).encode(42)
+    assert ShortIdEncoder(length=8, offset=0).encode(42) != ShortIdEncoder(length=8).encode(42)
+
+
+@pytest.mark.parametrize("sequence", [-1, 62 ** 8])
+def test_sequence_outside_keyspace(encoder, sequence):
+    with pytest.raises(ValueError):
+        encoder.encode(sequence)
+
+
+@pytest.mark.parametrize("hash_value", ["", "abc", "aZ3kP9q1x", "aZ3kP9q-", "aZ3kP9q "])
+def test_decode_rejects_invalid_hashes(encoder, hash_value):
+    with pytest.raises(ValueError):
+        encoder.decode(hash_value)
+
+
+@pytest.mark.parametrize("multiplier", [2, 31, 62 * 7])
+def test_multiplier_must_be_coprime_with_62(multiplier):
+    with pytest.raises(ValueError):
+        ShortIdEncoder(length=8, multiplier=multiplier)
@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.infrastructure.cache.singleflight import SingleFlight
+
+
+def test_concurrent_calls_for_one_key_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "body"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flight.do, "aZ3kP9q1", load)
+        started.wait(5)
+        followers = [executor.submit(flight.do, "aZ3kP9q1", load) for _ in range(4)]
+        # Give the followers time to find the call in flight
+        time.sleep(0.1)
+        release.set()
+
+        assert leader.result() == ("body", False)
+        assert [f.result() for f in followers] == [("body", True)] * 4
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        blocked = executor.submit(flight.do, "first", lambda: release.wait(5))
+        assert flight.do("second", lambda: "loaded") == ("loaded", False)
+        release.set()
+        blocked.result()
+
+
+def test_exception_is_shared_and_key_is_released():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("storage down")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", fail)
+        started.wait(5)
+        follower = executor.submit(flight.do, "key", fail)
+        time.sleep(0.1)
+        release.set()
+
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+
+    # The failed call is not remembered
+    assert flight.do("key", lambda: "retried") == ("retried", False)
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    results = iter(["first", "second"])
+
+    assert flight.do("key", lambda: next(results)) == ("first", False)
+    assert flight.do("key", lambda: next(results)) == ("second", False)
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.infrastructure.cache.text_cache_record import (
+    HEADER,
+    METADATA_PREFIX_BYTES,
+    decode_text_record,
+    decode_text_record_metadata,
+    encode_text_record,
+)
+
+
+@pytest.fixture
+def text(make_text):
+    created_at = make_text().created_at
+    return make_text(
+        expiration_date=created_at + timedelta(days=7),
+        updated_at=created_at + timedelta(seconds=1),
+    )
+
+
+def assert_same_metadata(decoded, text):
+    assert decoded.id == text.id
+    assert decoded.location == text.location
+    assert decoded.expiration_date == text.expiration_date
+    assert decoded.hash_value == text.hash_value
+    assert decoded.created_at == text.created_at
+    assert decoded.updated_at == text.updated_at
+    assert decoded.content_digest == text.content_digest
+
+
+def test_complete_record_round_trip(text):
+    body = "héllo wörld\n".encode() * 100
+
+    metadata, decoded_body = decode_text_record(encode_text_record(text, body))
+
+    assert_same_metadata(metadata, text)
+    assert decoded_body == body
+
+
+def test_stored_bytes_are_kept_as_is(text):
+    body = b"\x1f\x8b\x08\x00compressed"
+
+    _, decoded_body = decode_text_record(encode_text_record(text, body))
+
+    assert decoded_body == body
+
+
+def test_empty_body_is_still_a_complete_record(text):
+    record = encode_text_record(text, b"")
+
+    assert decode_text_record(record)[1] == b""
+
+
+def test_missing_optional_fields_round_trip(make_text):
+    text = make_text(location="", content_digest=None)
+
+    metadata, _ = decode_text_record(encode_text_record(text, b"body"))
+
+    assert metadata.expiration_date is None
+    assert metadata.updated_at is None
+    assert metadata.content_digest is None
+    assert metadata.location == ""
+
+
+def test_naive_datetimes_are_taken_as_utc(make_text):
+    text = make_text(expiration_date=datetime(2030, 1, 2, 3, 4, 5))
+
+    metadata, _ = decode_text_record(encode_text_record(text, b"body"))
+
+    assert metadata.expiration_date == datetime(2030, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+def test_metadata_only_record_answers_metadata_lookups_only(text):
+    record = encode_text_record(text, None)
+
+    assert decode_text_record(record) is None
+    metadata, needed = decode_text_record_metadata(record)
+    assert needed == 0
+    assert_same_metadata(metadata, text)
+
+
+def test_metadata_from_prefix_of_complete_record(text):
+    record = encode_text_record(text, b"x" * 10000)
+
+    metadata, needed = decode_text_record_metadata(record[:METADATA_PREFIX_BYTES])
+
+    assert needed == 0
+    assert_same_metadata(metadata, text)
+
+
+def test_prefix_shorter_than_header_asks_for_header(text):
+    record = encode_text_record(text, b"body")
+
+    assert decode_text_record_metadata(record[:HEADER.size - 1]) == (None, HEADER.size)
+
+
+def test_truncated_prefix_asks_for_exact_metadata_length(make_text):
+    text = make_text(location="s3://pastebin/" + "k" * 2000 + ".txt")
+    record = encode_text_record(text, b"body")
+
+    metadata, needed = decode_text_record_metadata(record[:METADATA_PREFIX_BYTES])
+
+    assert metadata is None
+    assert needed == len(record) - len(b"body")
+    metadata, needed = decode_text_record_metadata(record[:needed])
+    assert needed == 0
+    assert_same_metadata(metadata, text)
+
+
+def test_unknown_data_is_not_a_record(text):
+    record = bytearray(encode_text_record(text, b"body"))
+
+    assert decode_text_record(b"{\"id\": 1}" + b" " * HEADER.size) is None
+    assert decode_text_record_metadata(b"{\"id\": 1}" + b" " * HEADER.size) == (None, 0)
+
+    record[2] += 1  # version
+    assert decode_text_record(bytes(record)) is None
+    assert decode_text_record_metadata(bytes(record)) == (None, 0)